@@ -36,10 +36,12 @@
 #   - 200 requests per minute
 
 # **Custom libraries**
-#from lib.jv.lib_paper_trading import *
-
-lib_file_name = './lib/jv/lib_paper_trading.py'
-with open( lib_file_name ) as lib_file : exec( lib_file.read() )
+# Clients, tickers & parameters of the session are passed to the library by set_session() & set_execution_mode()
+import lib.jv.lib_paper_trading as trading # session state rebuilt by the library (e.g. trading.SIGNAL_STATES)
+from lib.jv.lib_paper_trading import *
+import asyncio                            # event loop of the async daily process
+from lib.jv.async_runtime import WallClock, VirtualClock, run_session, run_blocking, gather_blocking
+#print_environment()  # Un-comment to check versions of Python & main libraries
 
 
 # ## Constants
@@ -67,22 +69,18 @@ def pre_process() :
     STRATEGY_PARAMS = get_strategy_params()
     # Display parameters
     print( 'Optimized parameters per ticker :')
-    temporary_cols  = [ 'fast_window', 'long_entry', 'short_entry' ] 
-    selected_cols   = [ 'ticker', 'slow_window' ] + temporary_cols
-    display( STRATEGY_PARAMS[ selected_cols ].round( 1 ) )
-    STRATEGY_PARAMS = STRATEGY_PARAMS.drop( columns=temporary_cols )
+    selected_cols   = [ 'ticker', 'slow_window', 'fast_window', 'long_entry', 'short_entry' ]
+    display( STRATEGY_PARAMS.to_frame()[ selected_cols ].round( 1 ) )
     
     # Set moving window size for all tickers
-    MAX_SLOW_WINDOW_SIZE = round_up( STRATEGY_PARAMS[ 'slow_window' ].max() )
-    WINDOW_SIZE = max( MAX_SLOW_WINDOW_SIZE, RSI_WINDOW_SIZE )    
+    WINDOW_SIZE = int( STRATEGY_PARAMS.window_size.max() ) # max( RSI window, slow windows rounded up )
     log( f'Max window size for all tickers : {WINDOW_SIZE}' )    
-    STRATEGY_PARAMS = STRATEGY_PARAMS.drop( columns=[ 'slow_window' ] )
 
     # Get tickers list = intersection of 3 sets
     # 1. Set proposed by user in section "Variables"
     TICKERS_USER       = set( [ t.replace( '-', '.' ) for t in TICKERS_PROPOSED ] ) # Alpaca standard 
     # 2. Set issued from optimization process 
-    TICKERS_OPTIMIZED  = set( list (STRATEGY_PARAMS[ 'ticker' ].values ) )
+    TICKERS_OPTIMIZED  = set( STRATEGY_PARAMS.tickers )
     # 3. Set of available tickers in exchange
     search_request = GetAssetsRequest( asset_class=AssetClass.US_EQUITY )
     TRADING_CLIENT = CLIENTS[ 1 ]
@@ -106,7 +104,7 @@ def pre_process() :
 
 
 def daily_process() :
-    daily_history, daily_chrono = [], []  # chrono measures performance    
+    daily_history = []
     current_time = current_timestamp()
     log( f'Today is {current_time.date():%a %d-%b}' )    
     
@@ -116,84 +114,113 @@ def daily_process() :
             opening_time, closing_time = get_today_endpoints() # Replace by other existing f ?
             log( f' Today, market opens from {opening_time:%H:%M} to {closing_time:%H:%M} UTC' )
             market_opens_later    = ( current_time <= opening_time )        
-            # Wait for opening time
-            if market_opens_later : wait_until( opening_time )
+            # Wait for opening time, connections to the API opened just before
+            if market_opens_later : 
+                prewarm_time = opening_time - timedelta( seconds=HTTP_PREWARM_LEAD )
+                if current_time < prewarm_time : wait_until( prewarm_time )
+                prewarm_connections()
+                wait_until( opening_time )
             # Wait for next run
             elif f_market_is_still_open( closing_time ) : wait_until_next_run()
         
             # Run daily one-shot
             if f_market_is_still_open( closing_time ) : 
-                daily_history = run_daily_one_shot( daily_history, closing_time )
+                daily_history = run_daily_one_shot()
             
             # Run job regularly before market closes        
             while f_market_is_still_open( closing_time ) :
-                sleep( IDLE_TIME ) # avoids multiple runs during 1 second
+                pause( IDLE_TIME ) # avoids multiple runs during 1 second
                 wait_until_next_run()        
-                daily_history, daily_chrono = scan_trades( daily_history, daily_chrono )            
+                daily_history = scan_trades( daily_history )            
                 #log( f'{daily_history[-1:].values}' )
 
     except Exception as ex :
         log( '***** ERROR : Daily process was interrupted' )
         log_exception( ex )        
-        return daily_history, daily_chrono
+        return daily_history
     
     except KeyboardInterrupt: 
         log( 'Process interrupted by user.' ) 
-        #log( f'{len(daily_history)} history records & {len(daily_chrono)} perf records')
+        #log( f'{len(daily_history)} history records')
         daily_process.interrupted = True
-        return daily_history, daily_chrono
+        return daily_history
     
     log( 'Market is closed' )    
-    return daily_history, daily_chrono
-
-
-# ## Daily One-Shot
+    return daily_history
 
-# In[85]:
 
+# ## Async Daily Process
+# Same steps as daily_process() on an asyncio event loop :
+# - ticks are scheduled on wall-clock boundaries, by a virtual clock in accelerated mode
+# - LTPs are fetched concurrently with positions & pending orders (if the order book is not seeded)
+# - signal generation & order dispatch run as tasks
 
-def run_daily_one_shot( daily_history, closing_time ) :
-    #log( 'One-shot st7f1c35e7-c173-40cc-b19d-ad54c0a9e523arted' )
-    #chrono_start = [ process_time_ns(), perf_counter_ns() ] # Un-comment to measure performance 1/2
-    ltps = complete_history( closing_time ) # Complete truncated historical LTPs due to Alpaca's feed delay
-    daily_history = get_historical_data()
+# In[ ]:
 
-    # Concatenate both    
-    daily_history = pd.concat( [ daily_history, ltps ] )
 
-    # Display daily_history
-    print( 'History sample (10 first tickers) :' )
-    display( daily_history.iloc[ :, :10 ].round( 2 ) )
+async def async_daily_process( session ) : # session = { 'daily_history':... } 
+    current_time = current_timestamp()
+    log( f'Today is {current_time.date():%a %d-%b}' )    
+    if not f_market_is_open_today() :
+        log( 'Market is closed' )    
+        return
     
-    # log( get_chrono( *chrono_start ) ) # Un-comment to measure performance 2/2
-    #log( 'One-shot completed' )
-    return daily_history
-
-
-# In[86]:
+    opening_time, closing_time = get_today_endpoints()
+    log( f' Today, market opens from {opening_time:%H:%M} to {closing_time:%H:%M} UTC' )
+    if execution_mode in [ 'accelerated', 'replay' ] : 
+        clock = VirtualClock( current_timestamp, advance_clock )
+    else :
+        clock = WallClock( current_timestamp )
+    # Wait for opening time, connections to the API opened just before
+    await clock.sleep_until( opening_time - timedelta( seconds=HTTP_PREWARM_LEAD ) )
+    await run_blocking( prewarm_connections )
+    await clock.sleep_until( opening_time )
+    
+    # Run daily one-shot
+    if f_market_is_still_open( closing_time ) : 
+        session[ 'daily_history' ] = await run_blocking( run_daily_one_shot )
+
+    # Run ticks regularly before market closes        
+    async def on_tick( tick_time ) :
+        # Fetch LTPs, and positions & pending orders concurrently if the order book is not seeded
+        requests = { 'ltps' : lambda : LATENCY.timed( 'fetch_ltp', get_ltps ) }
+        if not ORDER_BOOK.is_seeded() :
+            requests[ 'positions' ]      = TRADING_CLIENT.get_all_positions
+            requests[ 'pending_orders' ] = lambda : get_orders_by_status( 'pending', verbose=False )
+        fetched = await gather_blocking( requests )
+        # Blocking calls in threads : reconciliations of the history & order book may send REST requests
+        daily_history = await run_blocking( update_daily_history, session[ 'daily_history' ], fetched[ 'ltps' ] )
+        tickers_to_process = await run_blocking( get_tickers_to_process, fetched.get( 'positions' ), 
+                                                 fetched.get( 'pending_orders' ) )
+        # Generate signals & place orders as tasks
+        orders_to_dispatch = await asyncio.create_task( run_blocking( scan_signals, 
+                    daily_history, tickers_to_process ) )
+        if len( orders_to_dispatch ) > 0 :
+            await asyncio.create_task( run_blocking( ORDER_DISPATCHER.dispatch, orders_to_dispatch ) )
+        # Log latency percentiles of the session regularly (as scan_trades())
+        if LATENCY.get_count( 'fetch_ltp' ) % LATENCY_LOG_TICKS == 0 :
+            log_latency()
+
+    await run_session( clock, closing_time, INTERVAL, on_tick )
+    log( 'Market is closed' )    
 
 
-# Get last trading prices to complete truncated historical data due to Alpaca's feed delay 
-def complete_history( closing_time ) :
-    nb_truncated_records = round_up( HIST_MIN_DELAY / HIST_INTERVAL)
-    log( f'Recovering {nb_truncated_records} records to complete historical data (15-minute gap)' )
-    ltps = get_ltps()
-    for i in range( nb_truncated_records - 1 ) :        
-        sleep( 1 )
-        if not f_market_is_still_open( closing_time ) : 
-            next_opening, closing_time = get_next_sessions( CALENDAR, current_timestamp() ).iloc[ 0 ]
-            wait_until( next_opening )
-        wait_until_next_run()
-        ltps = pd.concat( [ ltps, get_ltps() ] )
+def run_async_daily_process() : # same interface as daily_process()
+    session = { 'daily_history':[] }
+    try :
+        asyncio.run( async_daily_process( session ) )
+    except Exception as ex :
+        log( '***** ERROR : Daily process was interrupted' )
+        log_exception( ex )        
+    except KeyboardInterrupt: 
+        log( 'Process interrupted by user.' ) 
+        daily_process.interrupted = True
+    return session[ 'daily_history' ]
 
-    # Get data info
-    dates = ltps.index
-    date_first, date_last = f'{dates.min():%B %d %Hh%M}', f'{dates.max():%B %d %Hh%M}'
-    log( f'{len( ltps ):>4} additional  records from {date_first} to {date_last}' )   
-        
-    return ltps
 
-# _ = complete_history()  # Un-comment to check function
+# ## Daily One-Shot
+# run_daily_one_shot() & complete_history() of the library : warm start of the history, then seeds of the
+# signal states, order book & order templates (see lib_paper_trading.py)
 
 
 # ## Scan Trades
@@ -205,58 +232,69 @@ def complete_history( closing_time ) :
 # In[87]:
 
 
-def scan_trades( daily_history, daily_chrono ) :   
+def scan_trades( daily_history ) :   
     # Update moving window on historical data
     daily_history = update_daily_history( daily_history )
-    chrono_ltps_received = [ process_time_ns(), perf_counter_ns() ] # for performance
-    moving_window = daily_history[ -WINDOW_SIZE: ]    
-    # display( moving_window[ -10: ] ) # Un-comment to debug
 
     # Get tickers with neither open positions nor pending orders
     tickers_to_process = get_tickers_to_process()    
+    # Generate signals
+    orders_to_dispatch = scan_signals( daily_history, tickers_to_process )
+
+    # Place orders concurrently (bracket checks continue in background)
+    if len( orders_to_dispatch ) > 0 :
+        ORDER_DISPATCHER.dispatch( orders_to_dispatch )
+
+    # Log latency percentiles of the session regularly
+    if LATENCY.get_count( 'fetch_ltp' ) % LATENCY_LOG_TICKS == 0 :
+        log_latency()
+            
+    return daily_history
+
+
+# Generate signals of tickers to process & get orders to dispatch
+
+# In[ ]:
+
+
+def scan_signals( daily_history, tickers_to_process ) :
+    # Update streaming indicators of all tickers at once with their LTP (seeded in run_daily_one_shot())
+    with LATENCY.span( 'compute_signal' ) :
+        update_signal_states( daily_history.last() )
+    # moving_window = daily_history.to_frame( WINDOW_SIZE ) # Un-comment for window-based versions
+    # display( moving_window[ -10: ] ) # Un-comment to debug
+
+    orders_to_dispatch = [] # orders submitted concurrently after the scan
     # Scan tickers
     for ticker in tickers_to_process :
         try :
-            # Get ticker's strategy parameters
-            mask = ( STRATEGY_PARAMS[ 'ticker' ]==ticker )
-            params_i = STRATEGY_PARAMS[ mask ][ 'opt_params' ].values[0]
-            # Get ticker's moving window ('Close' column required to generate signal)
-            slow_window_size = round_up( params_i[ 0 ] )
-            window_size_i = max( RSI_WINDOW_SIZE, slow_window_size )  
-            log( f'{ticker:<6}: window size={window_size_i}' )                
-            window_i = moving_window[[ ticker ]].rename( columns={ ticker:'Close' } )[ -window_size_i: ]
-            # Choose signal generator's version : Python or C
+            # Choose signal generator's version : window-based Python or C, or streaming state
+            # Window-based versions require ticker's moving window ('Close' column) & parameters
+            #params_i = STRATEGY_PARAMS.get_opt_params( ticker )
+            #window_size_i = STRATEGY_PARAMS.get_window_size( ticker )
+            #window_i = moving_window[[ ticker ]].rename( columns={ ticker:'Close' } )[ -window_size_i: ]
             #window_i = generate_signal( window_i, RSI_WINDOW_SIZE, params_i, True, 'Close' )
-            window_i = c_signal_gen.generate_signals_c( window_i, RSI_WINDOW_SIZE, params_i, True, 'Close' )
-            chrono_signal_generated = [ process_time_ns(), perf_counter_ns() ] # performance
+            #window_i = c_signal_gen.generate_signals_c( window_i, RSI_WINDOW_SIZE, params_i, True, 'Close' )
+            #last_record_i = window_i.iloc[ -1 ]
+            last_record_i = trading.SIGNAL_STATES.get_record( ticker )
             # Get signal value
-            last_record_i = window_i.iloc[ -1 ]
             signal_value = last_record_i[ 'Signal' ]
             if signal_value in [ -1, +1 ] :
                 # Log signal record with indicators' values
-                log_signal( last_record_i )
-                # Place order
+                log_signal( last_record_i, ticker )
+                # Queue order (submission is measured by ORDER_DISPATCHER)
                 current_price = last_record_i[ 'Close' ]
-                new_order = place_order( current_price, ticker, QUANTITY, signal_value )
-                chrono_order_submitted = [ process_time_ns(), perf_counter_ns() ] # performance
-                if new_order is not None :
-                    check_bracket( new_order.id )            
-            else : 
-                chrono_order_submitted  = [ None, None ] # performance
-            # Log performance of blocks "generate signal", "place order" and both  
-            daily_chrono.append( [ ticker, *chrono_ltps_received, *chrono_signal_generated, 
-                                     *chrono_order_submitted ] )
+                orders_to_dispatch.append( ( ticker, current_price, QUANTITY, signal_value ) )
         except Exception as ex :
-            log( f'{ticker}: ***** ERROR : Could not process ticker' )
-            log_exception( ex )            
-            #print('scan_trades(): ', len(daily_history), len(daily_chrono))
-            return daily_history, daily_chrono
+            log( f'{ticker}: ***** ERROR : Could not process ticker', 'scan_signals', ticker )
+            log_exception( ex, 'scan_signals' )
+            return orders_to_dispatch
         except KeyboardInterrupt: 
             scan_trades.interrupted = True
-            log('Process interrupted by user')
-            return daily_history, daily_chrono
-            
-    return daily_history, daily_chrono
+            log( 'Process interrupted by user', 'scan_signals' )
+            return orders_to_dispatch
+
+    return orders_to_dispatch
 
 
 # Get tickers with open_positions & pending execution orders
@@ -264,15 +302,24 @@ def scan_trades( daily_history, daily_chrono ) :
 # In[88]:
 
 
-def get_tickers_to_process() : 
-    # ToDo : chrono delta ltp - signal - place order (return chrono start/go inside functions)
+def get_tickers_to_process( positions=None, pending_orders=None ) : # fetched here if not provided
     
+    # Local order book (seeded in run_daily_one_shot()) : set lookup, no REST request
+    if ORDER_BOOK.is_seeded() and ( positions is None ) and ( pending_orders is None ) :
+        reconcile_order_book()  # periodically only
+        tickers_to_skip = ORDER_BOOK.get_tickers_to_skip()
+        tickers_to_process = [ t for t in TICKERS if t not in tickers_to_skip ]
+        log( f'{len( tickers_to_process ):>3} tickers to scan \n\t [{" ".join( tickers_to_process )}]', 
+             'get_tickers_to_process' )
+        return tickers_to_process
+
     # Get tickers_with open positions 
-    open_positions = list_of_dicts_to_df( TRADING_CLIENT.get_all_positions() ) 
+    if positions is None : positions = TRADING_CLIENT.get_all_positions()
+    open_positions = list_of_dicts_to_df( positions ) 
     tickers_open_positions = get_tickers_items( open_positions, 'open positions' )
     
     # Get tickers with pending target (limit) & stoploss orders
-    pending_orders = get_orders_by_status( 'pending' )
+    if pending_orders is None : pending_orders = get_orders_by_status( 'pending' )
     tickers_pending = []
     for type_i in [ 'market', 'limit', 'stop' ] :
         pending_orders_i = pending_orders[ pending_orders[ 'type' ]==type_i ]
@@ -283,7 +330,7 @@ def get_tickers_to_process() :
     tickers_to_process = list( set( TICKERS ) - tickers_to_skip )
 
     nb_tickers_to_process = len( tickers_to_process )
-    log( f'{nb_tickers_to_process:>3} tickers to scan \n\t [{" ".join( tickers_to_process )}]' )
+    log( f'{nb_tickers_to_process:>3} tickers to scan \n\t [{" ".join( tickers_to_process )}]', 'get_tickers_to_process' )
     return tickers_to_process
 
 
@@ -298,13 +345,14 @@ if unit_test_enabled :
 # In[91]:
 
 
-def update_daily_history( daily_history ) :
-    #chrono_start = [ process_time_ns(), perf_counter_ns() ]  # Un-comment to measure performance 1/2
+def update_daily_history( daily_history, ltps=None ) : # ltps fetched here if not provided
     # Get last trading prices
-    ltps = get_ltps()
-    # Append to daily historical data
-    daily_history = pd.concat( [ daily_history, ltps ] )
-    #log( get_chrono( *chrono_start ) ) # Un-comment to measure performance 2/2
+    if ltps is None : ltps = LATENCY.timed( 'fetch_ltp', get_ltps )
+    # Append to daily historical data (ring buffer : no copy of previous records)
+    with LATENCY.span( 'update_history' ) :
+        daily_history.append_frame( ltps )
+    # Replace provisional records of the warm start once consolidated bars are available
+    reconcile_history( daily_history )
     return daily_history
 
 
@@ -318,18 +366,19 @@ def update_daily_history( daily_history ) :
 
 if unit_test_enabled :
     print( '\nUnit test of : daily_process()' )
-    clock_delay = get_seconds_to_dt( get_last_weekday( 'Thursday' ), [ 19, 24, 59 ] )
-    wait_until, wait_until_next_run, get_ltps, place_order = get_prototypes( 'accelerated' )
+    wait_until, wait_until_next_run, get_ltps, place_order = set_execution_mode( 'accelerated', 
+        get_seconds_to_dt( get_last_weekday( 'Thursday' ), [ 19, 24, 59 ] ) )
     TICKERS, CALENDAR, CLIENTS, STRATEGY_PARAMS, WINDOW_SIZE, ORDER_PARAMS = pre_process()
+    set_session( TICKERS, CALENDAR, CLIENTS, STRATEGY_PARAMS, WINDOW_SIZE, ORDER_PARAMS )
     DATA_CLIENT, TRADING_CLIENT = CLIENTS
     QUANTITY, TARGET_PCT, STOPLOSS_PCT = ORDER_PARAMS.values()
     
     try :
-        daily_history, daily_chrono = daily_process()
+        daily_history = daily_process()
     except KeyboardInterrupt: 
         log('Process interrupted by user')
         
-    clock_delay = 0
+    set_clock_delay( 0 )
 
 
 # In[95]:
@@ -338,7 +387,7 @@ if unit_test_enabled :
 if unit_test_enabled and ( daily_history is not None ) : 
     print( '\nUnit test of : daily_history' )
     #display( daily_history.T )
-    plot_variation_prices( daily_history, nb_last_records=30 )
+    plot_variation_prices( daily_history.to_frame(), nb_last_records=30 )
 
 
 # ## Execution
@@ -351,6 +400,7 @@ if unit_test_enabled and ( daily_history is not None ) :
 
 execution_mode = 'normal'
 clock_delay, file_suffix = 0 , ''
+runtime = 'sync'  # 'sync' : daily_process() or 'asyncio' : run_async_daily_process()
 
 
 # **Optional time simulation** 
@@ -358,11 +408,13 @@ clock_delay, file_suffix = 0 , ''
 # For an execution with optional **simulated time**, select a weekday & a time-scenario for these simulated modes :
 # - **advanced** mode, launches on different dates (previous weekdays) & times
 # - **accelerated** mode, idem + reduces waiting time during the whole process
+# - **replay** mode, replays recorded prices of REPLAY_PATH under a virtual clock (no waiting time, 
+#   same prices & orders run to run)
 
 # In[97]:
 
 
-execution_mode = 'accelerated'  #  Uncomment & set: advanced or accelerated
+execution_mode = 'accelerated'  #  Uncomment & set: advanced, accelerated or replay
 time_scenario = 'PRE_CLOSE' 
 weekday = 'Wednesday' # Monday Friday Saturday
 
@@ -377,6 +429,8 @@ if execution_mode in [ 'advanced', 'accelerated' ] :
     simulated_time = TIME_SCENARII[ time_scenario ] 
     clock_delay = get_seconds_to_dt( simulated_date, simulated_time )
     file_suffix = f'_{execution_mode}'
+if execution_mode == 'replay' : 
+    file_suffix = '_replay'
 
 
 # ### Launch
@@ -387,40 +441,80 @@ if execution_mode in [ 'advanced', 'accelerated' ] :
 try :
     # Pre-process
     TICKERS, CALENDAR, CLIENTS, STRATEGY_PARAMS, WINDOW_SIZE, ORDER_PARAMS = pre_process()
+    set_session( TICKERS, CALENDAR, CLIENTS, STRATEGY_PARAMS, WINDOW_SIZE, ORDER_PARAMS )
     DATA_CLIENT, TRADING_CLIENT = CLIENTS
     QUANTITY, TARGET_PCT, STOPLOSS_PCT = ORDER_PARAMS.values()
-    daily_log, daily_history, daily_chrono = '', [], []
-    wait_until, wait_until_next_run, get_ltps, place_order = get_prototypes( execution_mode )
+    daily_log, daily_history = '', []
+    wait_until, wait_until_next_run, get_ltps, place_order = set_execution_mode( execution_mode, clock_delay, 
+                                                                                  file_suffix )
+    if execution_mode == 'replay' : init_replay() # virtual clock set at the start of recorded prices
     daily_process.interrupted, scan_trades.interrupted = False, False # Function's attributes
     
     while True :    # Repeat everyday
         
         # Daily process
-        daily_history, daily_chrono = daily_process()
+        if runtime == 'asyncio' :
+            daily_history = run_async_daily_process()
+        else :
+            daily_history = daily_process()
         if daily_process.interrupted or scan_trades.interrupted : 
             raise KeyboardInterrupt
             
         # Log results
-        save_results( daily_log, daily_history, daily_chrono, file_suffix )
-        daily_log, daily_history, daily_chrono = '', [], []
+        save_results( daily_log, daily_history, file_suffix )
+        daily_log, daily_history = '', []
         
+        # Recorded prices are replayed once
+        if execution_mode == 'replay' : 
+            break
         # Wait for next opening day
         idle_time = get_seconds_to_opening() - 2*60*60 # time to 2 hours before market opens
         if execution_mode == 'accelerated' : 
-            clock_delay = idle_time # advance clock by idle time
+            set_clock_delay( idle_time ) # advance clock by idle time
         else : 
             sleep( idle_time )      # do nothing during idle time
         
 except SystemExit :
     log('Program terminated due to critical error')
-    save_results( daily_log, daily_history, daily_chrono, file_suffix )
+    save_results( daily_log, daily_history, file_suffix )
 except KeyboardInterrupt: 
     log('Process interrupted by user')
-    save_results( daily_log, daily_history, daily_chrono, file_suffix )
+    save_results( daily_log, daily_history, file_suffix )
 
 
 # ### Check Results
 
+# Convert CSV files of previous days to the columnar store (run once)
+
+# In[ ]:
+
+
+# for file_name, dataset, date, nb_rows in convert_csv_dir( CSV_DIR, DATA_STORE ) : # Un-comment to convert
+#     print( f'{file_name} -> {dataset}/{date} ({nb_rows} records)' )
+
+
+# Re-optimize strategy's parameters on stored history & append them to STRATEGY_PARAMS_PATH (nightly)
+
+# In[ ]:
+
+
+# from lib.jv.optimizer import optimize_tickers # Un-comment to re-optimize
+# optimize_tickers( DATA_STORE.read( 'hist' ).ffill(), STRATEGY_PARAMS_PATH, rsi_window=RSI_WINDOW_SIZE )
+
+
+# Backtest strategy offline on stored history (same signals & brackets as live trading)
+
+# In[ ]:
+
+
+# from lib.jv.backtester import run_backtest, summarize # Un-comment to backtest
+# backtest_history = DATA_STORE.read( 'hist' ).ffill()
+# backtest_tickers = [ t for t in backtest_history.columns if t in STRATEGY_PARAMS ]
+# backtest_trades  = run_backtest( backtest_history[ backtest_tickers ], STRATEGY_PARAMS.get_params_table( backtest_tickers ),
+#                                  RSI_WINDOW_SIZE, QUANTITY, TARGET_PCT, STOPLOSS_PCT )
+# display( summarize( backtest_trades ) )
+
+
 # Set date to check 'YYYYMMDD'
 
 # In[ ]:
@@ -452,8 +546,7 @@ print( 'grep "ERROR" ./log/alpaca/api_orders_{ exec_date }.log | cut -d":" -f 4
 # In[ ]:
 
 
-daily_history_path = f'./data/alpaca/hist_{ exec_date }.csv'
-daily_history = read_df_from_csv( daily_history_path, index_column='timestamp', timestamp_index=True )
+daily_history = read_daily_df( 'hist_', exec_date, index_column='timestamp', timestamp_index=True )
 print( daily_history.info( verbose=False ) )
 daily_history.round( 1 ).head( 1 )
 
@@ -463,8 +556,7 @@ daily_history.round( 1 ).head( 1 )
 # In[ ]:
 
 
-daily_orders_path = f'./data/alpaca/orders_{ exec_date }.csv'
-daily_orders = read_df_from_csv( daily_orders_path, index_column='id' )
+daily_orders = read_daily_df( 'orders_', exec_date, index_column='id' )
 print( daily_orders[[ 'type', 'status' ]].groupby(by=[ 'type' ]).value_counts() )
 daily_orders.head( 1 )
 
@@ -474,16 +566,11 @@ daily_orders.head( 1 )
 # In[ ]:
 
 
-chrono_path = f'./data/alpaca/chrono_ms_{ exec_date }.csv'
-chrono = read_df_from_csv( chrono_path, index_column='ticker' )                           
-chrono = chrono[[ 'delta_signal', 'delta_order', 'delta_signal_cpu', 'delta_order_cpu' ]] 
-signal_with_order = ~( chrono[ 'delta_order' ].isna() )
-print( 'Stats & sample of signals followed by 1 order' )
-display( chrono[ signal_with_order ].describe().loc[[ 'min', 'mean', 'max' ]].round( 1 ) )
-display( chrono[ signal_with_order ].head(1) )
-print( 'Stats & sample of signals followed by NO order' )
-display( chrono[ ~signal_with_order ].describe().loc[[ 'min', 'mean', 'max' ]].round( 1 ) )
-display( chrono[ ~signal_with_order ].head(1) ) 
+latency = read_daily_df( 'latency_ms_', exec_date, index_column='stage' )
+print( 'Latency percentiles per stage (ms)' )
+display( latency[ latency[ 'ticker' ]=='all' ] )
+print( 'Slowest tickers to submit an order (ms)' )
+display( latency.loc[[ 'submit_order' ]].sort_values( 'wall_p99', ascending=False ).head( 5 ) ) 
 
 
 # **End Process**
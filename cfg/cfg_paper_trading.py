@@ -6,10 +6,14 @@
 EXCHANGE = 'NYSE' # JPX NYSE EUREX BSE ASX  
 CREDENTIALS_PATH = './cfg/credentials.cfg'
 CSV_DIR = './data/alpaca/'
+STORE_DIR = './data/store/'  # columnar store of daily history, chrono & orders
+STORAGE_FORMATS = [ 'csv', 'columnar' ]
 LOG_DIR = './log/alpaca/'
+LOG_QUEUE_SIZE = 10000  # max nb of log messages waiting to be written
+LOG_FSYNC_INTERVAL = 5  # seconds between syncs of the log file to disk
 STRATEGY_PARAMS_PATH = './data/optim_ema_rsi_params.csv'
 USER_ZONE_NAME   = 'Europe/Paris'
-USER_ZONE_OFFSET = int( datetime.now( tz=ZoneInfo( USER_ZONE_NAME ) ).utcoffset().total_seconds() )
+# USER_ZONE_OFFSET (seconds) is computed from USER_ZONE_NAME when the library is loaded
 
 
 # ## Parameters
@@ -40,6 +44,11 @@ HIST_INTERVAL = 2 #15 # minutes
 HIST_MIN_DELAY = 15
 RSI_WINDOW_SIZE = 14  # = RSI window
 WINDOW_SIZE = RSI_WINDOW_SIZE  # debug value of moving window of historical data
+HIST_CAPACITY = 1024  # max nb of records of daily history kept in memory (older ones are flushed to disk)
+HIST_CACHE_ENABLED = True  # consolidated bars of prior sessions cached in the columnar store (warm start)
+MARKET_DATA_STREAM_ENABLED = True  # LTPs = closes of bars aggregated from the trades websocket (normal mode)
+MARKET_DATA_FEED = 'iex'  # 'iex' (Basic plan) or 'sip'
+BAR_CLOSE_GRACE  = 2  # seconds after the end of an interval before its bar is closed without any later trade
 
 
 # **Orders**
@@ -52,6 +61,15 @@ WINDOW_SIZE = RSI_WINDOW_SIZE  # debug value of moving window of historical data
 QUANTITY     = 1 # quantity of assets per ticker
 TARGET_PCT   = 4 # percentage of market price
 STOPLOSS_PCT = 2 # percentage
+ORDER_WORKERS = 8  # max nb of orders submitted concurrently
+API_MAX_REQUESTS_PER_MINUTE = 200  # Alpaca's "Basic" plan
+API_BURST = 2 * ORDER_WORKERS  # requests sent at once (e.g. orders of 1 crossover bar), at least ORDER_WORKERS
+ORDER_BOOK_RECONCILE_INTERVAL = 600  # seconds between reconciliations of the local order book with REST
+CANCEL_CONFIRM_TIMEOUT = 10  # seconds waited for canceled or liquidated orders to reach a terminal state
+TRADE_UPDATES_ENABLED = True  # order book updated by the trade updates websocket
+HTTP_POOL_SIZE = ORDER_WORKERS + 2  # keep-alive connections per API endpoint (orders, LTPs, brackets)
+HTTP_TIMEOUT   = ( 3.05, 10 )  # seconds : connect, read of each REST call
+HTTP_PREWARM_LEAD = 60  # seconds before opening time when connections to the API are opened
 
 
 # **Runtime**
@@ -71,8 +89,7 @@ IDLE_TIME = 1
 # In[13]:
 
 
-CHRONO_COLS = [ 'ticker', 'ltp_received_time', 'ltp_received_cpu', 'signal_generated_time', 
-                'signal_generated_cpu', 'order_submitted_time', 'order_submitted_cpu' ]
+LATENCY_LOG_TICKS = 30 # latency percentiles are logged every N ticks
 
 
 # ## Debug
@@ -91,6 +108,11 @@ mode, unit_test_enabled = 'normal', True
 
 clock_delay = 0 # Advances/retards clock of N seconds to reduce waiting time in debug mode
 
+# Replay mode : recorded prices (CSV file or date 'YYYYMMDD' of the columnar store), seeded variation (%)
+REPLAY_PATH = './data/alpaca/hist_20251010.csv'
+REPLAY_SEED = 0
+REPLAY_MAX_PCT_DELTA = 0
+
 
 # # Custom Functions
 # ## Log
@@ -12,7 +12,7 @@
 // 2. list functions in library
 // nm -g c_signal_generator.so | awk '/ T /{ print $3 }'
 
-// Check updated lines N° 143, 194, 220 which are related to NAN's replacement by 0.0
+// Check updated lines N° 119, 170, 192 which are related to NAN's replacement by 0.0
 
 
 // --- Helper Functions ---
@@ -46,52 +46,33 @@ void calculate_ema(const double *close_prices, int length, int window, double *o
 }
 
 // Function to calculate Relative Strength Index (RSI)
+// Gains & losses are computed on the fly : no temporary array is allocated
 void calculate_rsi(const double *close_prices, int length, int window, double *output) {
-    if (length <= 0 || window <= 0 || window > length) return;
-
-    // Temporary arrays for change, gain, and loss
-    double *change = (double*)malloc(length * sizeof(double));
-    double *gain = (double*)malloc(length * sizeof(double));
-    double *loss = (double*)malloc(length * sizeof(double));
-    
-    if (!change || !gain || !loss) {
-        // Handle memory allocation failure
-        free(change); free(gain); free(loss);
-        return;
-    }
+    // RSI needs window + 1 points to start
+    if (length <= 0 || window <= 0 || window >= length) return;
 
-    // 1. Calculate Price Change, Gain, and Loss
-    change[0] = NAN; 
-    gain[0] = 0.0;
-    loss[0] = 0.0;
-    for (int i = 1; i < length; i++) {
-        change[i] = close_prices[i] - close_prices[i-1];
-        gain[i] = fmax(0.0, change[i]);
-        loss[i] = fmax(0.0, -change[i]); // Note: Loss is always positive
-    }
-
-    // 2. Calculate Initial Average Gain (AVG) and Average Loss (AVL) (Simple Average)
+    // 1. Calculate Initial Average Gain (AVG) and Average Loss (AVL) (Simple Average)
+    //    Gain & Loss of price change : Loss is always positive
     double sum_gain = 0.0;
     double sum_loss = 0.0;
     for (int i = 1; i <= window; i++) {
-        sum_gain += gain[i];
-        sum_loss += loss[i];
+        double change = close_prices[i] - close_prices[i-1];
+        sum_gain += fmax(0.0, change);
+        sum_loss += fmax(0.0, -change);
     }
     double avg_gain = sum_gain / window;
     double avg_loss = sum_loss / window;
     
-    // 3. Calculate Subsequent AVG and AVL (Wilder's Smoothing)
+    // 2. Calculate Subsequent AVG and AVL (Wilder's Smoothing)
     double alpha_rsi = 1.0 / window; // Smoothing factor
-    
-    // Calculate the first RSI value
-    double rs = (avg_loss == 0.0) ? (avg_gain > 0.0 ? 1e10 : 0.0) : avg_gain / avg_loss;
-    output[window] = 100.0 - (100.0 / (1.0 + rs));
+    double rs;
 
     // Iterate for all subsequent points
     for (int i = window + 1; i < length; i++) {
+        double change = close_prices[i] - close_prices[i-1];
         // Wilder's smoothing: AVG_t = (AVG_y * (1 - alpha)) + (Gain_t * alpha)
-        avg_gain = (avg_gain * (1.0 - alpha_rsi)) + (gain[i] * alpha_rsi);
-        avg_loss = (avg_loss * (1.0 - alpha_rsi)) + (loss[i] * alpha_rsi);
+        avg_gain = (avg_gain * (1.0 - alpha_rsi)) + (fmax(0.0, change) * alpha_rsi);
+        avg_loss = (avg_loss * (1.0 - alpha_rsi)) + (fmax(0.0, -change) * alpha_rsi);
 
         // Calculate RS and RSI
         rs = (avg_loss == 0.0) ? (avg_gain > 0.0 ? 1e10 : 0.0) : avg_gain / avg_loss;
@@ -102,10 +83,6 @@ void calculate_rsi(const double *close_prices, int length, int window, double *o
     for (int i = 0; i <= window; i++) {
         output[i] = NAN;
     }
-    
-    free(change);
-    free(gain);
-    free(loss);
 }
 
 
@@ -229,3 +206,285 @@ void aggregate_final_signal(
     }
 }
 
+
+
+// --- Batch of Tickers exposed to Python ---
+
+// Generates signals of N tickers in 1 call, without any heap allocation
+// - close_prices : nb_tickers x nb_bars prices (1 contiguous row per ticker)
+// - lengths      : nb of most recent bars used per ticker (moving window size)
+// - *_out        : nb_tickers x nb_bars buffers owned & reused by the caller 
+//                  (bars before the moving window are set to NAN, signals to 0)
+// - last_signal_out : signal of the last bar per ticker
+void generate_signals_batch(
+    const double *close_prices,
+    int nb_tickers,
+    int nb_bars,
+    const int *lengths,
+    const double *slow_windows,
+    const double *fast_windows,
+    int rsi_window,
+    const double *long_entries,
+    const double *short_entries,
+    double *slow_ema_out,
+    double *fast_ema_out,
+    double *ema_signal_out,
+    double *rsi_out,
+    double *rsi_signal_out,
+    double *signal_out,
+    double *last_signal_out
+) {
+    for (int k = 0; k < nb_tickers; k++) {
+        int length = lengths[k];
+        if (length > nb_bars) length = nb_bars;
+        if (length < 0) length = 0;
+        int offset = nb_bars - length;
+        long row = (long)k * nb_bars;
+
+        // Reset reused buffers of the ticker
+        for (int i = 0; i < nb_bars; i++) {
+            slow_ema_out[row + i] = NAN;
+            fast_ema_out[row + i] = NAN;
+            ema_signal_out[row + i] = 0.0;
+            rsi_out[row + i] = NAN;
+            rsi_signal_out[row + i] = 0.0;
+            signal_out[row + i] = 0.0;
+        }
+        last_signal_out[k] = 0.0;
+        if (length == 0) continue;
+
+        // Same calls as the Python wrapper generate_signals_c() on the moving window
+        long start = row + offset;
+        generate_ema_crossover_signal(
+            close_prices + start, length, slow_windows[k], fast_windows[k],
+            ema_signal_out + start, slow_ema_out + start, fast_ema_out + start
+        );
+        generate_rsi_threshold_signal(
+            close_prices + start, length, rsi_window, long_entries[k], short_entries[k],
+            rsi_out + start, rsi_signal_out + start
+        );
+        aggregate_final_signal(
+            ema_signal_out + start, rsi_signal_out + start, length, signal_out + start
+        );
+        last_signal_out[k] = signal_out[row + nb_bars - 1];
+    }
+}
+
+
+// --- Streaming State exposed to Python ---
+
+// Per-ticker indicator state, seeded once then updated by 1 new price at a time
+// Each update is O(1) and returns the same values as the batch functions above 
+// would return for the last bar of the whole price series seen so far
+typedef struct {
+    // Parameters
+    int    slow_window;
+    int    fast_window;
+    int    rsi_window;
+    int    ema_enabled;      // 0 if slow_window <= fast_window (no EMA signal)
+    double long_entry;
+    double short_entry;
+    // Number of prices received so far & previous price
+    int    nb_prices;
+    double prev_price;
+    // EMA: sums of first prices (initial SMA), then current EMA values
+    double slow_sum;
+    double fast_sum;
+    double slow_ema;
+    double fast_ema;
+    // RSI: sums of first gains & losses, then Wilder's averages
+    double sum_gain;
+    double sum_loss;
+    double avg_gain;
+    double avg_loss;
+    // Previous EMA_Pre_Signal (NAN until both EMAs are available)
+    double prev_pre_signal;
+} signal_state;
+
+// Record written by each update (same order as DataFrame columns in Python wrapper)
+enum { REC_SLOW_EMA, REC_FAST_EMA, REC_EMA_SIGNAL, REC_RSI, REC_RSI_SIGNAL, REC_SIGNAL, REC_SIZE };
+
+// Initializes the state of 1 ticker with its strategy's parameters
+void signal_state_init(
+    signal_state *state,
+    double slow_window, 
+    double fast_window, 
+    int rsi_window, 
+    double long_entry, 
+    double short_entry
+) {
+    // Windows are truncated to int as in calls to calculate_ema()
+    state->slow_window = slow_window;
+    state->fast_window = fast_window;
+    state->rsi_window  = rsi_window;
+    state->ema_enabled = (slow_window > fast_window);
+    state->long_entry  = long_entry;
+    state->short_entry = short_entry;
+
+    state->nb_prices  = 0;
+    state->prev_price = NAN;
+    state->slow_sum   = 0.0;
+    state->fast_sum   = 0.0;
+    state->slow_ema   = NAN;
+    state->fast_ema   = NAN;
+    state->sum_gain   = 0.0;
+    state->sum_loss   = 0.0;
+    state->avg_gain   = NAN;
+    state->avg_loss   = NAN;
+    state->prev_pre_signal = NAN;
+}
+
+// Updates 1 EMA with a new price (SMA of the first window prices, then EMA)
+static double update_ema(double ema, double *sum, int nb_prices, int window, double close_price) {
+    if (window <= 0) return NAN;
+    if (nb_prices < window) {
+        *sum += close_price;
+        return (nb_prices == window - 1) ? *sum / window : NAN;
+    }
+    double alpha = 2.0 / (window + 1.0);
+    return (close_price * alpha) + (ema * (1.0 - alpha));
+}
+
+// Updates the state with a new price & writes the new record (REC_SIZE values)
+void signal_state_update(signal_state *state, double close_price, double *record_out) {
+    int i = state->nb_prices;   // index of the new price in the whole series
+
+    // 1. EMAs & EMA crossover signal
+    double ema_signal = NAN;
+    if (state->ema_enabled) {
+        state->slow_ema = update_ema(state->slow_ema, &state->slow_sum, i, state->slow_window, close_price);
+        state->fast_ema = update_ema(state->fast_ema, &state->fast_sum, i, state->fast_window, close_price);
+
+        if (isnan(state->slow_ema) || isnan(state->fast_ema)) {
+            ema_signal = 0.0;
+        } else {
+            double current_pre_signal;
+            if (state->fast_ema > state->slow_ema) {
+                current_pre_signal = 1.0;
+            } else if (state->slow_ema > state->fast_ema) {
+                current_pre_signal = -1.0;
+            } else {
+                current_pre_signal = 0.0;
+            }
+
+            if (isnan(state->prev_pre_signal) || state->prev_pre_signal == 0.0) {
+                ema_signal = 0.0;
+            } else if (current_pre_signal != state->prev_pre_signal) {
+                ema_signal = (current_pre_signal - state->prev_pre_signal > 0.0) ? 1.0 : -1.0;
+            } else {
+                ema_signal = 0.0;
+            }
+            state->prev_pre_signal = current_pre_signal;
+        }
+    }
+
+    // 2. RSI & RSI threshold signal
+    int window = state->rsi_window;
+    double rsi = NAN;
+    if (window > 0 && i > 0) {
+        double change = close_price - state->prev_price;
+        double gain = fmax(0.0, change);
+        double loss = fmax(0.0, -change);
+        if (i < window) {
+            state->sum_gain += gain;
+            state->sum_loss += loss;
+        } else if (i == window) {
+            state->sum_gain += gain;
+            state->sum_loss += loss;
+            state->avg_gain = state->sum_gain / window;
+            state->avg_loss = state->sum_loss / window;
+        } else {
+            double alpha_rsi = 1.0 / window;
+            state->avg_gain = (state->avg_gain * (1.0 - alpha_rsi)) + (gain * alpha_rsi);
+            state->avg_loss = (state->avg_loss * (1.0 - alpha_rsi)) + (loss * alpha_rsi);
+        }
+        if (i > window) {   // batch RSI is NaN up to index window (window + 1 points required)
+            double rs = (state->avg_loss == 0.0) ? (state->avg_gain > 0.0 ? 1e10 : 0.0) 
+                                                 : state->avg_gain / state->avg_loss;
+            rsi = 100.0 - (100.0 / (1.0 + rs));
+        }
+    }
+    double rsi_signal;
+    if (isnan(rsi)) {
+        rsi_signal = 0.0;
+    } else if (rsi < state->long_entry) {
+        rsi_signal = 1.0;
+    } else if (rsi > state->short_entry) {
+        rsi_signal = -1.0;
+    } else {
+        rsi_signal = 0.0;
+    }
+
+    // 3. Aggregated signal
+    double sum = ema_signal + rsi_signal;
+    double signal = (sum > 0.0) ? 1.0 : ((sum < 0.0) ? -1.0 : 0.0);
+
+    state->prev_price = close_price;
+    state->nb_prices++;
+
+    record_out[REC_SLOW_EMA]   = state->slow_ema;
+    record_out[REC_FAST_EMA]   = state->fast_ema;
+    record_out[REC_EMA_SIGNAL] = ema_signal;
+    record_out[REC_RSI]        = rsi;
+    record_out[REC_RSI_SIGNAL] = rsi_signal;
+    record_out[REC_SIGNAL]     = signal;
+}
+
+// Seeds the state with historical prices (record of the last price is written)
+void signal_state_seed(signal_state *state, const double *close_prices, int length, double *record_out) {
+    for (int i = 0; i < length; i++) {
+        signal_state_update(state, close_prices[i], record_out);
+    }
+}
+
+
+// --- Batch of Streaming States exposed to Python ---
+
+// Seeds the states of N tickers with their whole price window in 1 call
+// - close_prices : nb_tickers x nb_bars prices (1 contiguous row per ticker)
+// - start_rows   : 1st bar used per ticker (bars before it are ignored)
+// - states_out   : nb_tickers states, initialized here with the strategy's parameters
+// - records_out  : nb_tickers x REC_SIZE records of the last price (NAN before the first price)
+// - signals_out  : nb_tickers x nb_bars signals, or NULL if not needed
+// NaN prices (no trade) leave the state unchanged & give no new signal
+void signal_states_seed_batch(
+    const double *close_prices,
+    int nb_tickers,
+    int nb_bars,
+    const int *start_rows,
+    const double *slow_windows,
+    const double *fast_windows,
+    int rsi_window,
+    const double *long_entries,
+    const double *short_entries,
+    signal_state *states_out,
+    double *records_out,
+    double *signals_out
+) {
+    for (int k = 0; k < nb_tickers; k++) {
+        signal_state *state = states_out + k;
+        double *record = records_out + (long)k * REC_SIZE;
+        long row = (long)k * nb_bars;
+        signal_state_init(state, slow_windows[k], fast_windows[k], rsi_window, 
+                          long_entries[k], short_entries[k]);
+        for (int r = 0; r < REC_SIZE; r++) record[r] = NAN;
+
+        for (int i = 0; i < nb_bars; i++) {
+            double close_price = close_prices[row + i];
+            if (i < start_rows[k]) {
+                if (signals_out != NULL) signals_out[row + i] = 0.0;
+                continue;
+            }
+            if (isnan(close_price)) {   // signals of the last price aren't repeated
+                if (!isnan(record[REC_EMA_SIGNAL])) record[REC_EMA_SIGNAL] = 0.0;
+                if (!isnan(record[REC_RSI_SIGNAL])) record[REC_RSI_SIGNAL] = 0.0;
+                if (!isnan(record[REC_SIGNAL]))     record[REC_SIGNAL] = 0.0;
+            } else {
+                signal_state_update(state, close_price, record);
+            }
+            if (signals_out != NULL) {
+                signals_out[row + i] = isnan(record[REC_SIGNAL]) ? 0.0 : record[REC_SIGNAL];
+            }
+        }
+    }
+}
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 21 10:02:56 2025
+
+@author: jean vallee
+"""
+
+# asyncio runtime of the daily process
+# - ticks are scheduled on wall-clock boundaries (multiples of the interval since midnight UTC)
+# - blocking I/O calls run in threads, so concurrent calls of 1 tick last as long as the slowest one
+# - a virtual clock jumps instantly to the next tick (accelerated & replay modes)
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+
+class WallClock :
+    """
+    Real time, optionally shifted by now() (e.g. current_timestamp() with its clock_delay)
+    """
+    def __init__( self, now=None ) :
+        self.now = now if now is not None else ( lambda : datetime.now( timezone.utc ) )
+
+    async def sleep_until( self, target_time ) :
+        delay = ( target_time - self.now() ).total_seconds()
+        await asyncio.sleep( max( 0.0, delay ) )
+
+
+class VirtualClock :
+    """
+    Simulated time : sleep_until() advances the clock instead of waiting
+    - now     : returns the simulated time
+    - advance : advances the simulated time by N seconds (e.g. increments clock_delay)
+    """
+    def __init__( self, now=None, advance=None, start_time=None ) :
+        if now is None : # standalone clock
+            self.time = start_time or datetime.now( timezone.utc )
+            now = lambda : self.time
+            advance = lambda seconds : setattr( self, 'time', self.time + timedelta( seconds=seconds ) )
+        self.now, self.advance = now, advance
+
+    async def sleep_until( self, target_time ) :
+        delay = ( target_time - self.now() ).total_seconds()
+        if delay > 0 :
+            self.advance( delay )
+        await asyncio.sleep( 0 )  # let other tasks run
+
+
+# Next boundary of the interval strictly after current_time
+def get_next_tick( current_time, interval ) :
+    epoch = current_time.timestamp()
+    next_epoch = ( int( epoch // interval ) + 1 ) * interval
+    return datetime.fromtimestamp( next_epoch, tz=timezone.utc )
+
+
+# Run a blocking function in a thread
+async def run_blocking( function, *args, **kwargs ) :
+    return await asyncio.to_thread( function, *args, **kwargs )
+
+
+# Fetch results of blocking functions concurrently : { name : function } -> { name : result }
+async def gather_blocking( functions ) :
+    results = await asyncio.gather( *[ run_blocking( function ) for function in functions.values() ] )
+    return dict( zip( functions.keys(), results ) )
+
+
+async def run_session( clock, closing_time, interval, on_tick ) :
+    """
+    Calls the coroutine on_tick( tick_time ) on each interval boundary until closing_time.
+    A tick that lasts longer than the interval delays the next one, ticks are never run concurrently.
+    """
+    nb_ticks = 0
+    while clock.now() <= closing_time :
+        tick_time = get_next_tick( clock.now(), interval )
+        if tick_time > closing_time :
+            break
+        await clock.sleep_until( tick_time )
+        await on_tick( tick_time )
+        nb_ticks += 1
+    return nb_ticks
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+
+    def slow_io( name, seconds ) :  # stub of a blocking REST call
+        time.sleep( seconds )
+        return name
+
+    async def on_tick( tick_time ) :
+        start = time.perf_counter()
+        results = await gather_blocking( {
+            'positions' : lambda : slow_io( 'positions', 0.3 ),
+            'pending'   : lambda : slow_io( 'pending',   0.5 ),
+            'ltps'      : lambda : slow_io( 'ltps',      0.4 ) } )
+        print( f'{tick_time:%H:%M:%S} {list( results )} in {time.perf_counter() - start:.2f} s (serial : 1.20 s)' )
+
+    clock = VirtualClock( start_time=datetime( 2025, 10, 10, 19, 50, tzinfo=timezone.utc ) )
+    closing_time = datetime( 2025, 10, 10, 20, 0, tzinfo=timezone.utc )
+    nb_ticks = asyncio.run( run_session( clock, closing_time, 120, on_tick ) )
+    print( f'{nb_ticks} ticks run until {clock.now():%H:%M:%S}' )
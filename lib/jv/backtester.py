@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 29 10:04:51 2025
+
+@author: jean vallee
+"""
+
+# Offline backtest of the strategy on price matrices ( timestamps x tickers ), e.g. hist_*.csv files
+# - signals : same generator as live trading (C batch kernel, or signal_matrix.generate_signals_matrix())
+# - orders  : market entry at the bar's price + bracket target & stoploss of normal_place_order()
+#             ( get_bracket_prices() is shared by both )
+# - skip rule of get_tickers_to_process() : no new order for a ticker until its bracket is filled
+# - fills   : 1st later bar reaching the target (limit price) or the stoploss (bar's price),
+#             found by vectorized searches on the price column, so Python loops once per trade, not per bar
+
+import numpy as np
+import pandas as pd
+
+from lib.jv.signal_matrix import generate_signals_matrix
+
+MIN_OFFSET = 0.015   # Minimum delta compared to base price ~= LTP
+TRADES_COLS = [ 'ticker', 'side', 'entry_time', 'entry_price', 'target', 'stoploss',
+                'exit_time', 'exit_price', 'outcome', 'pnl' ]
+
+
+# Bracket prices of an order placed at current_price (signal +1 : buy, -1 : sell)
+def get_bracket_prices( current_price, signal, target_pct, stoploss_pct, min_offset=MIN_OFFSET ) :
+    target   = round( ( 1 + signal * target_pct   / 100) * current_price, 2 )
+    stoploss = round( ( 1 - signal * stoploss_pct / 100) * current_price - min_offset, 2 )
+    return target, stoploss
+
+
+# Index of the 1st bar >= start where mask_fn( prices ) is True (len( prices ) if none)
+def find_first( prices, start, mask_fn, chunk_size=256 ) :
+    while start < len( prices ) :
+        hits = np.flatnonzero( mask_fn( prices[ start:start + chunk_size ] ) )
+        if len( hits ) > 0 :
+            return start + int( hits[ 0 ] )
+        start += chunk_size
+        chunk_size *= 2   # long brackets are searched in growing chunks
+    return len( prices )
+
+
+# ( nb_bars x nb_tickers ) signals, by the C batch kernel ( chunks of tickers : bounded buffers ) or NumPy
+def get_signals( prices_2d, params_table, rsi_window, kernel='c', chunk_size=32 ) :
+    if kernel == 'c' :
+        from lib.jv.wrapper_c_signal_gen import SignalWorkspace, is_lib_available
+        if not is_lib_available() : kernel = 'numpy'
+    if kernel != 'c' :
+        return generate_signals_matrix( prices_2d, params_table, rsi_window, return_all=True )
+    nb_bars, nb_tickers = prices_2d.shape
+    signals = np.zeros( prices_2d.shape, dtype=np.int8 )
+    for j in range( 0, nb_tickers, chunk_size ) :
+        columns = slice( j, min( j + chunk_size, nb_tickers ) )
+        params_j = { col:np.asarray( values )[ columns ] for col, values in params_table.items() }
+        workspace = SignalWorkspace( columns.stop - j, nb_bars, params_j, rsi_window )
+        workspace.run( prices_2d[ :, columns ] )
+        signals[ :, columns ] = np.nan_to_num( workspace.outputs[ 'Signal' ].T )
+    return signals
+
+
+def run_backtest( prices_df, params_table, rsi_window=14, quantity=1, target_pct=4, stoploss_pct=2,
+                  min_offset=MIN_OFFSET, kernel='c' ) :
+    """
+    prices_df    : ( timestamps x tickers ) prices
+    params_table : mapping of 'slow_window', 'fast_window', 'long_entry', 'short_entry'
+                   to 1 value per column (e.g. STRATEGY_PARAMS.get_params_table( tickers ))
+    kernel       : 'c' (batch C kernel) or 'numpy' (signal_matrix), same signals
+    Returns the Pandas of trades (1 row per bracket order, outcome 'target', 'stoploss' or 'open')
+    """
+    prices_2d = prices_df.to_numpy( dtype=np.float64 )
+    signals   = get_signals( prices_2d, params_table, rsi_window, kernel )
+    timestamps, nb_bars = prices_df.index, len( prices_2d )
+
+    trades = []
+    for j, ticker in enumerate( prices_df.columns ) :
+        prices = prices_2d[ :, j ]
+        signal_rows = np.flatnonzero( signals[ :, j ] )
+        free_from = 0   # 1st bar without open position or pending order
+        while True :
+            k = np.searchsorted( signal_rows, free_from )
+            if k == len( signal_rows ) :
+                break
+            entry = signal_rows[ k ]
+            signal, entry_price = int( signals[ entry, j ] ), prices[ entry ]
+            if np.isnan( entry_price ) :
+                free_from = entry + 1
+                continue
+            target, stoploss = get_bracket_prices( entry_price, signal, target_pct, stoploss_pct, min_offset )
+            # 1st bar reaching target or stoploss (long : target above, stoploss below, short : reversed)
+            low, high = ( stoploss, target ) if signal == +1 else ( target, stoploss )
+            exit_row = find_first( prices, entry + 1, lambda p : ( p <= low ) | ( p >= high ) )
+            if exit_row == nb_bars : # still open at the end : valued at the last price
+                exit_row, exit_price, outcome = nb_bars - 1, prices[ ~np.isnan( prices ) ][ -1 ], 'open'
+            elif signal * ( prices[ exit_row ] - target ) >= 0 :
+                exit_price, outcome = target, 'target'
+            else :
+                exit_price, outcome = prices[ exit_row ], 'stoploss'
+            pnl = signal * ( exit_price - entry_price ) * quantity
+            trades.append( [ ticker, signal, timestamps[ entry ], entry_price, target, stoploss,
+                             timestamps[ exit_row ], exit_price, outcome, pnl ] )
+            free_from = exit_row + 1
+
+    return pd.DataFrame( trades, columns=TRADES_COLS )
+
+
+# Results per ticker : nb of trades per outcome, win rate & P&L
+def summarize( trades ) :
+    summary = trades.pivot_table( index='ticker', columns='outcome', values='pnl', aggfunc='count', fill_value=0 )
+    summary[ 'nb_trades' ] = summary.sum( axis=1 )
+    summary[ 'win_rate' ]  = trades.assign( win=trades[ 'pnl' ] > 0 ).groupby( 'ticker' )[ 'win' ].mean()
+    summary[ 'pnl' ]       = trades.groupby( 'ticker' )[ 'pnl' ].sum()
+    return summary
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+    from lib.jv.strategy_params import load_strategy_params
+
+    # 1 day of live history with optimized parameters
+    history = pd.read_csv( './data/alpaca/hist_20251010.csv', index_col='timestamp', parse_dates=True ).ffill()
+    params  = load_strategy_params( './data/optim_ema_rsi_params.csv', 14 )
+    tickers = [ t for t in history.columns if t in params ]
+    trades  = run_backtest( history[ tickers ], params.get_params_table( tickers ) )
+    print( summarize( trades ).round( 2 ) )
+    assert trades.equals( run_backtest( history[ tickers ], params.get_params_table( tickers ), kernel='numpy' ) )
+    assert trades.groupby( 'ticker' ).apply( lambda t : ( t[ 'entry_time' ].iloc[ 1: ].values >
+                                                          t[ 'exit_time' ].iloc[ :-1 ].values ).all() ).all()
+
+    # 1 year of 2-minute bars for 500 tickers (random walks)
+    rng = np.random.default_rng( 3 )
+    nb_bars, nb_tickers = 195 * 252, 500
+    prices_df = pd.DataFrame( 100 * np.exp( np.cumsum( rng.normal( 0, 1e-3, ( nb_bars, nb_tickers ) ), axis=0 ) ),
+                              index=pd.date_range( '2025-01-02', periods=nb_bars, freq='2min' ) )
+    params_table = { 'slow_window':rng.uniform( 50, 200, nb_tickers ), 'fast_window':rng.uniform( 5, 40, nb_tickers ),
+                     'long_entry' :rng.uniform( 15, 25, nb_tickers ), 'short_entry':rng.uniform( 75, 85, nb_tickers ) }
+    start = time.perf_counter()
+    trades = run_backtest( prices_df, params_table )
+    print( f'{nb_bars} bars x {nb_tickers} tickers : {len( trades )} trades backtested in {time.perf_counter() - start:.1f}s' )
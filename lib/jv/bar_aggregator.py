@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  3 09:31:22 2025
+
+@author: jean vallee
+"""
+
+# Streaming ingestion of trades, aggregated into bars of INTERVAL seconds per ticker
+# - trades of the websocket feed (AlpacaTradesFeed) update the open, high, low, close & volume of the current bar
+#   of their ticker : O(1) per trade, no Pandas
+# - a bar closes with the 1st trade of a later interval, or after a grace delay if no trade comes :
+#   wait_bar() returns it the moment it closes, as the 1-row Pandas of get_ltps()
+#   (close per ticker, last close carried forward for tickers without trade)
+# - bars are labelled by the start of their interval, as the REST bars of get_stock_bars() (warm start,
+#   reconciliation) : a streamed bar & the REST bar of the same interval have the same timestamp
+# - delays between the end of an interval & the close of its bar are recorded as 'close_bar' spans
+# - ReplayTradeServer : local websocket server speaking the feed's protocol, replays trades for tests & demos
+
+import asyncio
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+BAR_FIELDS = [ 'open', 'high', 'low', 'close', 'volume' ]
+MAX_CLOSED_BARS = 64   # closed bars kept in memory
+
+
+class BarAggregator :
+    """
+    Bars of interval seconds of tickers, built from their trades
+    """
+    def __init__( self, tickers, interval, latency=None ) :
+        self.tickers = list( tickers )
+        self.columns = { ticker:j for j, ticker in enumerate( self.tickers ) }
+        self.interval_ns = int( interval * 1e9 )
+        self.latency = latency   # LatencyRecorder of 'close_bar' delays (optional)
+        self.condition = threading.Condition()
+        nb_tickers = len( self.tickers )
+        # Current bar per ticker : lists are faster than NumPy for 1 update at a time
+        self.bar = { field:[ np.nan ] * nb_tickers for field in BAR_FIELDS }
+        self.last_close = [ np.nan ] * nb_tickers   # carried forward to bars without trade
+        self.start_ns = None   # start of the current interval (ns since epoch)
+        self.closed = deque( maxlen=MAX_CLOSED_BARS )   # ( start_ns, OHLCV arrays ) of closed bars
+        self.nb_trades, self.nb_late_trades = 0, 0
+
+    def seed( self, closes ) : # last known price per ticker (e.g. 1 REST request), before the 1st trade
+        with self.condition :
+            for ticker, price in closes.items() :
+                if ticker in self.columns :
+                    self.last_close[ self.columns[ ticker ] ] = float( price )
+
+    def on_trade( self, ticker, price, size, timestamp_ns ) :
+        j = self.columns.get( ticker )
+        if j is None :
+            return
+        with self.condition :
+            start_ns = timestamp_ns - timestamp_ns % self.interval_ns
+            if self.start_ns is None :
+                self.start_ns = start_ns
+            elif start_ns > self.start_ns :  # 1st trade of a later interval : previous bars are closed
+                self.close_until( start_ns )
+            elif start_ns < self.start_ns :  # bar already closed
+                self.nb_late_trades += 1
+                return
+            bar = self.bar
+            if bar[ 'open' ][ j ] != bar[ 'open' ][ j ] : # NaN : 1st trade of the bar
+                bar[ 'open' ][ j ] = bar[ 'high' ][ j ] = bar[ 'low' ][ j ] = price
+                bar[ 'volume' ][ j ] = size
+            else :
+                if price > bar[ 'high' ][ j ] : bar[ 'high' ][ j ] = price
+                if price < bar[ 'low' ][ j ] :  bar[ 'low' ][ j ] = price
+                bar[ 'volume' ][ j ] += size
+            bar[ 'close' ][ j ] = price
+            self.nb_trades += 1
+
+    def close_until( self, end_ns ) : # closes bars of intervals ending <= end_ns (lock held)
+        nb_bars = ( end_ns - self.start_ns ) // self.interval_ns
+        if nb_bars <= 0 :
+            return
+        closed_at = time.time_ns()
+        # Bar of the current interval
+        bar = { field:np.array( values, dtype=np.float64 ) for field, values in self.bar.items() }
+        bar[ 'close' ]  = np.where( np.isnan( bar[ 'close' ] ), self.last_close, bar[ 'close' ] )
+        bar[ 'volume' ] = np.nan_to_num( bar[ 'volume' ] )
+        self.last_close = bar[ 'close' ].tolist()
+        bars = [ ( self.start_ns, bar ) ]
+        # Next intervals without any trade (most recent ones only) : closes carried forward
+        for k in range( max( 1, nb_bars - MAX_CLOSED_BARS + 1 ), nb_bars ) :
+            empty_bar = { field:np.full( len( self.tickers ), np.nan ) for field in BAR_FIELDS }
+            empty_bar[ 'close' ], empty_bar[ 'volume' ] = bar[ 'close' ], np.zeros( len( self.tickers ) )
+            bars.append( ( self.start_ns + k * self.interval_ns, empty_bar ) )
+        for bar_start_ns, bar in bars :
+            self.closed.append( ( bar_start_ns, bar ) )
+            if self.latency is not None :
+                self.latency.record( 'close_bar', max( 0, closed_at - bar_start_ns - self.interval_ns ), 0 )
+        self.bar = { field:[ np.nan ] * len( self.tickers ) for field in BAR_FIELDS }
+        self.start_ns += nb_bars * self.interval_ns
+        self.condition.notify_all()
+
+    def close_due( self, now_ns, grace=0.0 ) : # closes bars ended more than grace seconds before now_ns
+        with self.condition :
+            end_ns = now_ns - int( grace * 1e9 )
+            if self.start_ns is None :
+                self.start_ns = end_ns - end_ns % self.interval_ns
+            else :
+                self.close_until( end_ns - end_ns % self.interval_ns )
+
+    def get_bar( self, bar_time ) : # closed bar starting at bar_time : { field : array } or None
+        bar_start_ns = pd.Timestamp( bar_time ).value
+        for start_ns, bar in reversed( self.closed ) :
+            if start_ns == bar_start_ns :
+                return bar
+            if start_ns < bar_start_ns :
+                break
+        return None
+
+    def wait_bar( self, bar_time, grace=2.0 ) :
+        """
+        Closes of the bar starting at bar_time, as soon as it's closed by a later trade,
+        at the latest grace seconds after its end (wall clock) : 1-row Pandas ( index = bar_time, columns = tickers )
+        """
+        bar_time = pd.Timestamp( bar_time )
+        deadline_ns = bar_time.value + self.interval_ns + int( grace * 1e9 )
+        with self.condition :
+            while ( bar := self.get_bar( bar_time ) ) is None :
+                wait_time = ( deadline_ns - time.time_ns() ) / 1e9
+                if wait_time <= 0 : # no trade since the end of the interval
+                    self.close_due( deadline_ns, grace )
+                    bar = self.get_bar( bar_time )
+                    break
+                self.condition.wait( wait_time )
+        closes = bar[ 'close' ] if bar is not None else np.array( self.last_close )
+        return pd.DataFrame( [ closes ], index=pd.DatetimeIndex( [ bar_time ], name='timestamp' ),
+                             columns=pd.Index( self.tickers, name='symbol' ) )
+
+    def to_frame( self ) : # closed bars in memory : Pandas ( timestamps x ( field, ticker ) )
+        with self.condition :
+            closed = list( self.closed )
+        index = pd.to_datetime( [ start_ns for start_ns, bar in closed ], utc=True ).rename( 'timestamp' )
+        values = [ np.concatenate( [ bar[ field ] for field in BAR_FIELDS ] ) for start_ns, bar in closed ]
+        columns = pd.MultiIndex.from_product( [ BAR_FIELDS, self.tickers ], names=[ 'field', 'symbol' ] )
+        return pd.DataFrame( values, index=index, columns=columns )
+
+
+# --- Feeds ---
+
+class AlpacaTradesFeed :
+    """
+    Websocket feed of trades of the market data stream (raw messages : no conversion to pydantic models)
+    """
+    def __init__( self, api_key, api_secret, feed='iex', url_override=None ) :
+        from alpaca.data.live.stock import StockDataStream   # imported only when used
+        from alpaca.data.enums import DataFeed
+        self.stream = StockDataStream( api_key, api_secret, raw_data=True, feed=DataFeed( feed ),
+                                       url_override=url_override )
+        self.thread = None
+
+    def start( self, aggregator ) :
+        async def on_trade( trade ) :
+            aggregator.on_trade( trade[ 'S' ], trade[ 'p' ], trade[ 's' ], trade[ 't' ].to_unix_nano() )
+        self.stream.subscribe_trades( on_trade, *aggregator.tickers )
+        self.thread = threading.Thread( target=self.stream.run, daemon=True, name='market_data' )
+        self.thread.start()
+
+    def stop( self, timeout=5.0 ) :
+        self.stream.stop()
+        if self.thread is not None :
+            self.thread.join( timeout )
+
+
+class ReplayTradeServer :
+    """
+    Local websocket server with the protocol of the market data stream (msgpack messages) :
+    replays trades ( delay in seconds after subscription, ticker, price, size ), timestamped at their sending time
+    """
+    def __init__( self, trades, host='127.0.0.1', port=0 ) :
+        self.trades, self.host, self.port = sorted( trades, key=lambda trade : trade[ 0 ] ), host, port
+        self.loop, self.server, self.thread = None, None, None
+        self.ready = threading.Event()
+        self.done  = threading.Event()   # all trades sent
+
+    @property
+    def url( self ) :
+        return f'ws://{self.host}:{self.port}'
+
+    async def handle( self, websocket ) :
+        import msgpack
+        await websocket.send( msgpack.packb( [ { 'T':'success', 'msg':'connected' } ] ) )
+        auth = msgpack.unpackb( await websocket.recv() )
+        if auth.get( 'action' ) != 'auth' :
+            return
+        await websocket.send( msgpack.packb( [ { 'T':'success', 'msg':'authenticated' } ] ) )
+        subscription = msgpack.unpackb( await websocket.recv() )
+        tickers = set( subscription.get( 'trades', [] ) )
+        await websocket.send( msgpack.packb( [ { 'T':'subscription', 'trades':sorted( tickers ) } ] ) )
+        start = time.perf_counter()
+        for trade_id, ( delay, ticker, price, size ) in enumerate( self.trades ) :
+            if ticker not in tickers :
+                continue
+            await asyncio.sleep( max( 0.0, start + delay - time.perf_counter() ) )
+            message = { 'T':'t', 'S':ticker, 'p':price, 's':size, 'i':trade_id, 'x':'V', 'z':'C', 'c':[ '@' ],
+                        't':msgpack.Timestamp.from_unix_nano( time.time_ns() ) }
+            await websocket.send( msgpack.packb( [ message ] ) )
+        self.done.set()
+        await websocket.wait_closed()
+
+    def start( self ) :
+        from websockets.asyncio.server import serve   # imported only when used
+        async def run() :
+            self.loop = asyncio.get_running_loop()
+            async with serve( self.handle, self.host, self.port ) as self.server :
+                self.port = self.server.sockets[ 0 ].getsockname()[ 1 ]
+                self.ready.set()
+                await self.server.serve_forever()
+        self.thread = threading.Thread( target=asyncio.run, args=( run(), ), daemon=True, name='replay_trades' )
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop( self ) :
+        self.loop.call_soon_threadsafe( self.server.close )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    from lib.jv.latency import LatencyRecorder
+
+    # Trades of 3 tickers on 1-second bars, TSLA silent during the 2nd interval
+    interval, rng = 1.0, np.random.default_rng( 0 )
+    start_delay = interval - time.time() % interval + 0.2   # 1st trade 0.2 s after a boundary
+    trades = [ ( start_delay + k * 0.05, ticker, round( 100 + rng.normal(), 2 ), int( rng.integers( 1, 100 ) ) )
+               for k in range( 80 ) for ticker in [ 'NVDA', 'AAPL', 'TSLA' ]
+               if not ( ticker == 'TSLA' and 20 <= k < 40 ) ]
+    server = ReplayTradeServer( trades ).start()
+
+    latency = LatencyRecorder()
+    aggregator = BarAggregator( [ 'NVDA', 'AAPL', 'TSLA', 'MSFT' ], interval, latency )
+    aggregator.seed( { 'MSFT':500.0 } )   # no trade : closes carried forward
+    feed = AlpacaTradesFeed( 'key', 'secret', url_override=server.url )
+    feed.start( aggregator )
+
+    # Bars are returned as soon as they close, as the signal engine would wait for them
+    bars, delays = [], []
+    bar_time = pd.Timestamp( ( time.time_ns() // int( interval * 1e9 ) ) * int( interval * 1e9 ), tz='UTC' )
+    for k in range( 4 ) :   # bars labelled by their start : delays from their end
+        bar_time += pd.Timedelta( seconds=interval )
+        bars.append( aggregator.wait_bar( bar_time, grace=0.5 ) )
+        delays.append( ( time.time_ns() - bar_time.value ) / 1e6 - 1000 * interval )
+    server.done.wait( 10 )
+    feed.stop()
+    server.stop()
+
+    bars = pd.concat( bars )
+    print( bars.round( 2 ) )
+    print( 'Delays after bar close (ms) :', [ round( delay, 1 ) for delay in delays ] )
+    print( latency.get_summary() )
+    ohlcv = aggregator.to_frame()
+    assert ( bars[ 'MSFT' ] == 500.0 ).all() and bars.notna().all().all()
+    assert ( ohlcv.loc[ bars.index, 'close' ].to_numpy() == bars.to_numpy() ).all()
+    assert aggregator.nb_late_trades == 0 and max( delays ) < 1000 * interval
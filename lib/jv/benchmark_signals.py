@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Nov  1 09:47:35 2025
+
+@author: jean vallee
+"""
+
+# Micro-benchmarks of the signal generator paths, over a grid of window sizes (bars) x nb of tickers
+# - paths : pandas/ta (signal_generator), Python streaming state (signal_state), 
+#           matrix of streaming states (signal_matrix, seeded in 1 C call), 
+#           C per ticker (generate_signals_c) & C batch (SignalWorkspace)
+# - per cell & path : throughput (bars x tickers per second) of the best of nb_repeats repeats, each repeat
+#   running all calls as many rounds as needed to last MIN_REPEAT_SECONDS (as timeit's autorange),
+#   latency of each call (p50, p99, max, latency.LatencyHistogram) & allocations (tracemalloc peak,
+#   in a separate run : tracing slows the calls)
+# - last-bar records of each path are checked against the C per-ticker path : identical for the SMA-seeded
+#   paths, within TA_TOLERANCE after a warm-up for ta (its EMA & RSI are seeded differently)
+# - throughputs are saved as baselines per machine (JSON file under version control, 1 entry per CPU) :
+#   a later run fails if a path gets slower than its baseline by more than REGRESSION_TOLERANCE,
+#   or if a cell has no baseline for this machine (--save records them). Cells below the tolerance are 
+#   measured again up to REGRESSION_RETRIES times first : a shared CPU drifts by minutes, a regression persists
+# Run from root folder : python -m lib.jv.benchmark_signals [--full] [--save]
+
+import os
+import json
+import time
+import platform
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from lib.jv.latency import LatencyHistogram
+from lib.jv.signal_matrix import SignalStateMatrix, PARAMS_COLS
+from lib.jv.signal_state import SignalState, RECORD_COLS
+
+PATHS = [ 'pandas_ta', 'python', 'numpy', 'c', 'c_batch' ]
+REFERENCE_PATH = 'c'
+BARS_GRID    = [ 14, 100, 1000, 10000 ]
+TICKERS_GRID = [ 1, 10, 100 ]         # --full : up to 1000 tickers
+FULL_TICKERS_GRID = [ 1, 10, 100, 1000 ]
+BASELINES_PATH = './data/benchmark_baselines.json'
+
+EXACT_TOLERANCE = 1e-9                # relative, paths seeded as the C kernel
+TA_TOLERANCE    = 1e-4                # absolute, ta after warm-up
+TA_WARMUP       = 10                  # ta is checked if nb of bars >= TA_WARMUP x slowest window
+REGRESSION_TOLERANCE = 0.3            # max loss of throughput vs baseline
+MIN_REPEAT_SECONDS   = 1.0            # min duration of 1 repeat : several calls even for slow cells (1 call is noise-bound)
+REGRESSION_RETRIES   = 3              # new measures of a cell below the tolerance, before it counts as a regression
+
+
+# --- Paths ---
+# Each path returns the list of its calls for a cell : 1 call per ticker or 1 call for all tickers,
+# each call returning the ( nb_tickers_of_call x RECORD_COLS ) records of the last bar
+
+def get_calls( path, prices_2d, params_2d, rsi_window ) :
+    columns = range( prices_2d.shape[ 1 ] )
+    if path == 'pandas_ta' :
+        from lib.jv.signal_generator import generate_signal
+        return [ lambda j=j : generate_signal( pd.DataFrame( { 'Close':prices_2d[ :, j ] } ), rsi_window,
+                                               params_2d[ j ], False, 'Close' )[ RECORD_COLS ].to_numpy()[ -1: ]
+                 for j in columns ]
+    if path == 'python' :
+        return [ lambda j=j : [ SignalState( rsi_window, params_2d[ j ] ).seed( prices_2d[ :, j ].tolist() ) ]
+                 for j in columns ]
+    params_table = { col:params_2d[ :, k ] for k, col in enumerate( PARAMS_COLS ) }
+    if path == 'numpy' :
+        def run_matrix() :
+            states = SignalStateMatrix( rsi_window, params_table )
+            states.seed( prices_2d )
+            return states.record.T
+        return [ run_matrix ]
+    from lib.jv.wrapper_c_signal_gen import generate_signals_c, SignalWorkspace
+    if path == 'c' :
+        return [ lambda j=j : generate_signals_c( pd.DataFrame( { 'Close':prices_2d[ :, j ] } ), rsi_window,
+                                                  params_2d[ j ], False )[ RECORD_COLS ].to_numpy()[ -1: ]
+                 for j in columns ]
+    if path == 'c_batch' :
+        workspace = SignalWorkspace( prices_2d.shape[ 1 ], len( prices_2d ), params_table, rsi_window )
+        def run_batch() :
+            workspace.run( prices_2d )
+            return np.column_stack( [ workspace.outputs[ col ][ :, -1 ] for col in RECORD_COLS ] )
+        return [ run_batch ]
+    raise ValueError( f'Unknown path : {path}' )
+
+
+# --- Measures ---
+
+def run_calls( calls ) : # records of all tickers
+    return np.vstack( [ call() for call in calls ] ).astype( np.float64 )
+
+def run_rounds( calls, nb_rounds, histogram ) : # duration (ns) of nb_rounds rounds of all calls
+    elapsed_ns = 0
+    for round_i in range( nb_rounds ) :
+        for call in calls :
+            start = time.perf_counter_ns()
+            call()
+            duration = time.perf_counter_ns() - start
+            histogram.record( duration )
+            elapsed_ns += duration
+    return elapsed_ns
+
+def get_nb_rounds( calls, histogram, min_seconds=MIN_REPEAT_SECONDS ) : # 1, 2, 5, 10, 20... as timeit's autorange
+    for magnitude in ( 10 ** k for k in range( 10 ) ) :
+        for nb_rounds in [ magnitude, 2 * magnitude, 5 * magnitude ] :
+            if run_rounds( calls, nb_rounds, histogram ) >= min_seconds * 1e9 :
+                return nb_rounds
+    return nb_rounds
+
+def measure_path( path, prices_2d, params_2d, rsi_window, nb_repeats=5 ) :
+    calls = get_calls( path, prices_2d, params_2d, rsi_window )
+    records = run_calls( calls )   # warm-up (lazy imports, C library) & records to check
+
+    histogram = LatencyHistogram()
+    nb_rounds = get_nb_rounds( calls, histogram )
+    best_ns = min( run_rounds( calls, nb_rounds, histogram ) for repeat in range( nb_repeats ) )
+
+    tracemalloc.start()
+    run_calls( calls )
+    peak_bytes = tracemalloc.get_traced_memory()[ 1 ]
+    tracemalloc.stop()
+
+    nb_bars, nb_tickers = prices_2d.shape
+    result = { 'path':path, 'nb_bars':nb_bars, 'nb_tickers':nb_tickers, 'nb_calls':histogram.count,
+               'nb_rounds':nb_rounds, 'throughput':nb_bars * nb_tickers * nb_rounds / ( best_ns / 1e9 ),
+               'call_p50_us':histogram.get_percentile( 50 ) / 1e3, 'call_p99_us':histogram.get_percentile( 99 ) / 1e3,
+               'call_max_us':histogram.max / 1e3, 'peak_kb':peak_bytes / 1024 }
+    return result, records
+
+
+# Max error vs reference records : None if not comparable (ta before its warm-up)
+def check_records( path, records, reference, nb_bars, params_2d ) :
+    if path == 'pandas_ta' :
+        if nb_bars < TA_WARMUP * params_2d[ :, 0 ].max() :
+            return None
+        error = np.nanmax( np.abs( records - reference ) )
+        assert np.array_equal( np.isnan( records ), np.isnan( reference ) ), f'{path} : NaNs differ'
+        assert error <= TA_TOLERANCE, f'{path} : max error {error} > {TA_TOLERANCE}'
+        return error
+    assert np.allclose( records, reference, rtol=EXACT_TOLERANCE, atol=0, equal_nan=True ), f'{path} : records differ'
+    return float( np.nanmax( np.abs( records - reference ), initial=0 ) )
+
+
+def get_random_cell( nb_bars, nb_tickers, seed=0 ) : # random walks & integer windows (same EMAs for ta & C)
+    rng = np.random.default_rng( seed )
+    prices_2d = 100 * np.exp( np.cumsum( rng.normal( 0, 1e-3, ( nb_bars, nb_tickers ) ), axis=0 ) )
+    params_2d = np.column_stack( [ rng.integers( 20, 61, nb_tickers ), rng.integers( 5, 16, nb_tickers ),
+                                   rng.uniform( 25, 35, nb_tickers ), rng.uniform( 65, 75, nb_tickers ) ] )
+    return prices_2d, params_2d.astype( np.float64 )
+
+
+def run_benchmarks( bars_grid=BARS_GRID, tickers_grid=TICKERS_GRID, paths=PATHS, rsi_window=14, nb_repeats=5,
+                    log=print ) :
+    results = []
+    for nb_bars in bars_grid :
+        for nb_tickers in tickers_grid :
+            prices_2d, params_2d = get_random_cell( nb_bars, nb_tickers )
+            reference = run_calls( get_calls( REFERENCE_PATH, prices_2d, params_2d, rsi_window ) )
+            for path in paths :
+                result, records = measure_path( path, prices_2d, params_2d, rsi_window, nb_repeats )
+                result[ 'max_error' ] = check_records( path, records, reference, nb_bars, params_2d )
+                results.append( result )
+            log( f'{nb_bars:>6} bars x {nb_tickers:>4} tickers : ' +
+                 ', '.join( f'{r[ "path" ]} {r[ "throughput" ]:.3g}/s' for r in results[ -len( paths ): ] ) )
+    return pd.DataFrame( results )
+
+
+# --- Baselines ---
+
+def get_key( result ) :
+    return f'{result[ "path" ]}|{result[ "nb_bars" ]}|{result[ "nb_tickers" ]}'
+
+def get_machine_key() : # e.g. 'x86_64|Intel(R) Xeon(R) CPU @ 2.20GHz|8' : throughputs depend on the CPU
+    cpu_name = platform.processor()
+    try :
+        with open( '/proc/cpuinfo' ) as cpuinfo_file :
+            cpu_name = next( ( line.split( ':', 1 )[ 1 ].strip() for line in cpuinfo_file
+                               if line.startswith( 'model name' ) ), cpu_name )
+    except OSError : # not Linux
+        pass
+    return f'{platform.machine()}|{cpu_name}|{os.cpu_count()}'
+
+def load_all_baselines( baselines_path=BASELINES_PATH ) : # { machine key:{ cell key:throughput } }
+    try :
+        with open( baselines_path ) as baselines_file : return json.load( baselines_file )
+    except ( OSError, ValueError ) :
+        return {}
+
+def load_baselines( baselines_path=BASELINES_PATH, machine_key=None ) : # baselines of this machine
+    return load_all_baselines( baselines_path ).get( machine_key or get_machine_key(), {} )
+
+def save_baselines( results, baselines_path=BASELINES_PATH, machine_key=None ) :
+    machine_key = machine_key or get_machine_key()
+    all_baselines = load_all_baselines( baselines_path )
+    all_baselines[ machine_key ] = { **all_baselines.get( machine_key, {} ),
+                  **{ get_key( result ):result[ 'throughput' ] for result in results.to_dict( 'records' ) } }
+    with open( baselines_path + '.tmp', 'w' ) as baselines_file : 
+        json.dump( all_baselines, baselines_file, indent=1, sort_keys=True )
+    os.replace( baselines_path + '.tmp', baselines_path )
+
+def compare_baselines( results, baselines ) : # ratio of throughput vs baseline (NaN : no baseline)
+    return results.apply( lambda result : result[ 'throughput' ] / baselines.get( get_key( result ), np.nan ), axis=1 )
+
+# Cells below the tolerance measured again (best throughput kept) : returns the regressions left
+def remeasure_regressions( results, baselines, nb_retries=REGRESSION_RETRIES, rsi_window=14, nb_repeats=5, log=print ) :
+    is_regression = lambda : results[ 'vs_baseline' ] < 1 - REGRESSION_TOLERANCE
+    for retry in range( nb_retries ) :
+        for i in results.index[ is_regression() ] :
+            path, nb_bars, nb_tickers = results.loc[ i, [ 'path', 'nb_bars', 'nb_tickers' ] ]
+            prices_2d, params_2d = get_random_cell( nb_bars, nb_tickers )
+            throughput = measure_path( path, prices_2d, params_2d, rsi_window, nb_repeats )[ 0 ][ 'throughput' ]
+            results.loc[ i, 'throughput' ] = max( results.loc[ i, 'throughput' ], throughput )
+            results.loc[ i, 'vs_baseline' ] = results.loc[ i, 'throughput' ] / baselines[ get_key( results.loc[ i ] ) ]
+            log( f'Retry {retry + 1} of {path} ({nb_bars} bars x {nb_tickers} tickers) : '
+                 f'{results.loc[ i, "vs_baseline" ]:.2f} x baseline' )
+    return results[ is_regression() ]
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import sys
+
+    tickers_grid = FULL_TICKERS_GRID if '--full' in sys.argv else TICKERS_GRID
+    results = run_benchmarks( tickers_grid=tickers_grid )
+    baselines = load_baselines()
+    results[ 'vs_baseline' ] = compare_baselines( results, baselines )
+    with pd.option_context( 'display.width', 200, 'display.max_rows', None ) :
+        print( results.round( 3 ).to_string( index=False ) )
+
+    if '--save' in sys.argv :
+        save_baselines( results )
+        print( f'Baselines of {get_machine_key()} saved in {BASELINES_PATH}' )
+    else :
+        missing = results[ results[ 'vs_baseline' ].isna() ]
+        assert len( missing ) == 0, f'No baseline for {len( missing )} cells on {get_machine_key()} ' \
+            f'in {BASELINES_PATH}, record them with --save :\n{missing[ [ "path", "nb_bars", "nb_tickers" ] ].to_string( index=False )}'
+        regressions = remeasure_regressions( results, baselines )
+        assert len( regressions ) == 0, f'Throughput regressions :\n{regressions.to_string( index=False )}'
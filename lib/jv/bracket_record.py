@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Nov  6 09:04:38 2025
+
+@author: jean vallee
+"""
+
+# Bracket orders as lightweight records, instead of 1 Pandas built per order submitted
+# - BracketRecord : parent (entry) order + take-profit (limit) leg + stop-loss (stop) leg, fields in __slots__,
+#   built straight from the submit response (pydantic Order, dict or replayed SimpleNamespace)
+# - check() : consistency of the bracket from the response only, no REST request
+#   (2 legs of the opposite side, same symbol & qty, target & stoploss on each side of the entry)
+# - brackets_to_frame() : many brackets converted to 1 Pandas (1 row per order) only when a report needs one
+
+import pandas as pd
+
+from lib.jv.order_book import enum_value, get_field
+
+FRAME_COLUMNS   = [ 'symbol', 'type', 'status', 'position_intent', 'limit_price', 'stop_price',
+                    'qty', 'created_at', 'expires_at', 'time_in_force' ]   # as check_bracket()
+FAILED_STATUSES = { 'rejected', 'canceled', 'expired' }
+
+
+class OrderRecord :
+    __slots__ = ( 'id', 'symbol', 'type', 'side', 'status', 'position_intent', 'limit_price', 'stop_price',
+                  'qty', 'filled_avg_price', 'created_at', 'expires_at', 'time_in_force' )
+
+    def __init__( self, order ) : # pydantic model, dict or SimpleNamespace
+        self.id = str( get_field( order, 'id' ) )
+        self.symbol = get_field( order, 'symbol' )
+        for name in [ 'type', 'side', 'status', 'position_intent', 'time_in_force' ] :
+            setattr( self, name, enum_value( get_field( order, name ) ) )
+        for name in [ 'limit_price', 'stop_price', 'qty', 'filled_avg_price' ] :
+            value = get_field( order, name )
+            setattr( self, name, float( value ) if value is not None else None )
+        self.created_at, self.expires_at = get_field( order, 'created_at' ), get_field( order, 'expires_at' )
+
+    def to_row( self ) :
+        return [ getattr( self, name ) for name in FRAME_COLUMNS ]
+
+
+class BracketRecord :
+    __slots__ = ( 'parent', 'take_profit', 'stop_loss' )
+
+    def __init__( self, parent, take_profit=None, stop_loss=None ) : # OrderRecord's
+        self.parent, self.take_profit, self.stop_loss = parent, take_profit, stop_loss
+
+    @classmethod
+    def from_order( cls, order ) : # submit response (parent order with its legs)
+        bracket = cls( OrderRecord( order ) )
+        for leg in get_field( order, 'legs' ) or [] :
+            leg = OrderRecord( leg )
+            if leg.type == 'limit' :
+                bracket.take_profit = leg
+            elif leg.type in [ 'stop', 'stop_limit' ] :
+                bracket.stop_loss = leg
+        return bracket
+
+    @property
+    def legs( self ) :
+        return [ leg for leg in [ self.take_profit, self.stop_loss ] if leg is not None ]
+
+    def check( self ) : # list of inconsistencies, empty if the bracket is consistent
+        parent, errors = self.parent, []
+        if parent.status in FAILED_STATUSES :
+            errors.append( f'parent order {parent.status}' )
+        if self.take_profit is None or self.stop_loss is None :
+            errors.append( 'missing take-profit or stop-loss leg' )
+            return errors
+        target, stoploss = self.take_profit.limit_price, self.stop_loss.stop_price
+        for leg in self.legs :
+            if leg.side == parent.side :
+                errors.append( f'{leg.type} leg on the same side as the parent ({leg.side})' )
+            if leg.symbol != parent.symbol or leg.qty != parent.qty :
+                errors.append( f'{leg.type} leg for {leg.qty} {leg.symbol} instead of {parent.qty} {parent.symbol}' )
+        if target is None or stoploss is None :
+            errors.append( 'missing target or stoploss price' )
+        else :
+            direction = +1 if parent.side == 'buy' else -1
+            if direction * ( target - stoploss ) <= 0 :
+                errors.append( f'target {target} & stoploss {stoploss} inverted for a {parent.side} order' )
+            entry = parent.filled_avg_price
+            if entry is not None and not ( direction * ( stoploss - entry ) < 0 < direction * ( target - entry ) ) :
+                errors.append( f'entry {entry} outside of [ stoploss {stoploss}, target {target} ]' )
+        return errors
+
+    def to_rows( self ) : # ( ids, rows ) of the parent & its legs
+        orders = [ self.parent ] + self.legs
+        return [ order.id for order in orders ], [ order.to_row() for order in orders ]
+
+
+def brackets_to_frame( brackets ) : # 1 Pandas (index = id) of the parents & legs of many brackets
+    ids, rows = [], []
+    for bracket in brackets :
+        bracket_ids, bracket_rows = bracket.to_rows()
+        ids += bracket_ids
+        rows += bracket_rows
+    return pd.DataFrame( rows, index=pd.Index( ids, name='id' ), columns=FRAME_COLUMNS )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+
+    # Submit responses of brackets as returned by the REST API (legs nested in the parent order)
+    def new_response( i, side, entry, target, stoploss ) :
+        now = datetime.now( timezone.utc )
+        leg_side = 'sell' if side == 'buy' else 'buy'
+        new_order = lambda suffix, order_type, order_side, **fields : SimpleNamespace(
+            id=f'order-{i}{suffix}', symbol=f'T{i % 50}', type=f'OrderType.{order_type.upper()}', side=order_side,
+            status='OrderStatus.NEW', position_intent=None, qty='1', created_at=now, expires_at=None,
+            time_in_force='TimeInForce.GTC', **fields )
+        legs = [ new_order( '-target', 'limit', leg_side, limit_price=str( target ), stop_price=None, legs=None ),
+                 new_order( '-stoploss', 'stop', leg_side, limit_price=None, stop_price=str( stoploss ), legs=None ) ]
+        return new_order( '', 'market', side, limit_price=None, stop_price=None, filled_avg_price=str( entry ),
+                          legs=legs )
+
+    responses = [ new_response( i, 'buy', 100, 100.4, 99.8 ) for i in range( 1000 ) ]
+    responses[ 1 ] = new_response( 1, 'sell', 100, 100.4, 99.8 )   # target & stoploss inverted
+    responses[ 2 ].legs = responses[ 2 ].legs[ :1 ]                # stop-loss leg missing
+
+    # Per-order Pandas (previous check_bracket(), without its REST request) vs records
+    start = time.perf_counter()
+    for order in responses :
+        frame = pd.concat( [ pd.DataFrame( [ vars( order ) ] ).set_index( 'id' )[ FRAME_COLUMNS ],
+                             pd.DataFrame( [ vars( leg ) for leg in order.legs ] ).set_index( 'id' )[ FRAME_COLUMNS ] ] )
+    pandas_time = time.perf_counter() - start
+    start = time.perf_counter()
+    brackets = [ BracketRecord.from_order( order ) for order in responses ]
+    errors = { b.parent.id:problems for b in brackets for problems in [ b.check() ] if len( problems ) > 0 }
+    record_time = time.perf_counter() - start
+    start = time.perf_counter()
+    report = brackets_to_frame( brackets )
+    frame_time = time.perf_counter() - start
+
+    assert list( errors ) == [ 'order-1', 'order-2' ] and len( report ) == 3 * 1000 - 1
+    assert report.loc[ 'order-0-target', 'limit_price' ] == 100.4 and report.loc[ 'order-0', 'type' ] == 'market'
+    print( f'{len( responses )} brackets : per-order Pandas {pandas_time * 1e3:.0f} ms, '
+           f'records & checks {record_time * 1e3:.1f} ms, 1 report Pandas {frame_time * 1e3:.1f} ms' )
+    print( errors )
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Nov  4 09:12:53 2025
+
+@author: jean vallee
+"""
+
+# Bulk cancellation of orders, instead of 1 cancellation followed by 1 listing of pending orders per order
+# - orders to cancel are given as 1 snapshot (Pandas indexed by id)
+# - cancellations are sent concurrently by a bounded pool of threads, each request going through
+#   the shared rate budget, or by 1 request if all open orders are canceled (DELETE /orders)
+# - terminal states are confirmed by trade update events when available (e.g. order book), else by batched
+#   status queries : 1 listing per round for all orders not confirmed yet
+# - outcome per order : request sent or failed, last status, confirmation & its delay
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+TERMINAL_STATUSES = { 'canceled', 'filled', 'expired', 'rejected', 'replaced', 'done_for_day' }
+OUTCOME_COLUMNS   = [ 'symbol', 'request', 'status', 'confirmed', 'seconds', 'error' ]
+
+
+class BulkOrders :
+
+    def __init__( self, cancel_order, list_statuses, cancel_all=None, get_status=None, max_workers=8,
+                  rate_limiter=None, poll_interval=0.25, timeout=10, log=print ) :
+        # cancel_order( order_id ) : 1 cancel request (e.g. TradingClient.cancel_order_by_id)
+        # list_statuses( order_ids, symbols ) : { order id : status } of the given orders, 1 request
+        # cancel_all() : { order id : HTTP status } of all open orders canceled by 1 request (optional)
+        # get_status( order_id ) : status updated by trade update events (e.g. OrderBook.get_status) or None
+        self.cancel_order, self.list_statuses = cancel_order, list_statuses
+        self.cancel_all, self.get_status = cancel_all, get_status
+        self.max_workers, self.rate_limiter = max_workers, rate_limiter
+        self.poll_interval, self.timeout, self.log = poll_interval, timeout, log
+
+    def cancel( self, orders, all_open=False ) : # outcome table of the orders (index = id)
+        # orders : snapshot of orders to cancel (index = id, column 'symbol')
+        # all_open : orders are all open orders, canceled by cancel_all() if available
+        outcomes = new_outcomes( orders )
+        start = time.perf_counter()
+        if all_open and ( self.cancel_all is not None ) :
+            self.send_all( outcomes )
+        elif len( outcomes ) > 0 :
+            with ThreadPoolExecutor( max_workers=min( self.max_workers, len( outcomes ) ),
+                                     thread_name_prefix='cancel' ) as executor :
+                list( executor.map( self.send, outcomes.keys(), outcomes.values() ) )
+        return self.confirm( outcomes, start )
+
+    def send( self, order_id, outcome ) :
+        try :
+            if self.rate_limiter is not None :
+                self.rate_limiter.acquire()
+            self.cancel_order( order_id )
+            outcome[ 'request' ] = 'sent'
+        except Exception as ex : # e.g. 422 : order already filled, its status is still confirmed
+            outcome[ 'request' ], outcome[ 'error' ] = 'failed', str( ex )
+
+    def send_all( self, outcomes ) :
+        if self.rate_limiter is not None :
+            self.rate_limiter.acquire()
+        statuses = self.cancel_all()
+        for order_id, http_status in statuses.items() :
+            outcome = outcomes.setdefault( order_id, new_outcome( None ) )   # opened after the snapshot
+            outcome[ 'request' ] = 'sent' if 200 <= http_status < 300 else 'failed'
+            if outcome[ 'request' ] == 'failed' :
+                outcome[ 'error' ] = f'HTTP {http_status}'
+        for outcome in outcomes.values() :
+            if outcome[ 'request' ] is None : # not open anymore
+                outcome[ 'request' ] = 'not_open'
+
+    # --- Confirmation ---
+
+    def confirm( self, outcomes, start=None, terminal=TERMINAL_STATUSES ) : # waits for terminal states
+        # outcomes : { order id : outcome } (new_outcomes()), returns the outcome table
+        start = time.perf_counter() if start is None else start
+        deadline = start + self.timeout
+        waiting = self.update( outcomes, list( outcomes ), { i:o[ 'status' ] for i, o in outcomes.items() }, start,
+                               terminal )   # e.g. rejected requests
+        while len( waiting ) > 0 :
+            if self.get_status is not None : # trade update events : no request
+                waiting = self.update( outcomes, waiting, { i:self.get_status( i ) for i in waiting }, start, terminal )
+            if len( waiting ) == 0 or time.perf_counter() >= deadline :
+                break
+            symbols = sorted( { outcomes[ i ][ 'symbol' ] for i in waiting } - { None } )
+            if self.rate_limiter is not None :
+                self.rate_limiter.acquire()
+            waiting = self.update( outcomes, waiting, self.list_statuses( waiting, symbols or None ), start, terminal )
+            if len( waiting ) > 0 :
+                time.sleep( min( self.poll_interval, max( 0, deadline - time.perf_counter() ) ) )
+        if len( waiting ) > 0 :
+            self.log( f'{len( waiting )} orders not confirmed after {self.timeout}s' )
+        return get_outcome_table( outcomes )
+
+    def update( self, outcomes, waiting, statuses, start, terminal ) : # orders still waiting
+        still_waiting = []
+        for order_id in waiting :
+            status = statuses.get( order_id )
+            outcome = outcomes[ order_id ]
+            outcome[ 'status' ] = status or outcome[ 'status' ]
+            if status in terminal :
+                outcome[ 'confirmed' ], outcome[ 'seconds' ] = True, time.perf_counter() - start
+            else :
+                still_waiting.append( order_id )
+        return still_waiting
+
+
+# --- Outcomes ---
+
+def new_outcome( symbol ) :
+    return { 'symbol':symbol, 'request':None, 'status':None, 'confirmed':False, 'seconds':np.nan, 'error':None }
+
+def new_outcomes( orders ) : # { order id : outcome } of a Pandas of orders (index = id)
+    symbols = orders[ 'symbol' ] if 'symbol' in orders.columns else pd.Series( None, index=orders.index )
+    return { str( order_id ):new_outcome( symbol ) for order_id, symbol in symbols.items() }
+
+def get_outcome_table( outcomes ) :
+    table = pd.DataFrame.from_dict( outcomes, orient='index', columns=OUTCOME_COLUMNS )
+    return table.rename_axis( 'id' ).astype( { 'confirmed':bool, 'seconds':float } )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import threading
+    from lib.jv.rate_limit import TokenBucket
+
+    # Stub of the trading endpoint : 30-ms round-trips, cancellations processed 100 ms after their request
+    class StubBroker :
+        def __init__( self, nb_orders ) :
+            self.lock = threading.Lock()
+            self.orders = { f'order-{i}':{ 'symbol':f'T{i % 50}', 'status':'new', 'canceled_at':None }
+                            for i in range( nb_orders ) }
+            self.orders[ 'order-0' ][ 'status' ] = 'filled'   # filled after the snapshot
+            self.counters = { 'cancel':0, 'cancel_all':0, 'list':0 }
+
+        def round_trip( self, name ) :
+            time.sleep( 0.03 )
+            with self.lock :
+                self.counters[ name ] += 1
+
+        def cancel_order( self, order_id ) :
+            self.round_trip( 'cancel' )
+            with self.lock :
+                order = self.orders[ order_id ]
+                if order[ 'status' ] != 'new' :
+                    raise RuntimeError( f'order is already in "{order[ "status" ]}" state' )
+                order[ 'status' ], order[ 'canceled_at' ] = 'pending_cancel', time.perf_counter() + 0.1
+
+        def cancel_all( self ) :
+            self.round_trip( 'cancel_all' )
+            statuses = {}
+            for order_id, order in self.orders.items() :
+                if order[ 'status' ] == 'new' :
+                    order[ 'status' ], order[ 'canceled_at' ] = 'pending_cancel', time.perf_counter() + 0.1
+                    statuses[ order_id ] = 200
+            return statuses
+
+        def list_statuses( self, order_ids, symbols ) :
+            self.round_trip( 'list' )
+            with self.lock :
+                for order in self.orders.values() :
+                    if order[ 'status' ] == 'pending_cancel' and time.perf_counter() >= order[ 'canceled_at' ] :
+                        order[ 'status' ] = 'canceled'
+                return { i:self.orders[ i ][ 'status' ] for i in order_ids }
+
+    # 300 brackets canceled 1 by 1 (concurrently), then all open orders by 1 request
+    for all_open in [ False, True ] :
+        broker = StubBroker( 300 )
+        snapshot = pd.DataFrame( broker.orders ).T[[ 'symbol' ]]
+        bulk = BulkOrders( broker.cancel_order, broker.list_statuses, broker.cancel_all, max_workers=8,
+                           rate_limiter=TokenBucket( 60000, burst=100 ) )
+        start = time.perf_counter()
+        outcomes = bulk.cancel( snapshot, all_open=all_open )
+        elapsed = time.perf_counter() - start
+        assert outcomes[ 'confirmed' ].all() and ( outcomes[ 'status' ] == 'canceled' ).sum() == 299
+        assert outcomes.loc[ 'order-0', 'status' ] == 'filled'
+        print( f'{len( outcomes )} orders canceled in {elapsed:.2f}s (all_open={all_open}), requests : {broker.counters}' )
+    print( outcomes.head( 3 ) )
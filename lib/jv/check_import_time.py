@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 26 11:05:52 2025
+
+@author: jean vallee
+"""
+
+# Import-time budget of the trading library, measured in a fresh interpreter as after a crash
+# - fails if importing takes more than IMPORT_TIME_BUDGET seconds
+# - fails if heavy libraries or subprocesses are loaded/started by the import itself
+# Run from root folder : python -m lib.jv.check_import_time (also run by tests/test_lib_import.py)
+
+import json
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET = 1.0   # seconds
+LAZY_MODULES = [ 'alpaca', 'matplotlib', 'pandas_market_calendars' ]
+
+MEASURE_SCRIPT = """
+import json, sys, time, subprocess
+popen_calls = []
+subprocess.Popen.__init__ = lambda self, *args, **kwargs : popen_calls.append( args )  # no process at import
+start = time.perf_counter()
+import {module_name}
+elapsed = time.perf_counter() - start
+loaded = sorted( {{ name.split( '.' )[ 0 ] for name in sys.modules }} & set( {lazy_modules} ) )
+print( json.dumps( {{ 'elapsed':elapsed, 'loaded':loaded, 'popen_calls':len( popen_calls ) }} ) )
+"""
+
+def measure_import( module_name='lib.jv.lib_paper_trading', nb_runs=3 ) : # best of N cold imports
+    script = MEASURE_SCRIPT.format( module_name=module_name, lazy_modules=LAZY_MODULES )
+    results = []
+    for i in range( nb_runs ) :
+        output = subprocess.run( [ sys.executable, '-c', script ], capture_output=True, text=True, check=True )
+        results.append( json.loads( output.stdout.strip().splitlines()[ -1 ] ) )
+    return min( results, key=lambda result : result[ 'elapsed' ] )
+
+
+if __name__ == '__main__':
+    result = measure_import()
+    print( f'Import of lib_paper_trading : {result[ "elapsed" ]:.3f} s (budget : {IMPORT_TIME_BUDGET} s)' )
+    assert result[ 'elapsed' ] < IMPORT_TIME_BUDGET, 'Import time exceeds its budget'
+    assert result[ 'loaded' ] == [], f'Heavy libraries imported at startup : {result[ "loaded" ]}'
+    assert result[ 'popen_calls' ] == 0, 'Subprocesses started at import'
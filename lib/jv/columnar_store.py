@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 24 09:05:12 2025
+
+@author: jean vallee
+"""
+
+# Columnar storage of daily Pandas (history, latency, orders) replacing CSV files
+# - 1 folder per dataset & date : {root}/{dataset}/{YYYYMMDD}/
+# - 1 raw binary file per column + meta.json (dtype of columns, nb of rows)
+#     - numbers  : native dtype (float64, int64, bool)
+#     - dates    : int64 ns since epoch (UTC)
+#     - strings  : int32 codes of categories listed in meta.json (-1 : missing)
+# - reads are memory-mapped (no parsing), appends write new rows at the end of the column files
+# - convert_csv_dir() converts the existing {prefix}_YYYYMMDD.csv files once
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+DATETIME_COLUMNS = [ 'timestamp', 'created_at', 'updated_at', 'expires_at', 'canceled_at' ]
+
+
+class ColumnarPartition :
+    """
+    Columns of 1 dataset on 1 date
+    """
+    def __init__( self, path ) :
+        self.path = path
+        self.meta = None
+        meta_path = os.path.join( path, META_FILE )
+        if os.path.exists( meta_path ) :
+            with open( meta_path ) as meta_file : self.meta = json.load( meta_file )
+
+    def exists( self ) :
+        return self.meta is not None
+
+    def __len__( self ) :
+        return self.meta[ 'nb_rows' ] if self.exists() else 0
+
+    # --- Write ---
+
+    def write( self, df_in ) : # replaces the partition
+        os.makedirs( self.path, exist_ok=True )
+        columns = get_columns( df_in )
+        self.meta = { 'index':df_in.index.name if df_in.index.name is not None else 'index',
+                      'columns':[ { 'name':str( name ), 'kind':get_kind( values ) } for name, values in columns ],
+                      'nb_rows':0 }
+        for column in self.meta[ 'columns' ] :
+            open( self.column_path( column ), 'wb' ).close()
+        return self.append( df_in )
+
+    def append( self, df_in ) : # appends rows with the same columns as the partition
+        if not self.exists() :
+            return self.write( df_in )
+        columns = get_columns( df_in )
+        names = [ str( name ) for name, values in columns ]
+        if names != [ column[ 'name' ] for column in self.meta[ 'columns' ] ] :
+            raise ValueError( f'Columns of {self.path} differ from appended columns' )
+        for column, ( name, values ) in zip( self.meta[ 'columns' ], columns ) :
+            with open( self.column_path( column ), 'ab' ) as column_file :
+                column_file.write( np.ascontiguousarray( self.encode( column, values ) ).tobytes() )
+        self.meta[ 'nb_rows' ] += len( df_in )
+        self.save_meta()   # rows are visible once meta.json is updated
+        return len( df_in )
+
+    def encode( self, column, values ) :
+        kind = column[ 'kind' ]
+        if kind == 'datetime' :
+            return pd.DatetimeIndex( pd.to_datetime( values, utc=True ) ).as_unit( 'ns' ).asi8
+        if kind == 'category' :
+            categories = column.setdefault( 'categories', [] )
+            codes = { category:code for code, category in enumerate( categories ) }
+            encoded = np.full( len( values ), -1, dtype=np.int32 )
+            for i, value in enumerate( values ) :
+                if pd.isna( value ) :
+                    continue
+                value = str( value )
+                if value not in codes :
+                    codes[ value ] = len( categories )
+                    categories.append( value )
+                encoded[ i ] = codes[ value ]
+            return encoded
+        return np.asarray( values, dtype=kind )
+
+    def save_meta( self ) :
+        meta_path = os.path.join( self.path, META_FILE )
+        with open( meta_path + '.tmp', 'w' ) as meta_file : json.dump( self.meta, meta_file )
+        os.replace( meta_path + '.tmp', meta_path )
+
+    # --- Read ---
+
+    def read_arrays( self, columns=None ) : # { column name : memory-mapped array }, zero-copy
+        arrays = {}
+        for column in self.meta[ 'columns' ] :
+            if columns is None or column[ 'name' ] in columns :
+                arrays[ column[ 'name' ] ] = self.read_column( column )
+        return arrays
+
+    def read_column( self, column ) :
+        dtype = { 'datetime':np.int64, 'category':np.int32 }.get( column[ 'kind' ], column[ 'kind' ] )
+        if self.meta[ 'nb_rows' ] == 0 :
+            return np.empty( 0, dtype=dtype )
+        return np.memmap( self.column_path( column ), dtype=dtype, mode='r', shape=( self.meta[ 'nb_rows' ], ) )
+
+    def read( self, columns=None ) : # Pandas with decoded dates & strings
+        index_name = self.meta[ 'index' ]
+        if columns is not None :
+            columns = [ index_name ] + list( columns )
+        data = {}
+        for column in self.meta[ 'columns' ] :
+            if columns is not None and column[ 'name' ] not in columns :
+                continue
+            values = self.read_column( column )
+            if column[ 'kind' ] == 'datetime' :
+                values = pd.to_datetime( values, utc=True )
+            elif column[ 'kind' ] == 'category' :
+                values = pd.Categorical.from_codes( values, column[ 'categories' ] ).astype( object )
+            data[ column[ 'name' ] ] = values
+        return pd.DataFrame( data ).set_index( index_name )
+
+    def column_path( self, column ) :
+        return os.path.join( self.path, column[ 'name' ].replace( '/', '_' ) + '.bin' )
+
+
+class ColumnarStore :
+
+    def __init__( self, root ) :
+        self.root = root
+
+    def partition( self, dataset, date ) : # date : 'YYYYMMDD' or datetime
+        date = date if isinstance( date, str ) else f'{date:%Y%m%d}'
+        return ColumnarPartition( os.path.join( self.root, dataset, date ) )
+
+    def dates( self, dataset ) :
+        folder = os.path.join( self.root, dataset )
+        if not os.path.isdir( folder ) :
+            return []
+        return sorted( d for d in os.listdir( folder ) if os.path.exists( os.path.join( folder, d, META_FILE ) ) )
+
+    def write( self, dataset, date, df_in ) :
+        return self.partition( dataset, date ).write( df_in )
+
+    def append( self, dataset, date, df_in ) :
+        return self.partition( dataset, date ).append( df_in )
+
+    def read( self, dataset, dates=None, columns=None ) : # Pandas of 1 date, several dates or all
+        if isinstance( dates, str ) :
+            dates = [ dates ]
+        dates = self.dates( dataset ) if dates is None else dates
+        frames = [ self.partition( dataset, date ).read( columns ) for date in dates ]
+        return pd.concat( frames ) if len( frames ) > 0 else pd.DataFrame()
+
+
+# Index & columns of a Pandas as a list of ( name, values )
+def get_columns( df_in ) :
+    index_name = df_in.index.name if df_in.index.name is not None else 'index'
+    return [ ( index_name, df_in.index ) ] + [ ( name, df_in[ name ] ) for name in df_in.columns ]
+
+def get_kind( values ) :
+    dtype = values.dtype
+    if pd.api.types.is_datetime64_any_dtype( dtype ) :
+        return 'datetime'
+    if pd.api.types.is_bool_dtype( dtype ) or pd.api.types.is_numeric_dtype( dtype ) :
+        return np.dtype( dtype ).str
+    return 'category'
+
+
+# One-shot conversion of {prefix}_YYYYMMDD.csv files to datasets named {prefix}
+def convert_csv_dir( csv_dir, store, index_columns={ 'hist':'timestamp', 'chrono':'ticker', 'latency':'stage',
+                                                      'orders':'id' } ) :
+    converted = []
+    for file_name in sorted( os.listdir( csv_dir ) ) :
+        match = re.fullmatch( r'(.+?)_?(\d{8})\.csv', file_name )
+        if match is None :
+            continue
+        dataset, date = match.groups()
+        index_column = next( ( column for prefix, column in index_columns.items() if dataset.startswith( prefix ) ), None )
+        df_in = pd.read_csv( os.path.join( csv_dir, file_name ), index_col=index_column )
+        if df_in.index.name in DATETIME_COLUMNS :
+            df_in.index = pd.to_datetime( df_in.index, utc=True )
+        for column in df_in.columns.intersection( DATETIME_COLUMNS ) :
+            df_in[ column ] = pd.to_datetime( df_in[ column ], utc=True, format='ISO8601' )
+        store.write( dataset, date, df_in )
+        converted.append( ( file_name, dataset, date, len( df_in ) ) )
+    return converted
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    store = ColumnarStore( tempfile.mkdtemp() )
+    for file_name, dataset, date, nb_rows in convert_csv_dir( './data/alpaca/', store ) :
+        print( f'{file_name:>35} -> {dataset}/{date} ({nb_rows} rows)' )
+
+    csv_path = './data/alpaca/hist_20251010.csv'
+    start = time.perf_counter()
+    from_csv = pd.read_csv( csv_path, index_col='timestamp', parse_dates=True )
+    csv_time = time.perf_counter() - start
+    start = time.perf_counter()
+    from_store = store.read( 'hist', '20251010' )
+    store_time = time.perf_counter() - start
+    assert np.allclose( from_csv.to_numpy(), from_store.to_numpy(), equal_nan=True )
+    assert ( from_csv.index == from_store.index ).all()
+    print( f'hist read in {store_time * 1e3:.1f} ms (CSV : {csv_time * 1e3:.1f} ms)' )
+
+    # Intraday appends
+    partition = store.partition( 'hist_demo', '20251010' )
+    for i in range( 0, len( from_csv ), 50 ) :
+        partition.append( from_csv[ i:i + 50 ] )
+    assert np.allclose( partition.read().to_numpy(), from_csv.to_numpy(), equal_nan=True )
+    orders = store.read( 'orders', '20251010' )
+    assert orders.equals( orders.loc[ orders.index ] ) and orders[ 'created_at' ].dt.tz is not None
+    print( f'{len( partition )} rows appended, {len( orders )} orders read back' )
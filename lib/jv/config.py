@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 26 09:47:15 2025
+
+@author: jean vallee
+"""
+
+# Configuration file loaded as data, instead of being executed
+# - only assignments of literals are allowed ( NAME = value  or  NAME1, NAME2 = value1, value2 )
+# - values may use arithmetic & names assigned above, e.g.  INTERVAL = HIST_INTERVAL * 60
+
+import ast
+import operator
+
+OPERATORS = { ast.Add:operator.add, ast.Sub:operator.sub, ast.Mult:operator.mul, ast.Div:operator.truediv,
+              ast.FloorDiv:operator.floordiv, ast.Mod:operator.mod, ast.Pow:operator.pow,
+              ast.USub:operator.neg, ast.UAdd:operator.pos }
+
+
+def load_config( config_path ) : # returns { name : value }
+    with open( config_path ) as config_file :
+        tree = ast.parse( config_file.read(), config_path )
+    values = {}
+    for node in tree.body :
+        if isinstance( node, ast.Assign ) :
+            value = evaluate( node.value, values, config_path )
+            for target in node.targets :
+                assign( target, value, values, config_path )
+        elif not ( isinstance( node, ast.Expr ) and isinstance( node.value, ast.Constant ) ) : # docstrings
+            raise ValueError( f'{config_path} line {node.lineno} : only assignments are allowed' )
+    return values
+
+def assign( target, value, values, config_path ) :
+    if isinstance( target, ast.Name ) :
+        values[ target.id ] = value
+    elif isinstance( target, ( ast.Tuple, ast.List ) ) and len( target.elts ) == len( value ) :
+        for target_i, value_i in zip( target.elts, value ) :
+            assign( target_i, value_i, values, config_path )
+    else :
+        raise ValueError( f'{config_path} line {target.lineno} : invalid assignment' )
+
+def evaluate( node, values, config_path ) :
+    if isinstance( node, ast.Constant ) :
+        return node.value
+    if isinstance( node, ast.Name ) and node.id in values :
+        return values[ node.id ]
+    if isinstance( node, ( ast.List, ast.Tuple, ast.Set ) ) :
+        items = [ evaluate( item, values, config_path ) for item in node.elts ]
+        return { ast.List:list, ast.Tuple:tuple, ast.Set:set }[ type( node ) ]( items )
+    if isinstance( node, ast.Dict ) :
+        return { evaluate( k, values, config_path ):evaluate( v, values, config_path ) 
+                 for k, v in zip( node.keys, node.values ) }
+    if isinstance( node, ast.BinOp ) and type( node.op ) in OPERATORS :
+        return OPERATORS[ type( node.op ) ]( evaluate( node.left, values, config_path ), 
+                                             evaluate( node.right, values, config_path ) )
+    if isinstance( node, ast.UnaryOp ) and type( node.op ) in OPERATORS :
+        return OPERATORS[ type( node.op ) ]( evaluate( node.operand, values, config_path ) )
+    raise ValueError( f'{config_path} line {node.lineno} : value is not a literal ({ast.unparse( node )})' )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    config = load_config( './cfg/cfg_paper_trading.py' )
+    print( { name:config[ name ] for name in [ 'EXCHANGE', 'HIST_INTERVAL', 'INTERVAL', 'TICKERS' ] } )
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Nov  2 10:14:48 2025
+
+@author: jean vallee
+"""
+
+# Shared HTTP sessions of the REST clients (Alpaca's clients send their requests through a requests.Session)
+# - 1 session per endpoint ( scheme://host ), shared by all clients of that endpoint
+# - pool of keep-alive connections sized for the concurrent workers, TCP keep-alive probes so that
+#   idle connections survive between ticks
+# - pre-warming : connections (TCP + TLS handshakes) opened before the market opens,
+#   so the 1st LTP fetch of the day reuses one of them
+# - timeout of each call : ( connect, read ) seconds
+# - retries with jittered exponential backoff : any request whose connection failed, idempotent reads
+#   (GET, HEAD) only on other errors (5xx, read errors)
+# - "429 Too Many Requests" isn't retried here : rate_limit.RequestScheduler owns it (budget drained,
+#   request sent again with a new token), so that retries are counted in the shared budget
+
+import socket
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+POOL_SIZE = 10               # connections kept per endpoint (>= ORDER_WORKERS + LTP fetch)
+TIMEOUT = ( 3.05, 10 )       # seconds : connect, read
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.2          # seconds, doubled at each retry
+RETRY_JITTER = 0.2           # seconds, random delay added to each backoff
+RETRY_STATUS = [ 500, 502, 503, 504 ]   # 429 : retried by rate_limit.RequestScheduler
+KEEPALIVE_IDLE = 30          # seconds of idle time before 1st TCP keep-alive probe
+KEEPALIVE_OPTIONS = [ ( socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1 ) ] + [
+    ( socket.IPPROTO_TCP, getattr( socket, name ), value )
+    for name, value in [ ( 'TCP_KEEPIDLE', KEEPALIVE_IDLE ), ( 'TCP_KEEPINTVL', 10 ), ( 'TCP_KEEPCNT', 3 ) ]
+    if hasattr( socket, name ) ]   # Linux options
+
+
+def get_retry( attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF, jitter=RETRY_JITTER ) :
+    # Statuses retried for idempotent reads only : an order is never submitted twice
+    return Retry( total=attempts, connect=attempts, read=attempts, status=attempts,
+                  allowed_methods=frozenset( [ 'GET', 'HEAD' ] ), status_forcelist=RETRY_STATUS,
+                  backoff_factor=backoff, backoff_jitter=jitter, respect_retry_after_header=True,
+                  raise_on_status=False )   # last response returned : the client raises its own error
+
+
+class KeepAliveAdapter( HTTPAdapter ) :
+    """
+    Connection pool whose sockets send TCP keep-alive probes
+    """
+    def init_poolmanager( self, *args, **kwargs ) :
+        kwargs[ 'socket_options' ] = HTTPConnection.default_socket_options + KEEPALIVE_OPTIONS
+        super().init_poolmanager( *args, **kwargs )
+
+
+class PooledSession( requests.Session ) :
+    """
+    Session with a pool of keep-alive connections, a timeout on each call & retries (get_retry())
+    """
+    def __init__( self, pool_size=POOL_SIZE, timeout=TIMEOUT, retry=None ) :
+        super().__init__()
+        self.timeout, self.pool_size = timeout, pool_size
+        self.adapter = KeepAliveAdapter( pool_connections=1, pool_maxsize=pool_size, pool_block=False,
+                                         max_retries=retry if retry is not None else get_retry() )
+        self.mount( 'https://', self.adapter )
+        self.mount( 'http://', self.adapter )
+
+    def request( self, method, url, **kwargs ) :
+        kwargs.setdefault( 'timeout', self.timeout )   # alpaca's clients don't set any
+        return super().request( method, url, **kwargs )
+
+    def prewarm( self, url, nb_connections=None ) : # opens nb_connections connections to url, returns their nb
+        # Pool used by requests to url : same TLS settings & proxies as request()
+        settings = self.merge_environment_settings( url, {}, None, None, None )
+        pool = self.adapter.get_connection_with_tls_context( requests.Request( 'HEAD', url ).prepare(),
+                                                             settings[ 'verify' ], settings[ 'proxies' ],
+                                                             settings[ 'cert' ] )
+        responses = []
+        try :
+            for i in range( nb_connections or self.pool_size ) :
+                # Each response holds its connection until released : the next request opens a new one
+                responses.append( pool.urlopen( 'HEAD', urlsplit( url ).path or '/', preload_content=False,
+                                                release_conn=False, retries=False, timeout=self.timeout[ 0 ] ) )
+        finally :
+            for response in responses :
+                response.drain_conn()
+                response.release_conn()
+        return len( responses )
+
+
+# --- Sessions per endpoint ---
+
+SESSIONS = {}   # endpoint -> PooledSession
+SESSIONS_LOCK = threading.Lock()
+
+def get_endpoint( url ) : # scheme://host[:port]
+    parts = urlsplit( str( getattr( url, 'value', url ) ) )   # alpaca's BaseURL enums or strings
+    return f'{parts.scheme}://{parts.netloc}'
+
+def get_session( url, **settings ) : # shared session of url's endpoint, created on 1st call
+    endpoint = get_endpoint( url )
+    with SESSIONS_LOCK :
+        session = SESSIONS.get( endpoint )
+        if session is None :
+            session = SESSIONS[ endpoint ] = PooledSession( **settings )
+        return session
+
+def attach_session( client, **settings ) : # alpaca REST client using the shared session of its endpoint
+    client._session = get_session( client._base_url, **settings )
+    client._retry = 0   # retries done by the session & the scheduler : no fixed 3-second sleep of the client
+    return client
+
+def prewarm_sessions( nb_connections=None, log=print ) : # opens connections of all endpoints
+    with SESSIONS_LOCK :
+        sessions = dict( SESSIONS )
+    for endpoint, session in sessions.items() :
+        try :
+            log( f'{session.prewarm( endpoint, nb_connections )} connections opened to {endpoint}' )
+        except Exception as ex :   # e.g. network down : connections will be opened by the 1st requests
+            log( f'Pre-warming of {endpoint} failed : {ex}' )
+
+def close_sessions() :
+    with SESSIONS_LOCK :
+        for session in SESSIONS.values() :
+            session.close()
+        SESSIONS.clear()
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import json
+    import time
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    # Local stub of Alpaca's data endpoint : counts connections & requests, fails on demand
+    class StubHandler( BaseHTTPRequestHandler ) :
+        protocol_version = 'HTTP/1.1'   # keep-alive
+        failures = {}                   # path -> list of statuses returned before 200
+        counters = { 'connections':0, 'requests':0 }
+
+        def setup( self ) :
+            super().setup()
+            self.counters[ 'connections' ] += 1
+
+        def reply( self, body=b'' ) :
+            self.counters[ 'requests' ] += 1
+            path = self.path.split( '?' )[ 0 ]
+            if path == '/slow' :
+                time.sleep( 0.5 )
+            statuses = self.failures.get( path, [] )
+            status = statuses.pop( 0 ) if len( statuses ) > 0 else 200
+            self.send_response( status )
+            self.send_header( 'Content-Length', str( len( body ) ) )
+            self.end_headers()
+            self.wfile.write( body if self.command != 'HEAD' else b'' )
+
+        def do_HEAD( self ) :
+            self.reply()
+
+        def do_GET( self ) :
+            trade = { 't':'2025-10-10T14:30:00Z', 'x':'V', 'p':183.16, 's':100, 'c':[ '@' ], 'i':1, 'z':'C' }
+            self.reply( json.dumps( { 'trades':{ 'NVDA':trade } } ).encode() )
+
+        def do_POST( self ) :
+            self.rfile.read( int( self.headers.get( 'Content-Length', 0 ) ) )
+            self.reply( b'{}' )
+
+        def log_message( self, *args ) :
+            pass
+
+    server = ThreadingHTTPServer( ( '127.0.0.1', 0 ), StubHandler )
+    server.handle_error = lambda *args : None   # e.g. reply to a request timed out by the client
+    threading.Thread( target=server.serve_forever, daemon=True ).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    counters, failures = StubHandler.counters, StubHandler.failures
+
+    # Pre-warmed connections are reused by later requests
+    session = get_session( url, pool_size=4, timeout=( 1, 0.2 ), retry=get_retry( jitter=0.01 ) )
+    prewarm_sessions( log=print )
+    assert counters[ 'connections' ] == 4
+    for i in range( 20 ) :
+        session.get( url + '/v2/stocks/trades/latest' )
+    assert counters[ 'connections' ] == 4, counters
+
+    # Retries : reads on 503, no order re-sent on 503, no retry on 429 (left to the scheduler)
+    failures[ '/read' ], failures[ '/order' ], failures[ '/limited' ] = [ 503, 503 ], [ 503 ], [ 429 ]
+    assert session.get( url + '/read' ).status_code == 200 and failures[ '/read' ] == []
+    assert session.post( url + '/order', json={} ).status_code == 503
+    assert session.get( url + '/limited' ).status_code == 429
+
+    # Alpaca's data client on the shared session
+    try :
+        from alpaca.data.historical.stock import StockHistoricalDataClient
+        from alpaca.data.requests import StockLatestTradeRequest
+    except ImportError :
+        StockHistoricalDataClient = None
+    if StockHistoricalDataClient is not None :
+        client = attach_session( StockHistoricalDataClient( 'key', 'secret', url_override=url ) )
+        nb_connections = counters[ 'connections' ]
+        trades = client.get_stock_latest_trade( StockLatestTradeRequest( symbol_or_symbols=[ 'NVDA' ] ) )
+        assert client._session is session and counters[ 'connections' ] == nb_connections
+        print( 'Alpaca client :', trades[ 'NVDA' ].price )
+
+    # Timeout of each call
+    start = time.perf_counter()
+    try :
+        session.post( url + '/slow', json={} )
+        raise AssertionError( 'No timeout' )
+    except requests.exceptions.Timeout :
+        print( f'Timeout after {time.perf_counter() - start:.2f}s' )
+    print( counters )
+    close_sessions()
+    server.shutdown()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 31 08:52:17 2025
+
+@author: jean vallee
+"""
+
+# Latency of the stages of a tick : close bar (streaming) or fetch LTP -> update history -> compute signal
+#                                   -> submit order -> confirm bracket
+# - named spans measure wall time (perf_counter_ns) & CPU time of the running thread (thread_time_ns)
+# - each span feeds streaming histograms per stage, and per stage & ticker if a ticker is given
+# - histograms are HDR-style : log-linear buckets with ~1.6% precision, fixed memory, O(1) per record,
+#   so percentiles (p50, p99) & max can be read live at any time of the session
+
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns, thread_time_ns
+import numpy as np
+import pandas as pd
+
+STAGES = [ 'close_bar', 'fetch_ltp', 'update_history', 'compute_signal', 'submit_order', 'confirm_bracket' ]
+SUB_BUCKETS = 128                # values < SUB_BUCKETS are exact, then SUB_BUCKETS / 2 buckets per power of 2
+MAX_SHIFT   = 40                 # values up to ~ 128 * 2^40 ns (~ 39 hours)
+NB_BUCKETS  = SUB_BUCKETS + MAX_SHIFT * SUB_BUCKETS // 2
+
+
+class LatencyHistogram :
+    """
+    Counts of values (ns) per log-linear bucket, exact count, min, max & sum
+    """
+    def __init__( self ) :
+        self.counts = [ 0 ] * NB_BUCKETS   # list : faster than NumPy for 1 increment at a time
+        self.count, self.total = 0, 0
+        self.min, self.max = None, 0
+
+    def record( self, value ) :
+        value = int( value ) if value > 0 else 0
+        self.counts[ get_bucket( value ) ] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min : self.min = value
+        if value > self.max : self.max = value
+
+    def merge( self, other ) :
+        self.counts = [ a + b for a, b in zip( self.counts, other.counts ) ]
+        self.count, self.total = self.count + other.count, self.total + other.total
+        if other.min is not None :
+            self.min = other.min if self.min is None else min( self.min, other.min )
+        self.max = max( self.max, other.max )
+
+    def get_percentile( self, percentile ) : # highest value of the bucket of the percentile (<= max)
+        if self.count == 0 :
+            return np.nan
+        rank = max( 1, int( np.ceil( percentile / 100 * self.count ) ) )
+        bucket = int( np.searchsorted( np.cumsum( self.counts ), rank ) )   # only when read
+        return min( get_bucket_high( bucket ), self.max )
+
+    def get_mean( self ) :
+        return self.total / self.count if self.count > 0 else np.nan
+
+
+def get_bucket( value ) :
+    if value < SUB_BUCKETS :
+        return value
+    shift = min( value.bit_length() - SUB_BUCKETS.bit_length() + 1, MAX_SHIFT )
+    half  = SUB_BUCKETS // 2
+    return SUB_BUCKETS + ( shift - 1 ) * half + min( value >> shift, SUB_BUCKETS - 1 ) - half
+
+def get_bucket_high( bucket ) : # highest value of a bucket
+    if bucket < SUB_BUCKETS :
+        return bucket
+    half = SUB_BUCKETS // 2
+    shift, sub_bucket = ( bucket - SUB_BUCKETS ) // half + 1, ( bucket - SUB_BUCKETS ) % half + half
+    return ( ( sub_bucket + 1 ) << shift ) - 1
+
+
+class LatencyRecorder :
+    """
+    Histograms of wall & CPU times per stage (ticker None) and per stage & ticker
+    """
+    def __init__( self ) :
+        self.lock = threading.Lock()
+        self.histograms = {}   # ( stage, ticker ) -> ( wall histogram, CPU histogram )
+
+    def record( self, stage, wall_ns, cpu_ns, ticker=None ) :
+        with self.lock :
+            for key in ( [ ( stage, None ) ] if ticker is None else [ ( stage, None ), ( stage, ticker ) ] ) :
+                histograms = self.histograms.get( key )
+                if histograms is None :
+                    histograms = self.histograms[ key ] = ( LatencyHistogram(), LatencyHistogram() )
+                histograms[ 0 ].record( wall_ns )
+                histograms[ 1 ].record( cpu_ns )
+
+    @contextmanager
+    def span( self, stage, ticker=None ) :
+        wall_start, cpu_start = perf_counter_ns(), thread_time_ns()
+        try :
+            yield
+        finally :
+            self.record( stage, perf_counter_ns() - wall_start, thread_time_ns() - cpu_start, ticker )
+
+    def timed( self, stage, function, *args, ticker=None, **kwargs ) : # function's result, call measured
+        with self.span( stage, ticker ) :
+            return function( *args, **kwargs )
+
+    def get_count( self, stage, ticker=None ) :
+        histograms = self.histograms.get( ( stage, ticker ) )
+        return histograms[ 0 ].count if histograms is not None else 0
+
+    def get_summary( self, by_ticker=False ) : # Pandas of percentiles in ms, 1 row per stage (& ticker)
+        with self.lock :
+            items = sorted( self.histograms.items(), key=lambda item : (
+                STAGES.index( item[ 0 ][ 0 ] ) if item[ 0 ][ 0 ] in STAGES else len( STAGES ), item[ 0 ][ 1 ] or '' ) )
+            rows = []
+            for ( stage, ticker ), ( wall, cpu ) in items :
+                if ( ticker is not None ) and not by_ticker :
+                    continue
+                rows.append( [ stage, ticker or 'all', wall.count,
+                               *[ value / 1e6 for value in [ wall.get_percentile( 50 ), wall.get_percentile( 99 ), wall.max,
+                                                             cpu.get_percentile( 50 ),  cpu.get_percentile( 99 ),  cpu.max ] ] ] )
+        columns = [ 'stage', 'ticker', 'count', 'wall_p50', 'wall_p99', 'wall_max', 'cpu_p50', 'cpu_p99', 'cpu_max' ]
+        return pd.DataFrame( rows, columns=columns ).set_index( 'stage' ).round( 3 )
+
+    def reset( self ) :
+        with self.lock :
+            self.histograms = {}
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+
+    # Precision of percentiles
+    rng = np.random.default_rng( 1 )
+    values = rng.lognormal( 14, 1.0, 100000 ).astype( np.int64 )   # ~ 1 ms
+    histogram = LatencyHistogram()
+    start = time.perf_counter()
+    for value in values.tolist() :
+        histogram.record( value )
+    elapsed = time.perf_counter() - start
+    for percentile in [ 50, 99 ] :
+        exact = np.percentile( values, percentile, method='inverted_cdf' )
+        assert abs( histogram.get_percentile( percentile ) / exact - 1 ) < 1 / 64, percentile
+    assert histogram.max == values.max() and all( get_bucket( get_bucket_high( b ) ) == b for b in range( NB_BUCKETS - 1 ) )
+    print( f'{len( values )} values recorded, {elapsed / len( values ) * 1e9:.0f} ns per record' )
+
+    # Spans of 1 tick
+    latency = LatencyRecorder()
+    for tick in range( 20 ) :
+        with latency.span( 'fetch_ltp' ) :
+            time.sleep( 0.002 )
+        with latency.span( 'compute_signal' ) :
+            sum( range( 20000 ) )   # CPU-bound
+        for ticker in [ 'AAPL', 'NVDA' ] :
+            latency.timed( 'submit_order', time.sleep, 0.001, ticker=ticker )
+    print( latency.get_summary( by_ticker=True ) )
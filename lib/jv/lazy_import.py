@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 26 09:20:33 2025
+
+@author: jean vallee
+"""
+
+# Heavy libraries (alpaca, pandas_market_calendars, matplotlib) imported on first use instead of at startup
+
+import importlib
+
+
+class LazyImport :
+    """
+    Module, or attribute of a module (class, function, enum), imported on first use
+    e.g. TradingClient = LazyImport( 'alpaca.trading.client', 'TradingClient' )
+         TradingClient( api_key, api_secret ) imports alpaca.trading.client then calls the class
+    """
+    def __init__( self, module_name, attribute_name=None ) :
+        self.module_name, self.attribute_name = module_name, attribute_name
+        self.target = None
+
+    def resolve( self ) :
+        if self.target is None :
+            target = importlib.import_module( self.module_name )
+            if self.attribute_name is not None :
+                target = getattr( target, self.attribute_name )
+            self.target = target
+        return self.target
+
+    def __getattr__( self, name ) :
+        if name == 'target' : # not initialized yet (e.g. copy)
+            raise AttributeError( name )
+        return getattr( self.resolve(), name )
+
+    def __call__( self, *args, **kwargs ) :
+        return self.resolve()( *args, **kwargs )
+
+    def __repr__( self ) :
+        name = self.module_name + ( f'.{self.attribute_name}' if self.attribute_name else '' )
+        return f'<LazyImport {name} ({"imported" if self.target is not None else "not imported"})>'
+
+
+def lazy_imports( module_name, *attribute_names ) : # 1 LazyImport per attribute
+    return [ LazyImport( module_name, name ) for name in attribute_names ]
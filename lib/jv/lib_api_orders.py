@@ -35,9 +35,13 @@ def get_delta_seconds( dt_A, dt_B ) :
         delta_seconds = - ( dt_B - dt_A ).total_seconds()  
     return int( delta_seconds )
 
+CREDENTIALS = {}  # credentials_path -> ( api_key, api_secret ), file read once
+
 def get_credentials( credentials_path ) :
-    credentials = pd.read_csv( credentials_path )
-    api_key, api_secret = credentials.values[0]    
+    if credentials_path not in CREDENTIALS :
+        credentials = pd.read_csv( credentials_path )
+        CREDENTIALS[ credentials_path ] = tuple( credentials.values[0] )
+    api_key, api_secret = CREDENTIALS[ credentials_path ]
     return api_key, api_secret
 
 def get_balance( TRADING_CLIENT ) :
@@ -78,9 +82,9 @@ def get_last_weekday( day_name ) :
     return target_date_list
 #get_last_weekday( 'Friday' )
 
-def get_chrono( chrono_start, cpu_start ) : # in nano-seconds
-    duration = process_time_ns() - chrono_start
-    cpu_time = perf_counter_ns() - cpu_start
+def get_chrono( cpu_start, chrono_start ) : # in nano-seconds, from [ process_time_ns(), perf_counter_ns() ]
+    duration = perf_counter_ns() - chrono_start
+    cpu_time = process_time_ns() - cpu_start
     ns_per_ms = 1e6
     if duration < ns_per_ms : # less time than 1 ms
         duration_str  = f'{duration:>10,}'.replace( ',', ' ' ) + ' ns'
@@ -34,7 +34,6 @@
 #get_ipython().system(' python --version ')  # for Jupyter Notebook
 import subprocess
 import sys
-subprocess.Popen( [ sys.executable, '--version' ], text=True ) # for Python script
 
 # ## Folders & Files
 # Required folders and files
@@ -49,21 +48,23 @@ subprocess.Popen( [ sys.executable, '--version' ], text=True ) # for Python scri
 
 #! pip list | findstr "pandas|alpaca|typing_extensions" # Windows
 #get_ipython().system(' pip list | grep -E "pandas|alpaca|typing_extensions|^ta"  # Linux')   # for Jupyter Notebook
-pip_result = subprocess.Popen(
-    [ sys.executable, '-m', 'pip', 'list' ], 
-    stdout=subprocess.PIPE,
-    stderr=subprocess.PIPE,
-    text=True
-)
-grep_result = subprocess.Popen(
-    [ 'grep', '-E', 'pandas|alpaca|typing_extensions|^ta' ], 
-    stdin=pip_result.stdout,
-    stdout=subprocess.PIPE,
-    stderr=subprocess.PIPE,
-    text=True
-)
-pip_result.stdout.close()
-print ( grep_result.communicate()[0] ) 
+def print_environment() : # Python version & versions of main libraries (not run at import)
+    subprocess.run( [ sys.executable, '--version' ], text=True ) # for Python script
+    pip_result = subprocess.Popen(
+        [ sys.executable, '-m', 'pip', 'list' ], 
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    grep_result = subprocess.Popen(
+        [ 'grep', '-E', 'pandas|alpaca|typing_extensions|^ta' ], 
+        stdin=pip_result.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    pip_result.stdout.close()
+    print ( grep_result.communicate()[0] ) 
 
 
 # **Built-in**
@@ -80,31 +81,40 @@ print ( grep_result.communicate()[0] )
 # Generic
 import pandas as pd                       # manipulate dataframes
 import pytz                               # time zones
-import pandas_market_calendars as mcal    # national holidays
+from lib.jv.lazy_import import LazyImport, lazy_imports  # heavy libraries imported on first use
+mcal = LazyImport( 'pandas_market_calendars' ) # national holidays
+http_session = LazyImport( 'lib.jv.http_session' ) # pooled keep-alive sessions of REST clients (imports requests)
+order_templates = LazyImport( 'lib.jv.order_templates' ) # pre-built order requests per ticker (imports requests)
 import inspect                            # log caller function name
 import random                             # simulate price volatility
+import json                               # parse API error messages
 from datetime import datetime, date, time, timedelta, timezone    # handle date & time
 from time import sleep                    # set timers
 from time import process_time_ns, perf_counter_ns # classic chrono vs CPU's calculation time
 from zoneinfo import ZoneInfo
 from sys import exit as halt_program      # stop whole process
 
+# Alpaca's modules are imported on first use of their classes
 # Historical data
-from alpaca.data.historical.stock import StockHistoricalDataClient
-from alpaca.data.requests         import StockBarsRequest, \
-                                         StockLatestTradeRequest, StockLatestQuoteRequest
-from alpaca.data.enums            import DataFeed
-from alpaca.data.timeframe        import TimeFrame, TimeFrameUnit
+StockHistoricalDataClient, = lazy_imports( 'alpaca.data.historical.stock', 'StockHistoricalDataClient' )
+StockBarsRequest, StockLatestTradeRequest, StockLatestQuoteRequest = lazy_imports( 'alpaca.data.requests', 
+    'StockBarsRequest', 'StockLatestTradeRequest', 'StockLatestQuoteRequest' )
+DataFeed,                 = lazy_imports( 'alpaca.data.enums', 'DataFeed' )
+TimeFrame, TimeFrameUnit  = lazy_imports( 'alpaca.data.timeframe', 'TimeFrame', 'TimeFrameUnit' )
 
 # Real-Time data
-from alpaca.trading.client        import TradingClient
-from alpaca.trading.requests      import MarketOrderRequest, GetOrdersRequest, GetAssetsRequest, \
-                                         TakeProfitRequest, StopLossRequest
-from alpaca.trading.enums         import OrderSide, OrderClass, OrderStatus, QueryOrderStatus, \
-                                         TimeInForce, AssetStatus, AssetClass
+TradingClient,            = lazy_imports( 'alpaca.trading.client', 'TradingClient' )
+MarketOrderRequest, GetOrdersRequest, GetAssetsRequest, TakeProfitRequest, StopLossRequest = lazy_imports( 
+    'alpaca.trading.requests', 
+    'MarketOrderRequest', 'GetOrdersRequest', 'GetAssetsRequest', 'TakeProfitRequest', 'StopLossRequest' )
+OrderSide, OrderClass, OrderStatus, QueryOrderStatus, TimeInForce, AssetStatus, AssetClass = lazy_imports( 
+    'alpaca.trading.enums', 
+    'OrderSide', 'OrderClass', 'OrderStatus', 'QueryOrderStatus', 'TimeInForce', 'AssetStatus', 'AssetClass' )
+Order,                    = lazy_imports( 'alpaca.trading.models', 'Order' )
+Sort,                     = lazy_imports( 'alpaca.common.enums', 'Sort' )
 # Crypto Data
-from alpaca.data.historical       import CryptoHistoricalDataClient
-from alpaca.data.requests         import CryptoLatestOrderbookRequest
+CryptoHistoricalDataClient,   = lazy_imports( 'alpaca.data.historical', 'CryptoHistoricalDataClient' )
+CryptoLatestOrderbookRequest, = lazy_imports( 'alpaca.data.requests', 'CryptoLatestOrderbookRequest' )
 
 
 # **Custom**
@@ -114,6 +124,24 @@ from alpaca.data.requests         import CryptoLatestOrderbookRequest
 
 from lib.jv.lib_api_orders        import *
 from lib.jv.signal_gen_ema_rsi    import generate_signal
+from lib.jv.signal_matrix         import SignalStateMatrix
+from lib.jv.price_store           import PriceStore
+from lib.jv.columnar_store        import ColumnarStore
+from lib.jv.rate_limit            import TokenBucket, RequestScheduler, ScheduledClient, CLIENT_REQUEST_KINDS
+from lib.jv.order_dispatch        import OrderDispatcher
+from lib.jv.order_book            import OrderBook, AlpacaTradeUpdatesFeed, enum_value
+from lib.jv.log_sink              import LogSink
+from lib.jv.session_calendar      import SessionIndex
+from lib.jv.strategy_params       import load_strategy_params
+from lib.jv.backtester            import get_bracket_prices
+from lib.jv.replay_source         import ReplaySource
+from lib.jv.latency               import LatencyRecorder
+from lib.jv.bar_aggregator        import BarAggregator, AlpacaTradesFeed
+from lib.jv.warm_start            import WarmStart
+from lib.jv.bulk_orders           import BulkOrders, new_outcome
+from lib.jv.order_index           import OrderIndex
+from lib.jv.bracket_record        import BracketRecord, brackets_to_frame
+from lib.jv.async_runtime         import VirtualClock
 
 
 # The _C_ - version of _signal_generator_ requires these files :
@@ -128,43 +156,77 @@ from lib.jv.signal_gen_ema_rsi    import generate_signal
 
 
 # C-language function
-import lib.jv.wrapper_c_signal_gen as c_signal_gen  # signal_generator in C-language
+import lib.jv.wrapper_c_signal_gen as c_signal_gen  # signal_generator in C-language (loaded on first call)
 
 # ## Constants & Parameters
 # **Load configuration file**
+# Values only (see lib/jv/config.py) : the file is not executed
+from lib.jv.config import load_config
 config_file_name = './cfg/cfg_paper_trading.py'
-with open( config_file_name ) as config_file : exec( config_file.read() )
+globals().update( load_config( config_file_name ) )
+USER_ZONE_OFFSET = int( datetime.now( tz=ZoneInfo( USER_ZONE_NAME ) ).utcoffset().total_seconds() )
 
 #called_via_import = ( __name__ == '__main__' ) 
 #unit_test_enabled = called_via_import
 unit_test_enabled = False
 
+# **Session state**
+# Set by the main script (assignment_1.py) : set_session() with the outputs of its pre_process(),
+# set_execution_mode() with the simulated clock & file suffix of the run
+execution_mode, clock_delay, file_suffix = 'normal', 0, ''
+TICKERS, CALENDAR, STRATEGY_PARAMS, WINDOW_SIZE = [], None, None, 0
+DATA_CLIENT, TRADING_CLIENT = None, None
+QUANTITY, TARGET_PCT, STOPLOSS_PCT = 1, 4, 2
+
+def set_session( tickers, calendar, clients, strategy_params, window_size, order_params ) :
+    global TICKERS, CALENDAR, DATA_CLIENT, TRADING_CLIENT, STRATEGY_PARAMS, WINDOW_SIZE
+    global QUANTITY, TARGET_PCT, STOPLOSS_PCT
+    TICKERS, CALENDAR, STRATEGY_PARAMS, WINDOW_SIZE = tickers, calendar, strategy_params, window_size
+    DATA_CLIENT, TRADING_CLIENT = clients
+    QUANTITY, TARGET_PCT, STOPLOSS_PCT = order_params[ 'QUANTITY' ], order_params[ 'TARGET_PCT' ], \
+                                         order_params[ 'STOPLOSS_PCT' ]
+
+def set_clock_delay( nb_seconds ) : # simulated clock of the advanced & accelerated modes
+    global clock_delay
+    clock_delay = nb_seconds
+
 # In[17]:
 
 display = lambda df_in : print( df_in.to_string( index=False ) ) 
 
-def save_log( text_in, file_suffix='' ) :
+def save_log( text_in, file_suffix='' ) : # text_in : messages not written by LOG_SINK (if any)
     file_timestamp = f'{current_timestamp():%Y%m%d}'
     file_path = f'{ LOG_DIR }api_orders{ file_suffix }_{ file_timestamp }.log'
-    with open( file_path, 'a' ) as log_file : log_file.write( text_in )
+    get_log_sink().flush() # messages are written during the day, wait for the last ones
     if len( text_in ) > 0 :
-        log( f'Log messages stored in : { file_path }' )
+        with open( file_path, 'a' ) as log_file : log_file.write( text_in )
+    log( f'Log messages stored in : { file_path }' )
+    get_log_sink().flush()
+
+def get_log_path( timestamp ) : # file of the day, suffix of the execution mode (global file_suffix)
+    return f'{ LOG_DIR }api_orders{ file_suffix }_{ timestamp:%Y%m%d}.log'
 
 
 # **Log message**
 # 
 # Prints timestamped caller function's name and text message 
+# - messages are queued & written by a background thread to api_orders{suffix}_YYYYMMDD.log (& .jsonl)
+# - callers on hot paths pass their name, to avoid inspecting the call stack
 
 # In[18]:
 
 
-def log( message_in, caller_name='' ) :
-    global daily_log, clock_delay
+def log( message_in, caller_name='', ticker=None, event='' ) :
     if caller_name == '' : caller_name = inspect.currentframe().f_back.f_code.co_name
-    message_out = f'{current_timestamp():%H:%M:%S} {caller_name:>15}():  {message_in}'
-    print( message_out )
-    #print( f'clock_delay={str( timedelta( seconds=abs( clock_delay ) ) )} or {clock_delay} seconds')
-    daily_log += message_out + '\n' 
+    get_log_sink().write( current_timestamp(), caller_name, message_in, ticker, event )
+
+def get_log_sink() : # writer thread started by the 1st message
+    global LOG_SINK
+    if LOG_SINK is None :
+        LOG_SINK = LogSink( get_log_path, queue_size=LOG_QUEUE_SIZE, fsync_interval=LOG_FSYNC_INTERVAL )
+    return LOG_SINK
+
+LOG_SINK = None  # global variable
 
 
 # **Log exception**
@@ -172,8 +234,8 @@ def log( message_in, caller_name='' ) :
 # In[19]:
 
 
-def log_exception( ex ) :
-    caller_name = inspect.currentframe().f_back.f_code.co_name
+def log_exception( ex, caller_name='' ) :
+    if caller_name == '' : caller_name = inspect.currentframe().f_back.f_code.co_name
     if hasattr( ex, 'message' ) :
         log( f'{ex.message}', caller_name )
     else :        
@@ -190,8 +252,25 @@ def log_exception( ex ) :
 
 def current_timestamp() : 
     global clock_delay
+    if REPLAY_CLOCK is not None : # replay mode : virtual time only
+        return REPLAY_CLOCK.now()
     return datetime.now( pytz.utc ) + timedelta( seconds=clock_delay )
 
+def advance_clock( nb_seconds ) : # virtual clock of the accelerated & replay modes
+    global clock_delay
+    if REPLAY_CLOCK is not None :
+        REPLAY_CLOCK.advance( nb_seconds )
+    else :
+        clock_delay += nb_seconds
+
+def pause( nb_seconds ) : # sleep, or advance the virtual clock in replay mode
+    if REPLAY_CLOCK is not None :
+        REPLAY_CLOCK.advance( nb_seconds )
+    else :
+        sleep( nb_seconds )
+
+REPLAY_SOURCE, REPLAY_CLOCK = None, None  # set by init_replay()
+
 
 # **Check function**
 
@@ -255,10 +334,7 @@ def get_market_info() :
 def get_today_endpoints() : 
     current_time = current_timestamp()
     try : 
-        period = CALENDAR.schedule( start_date=current_time, end_date=current_time )
-        open_dt, close_dt = period['market_open'], period['market_close']
-        #return open_dt, close_dt
-        return np_to_utc( open_dt ), np_to_utc( close_dt )    
+        return get_session_index().get_today_endpoints( current_time )
     except : 
         return None, None
 
@@ -275,6 +351,23 @@ if unit_test_enabled :
 
 
 # ### Sessions
+# **Session index**
+# 
+# Sessions of 1 year around today, built once from CALENDAR : lookups by binary search instead of
+# 1 call of CALENDAR.schedule() per query. Today's session is looked up again on date roll only.
+
+# In[ ]:
+
+
+def get_session_index() :
+    global SESSION_INDEX
+    if ( SESSION_INDEX is None ) or ( SESSION_INDEX.calendar is not CALENDAR ) : # new calendar
+        SESSION_INDEX = SessionIndex( CALENDAR )
+    return SESSION_INDEX
+
+SESSION_INDEX = None  # global variable
+
+
 # **Last Sessions**
 # 
 # Define function
@@ -282,12 +375,8 @@ if unit_test_enabled :
 # In[25]:
 
 
-def get_last_sessions() :
-    current_time = current_timestamp()
-    period_time  = timedelta( days=7 ) # 1-week period
-    schedule_window = CALENDAR.schedule( start_date = current_time - period_time, 
-                                         end_date   = current_time )
-    return schedule_window
+def get_last_sessions() : # sessions of the last 7 days & today
+    return get_session_index().get_last_sessions( current_timestamp() )
 
 
 # Check function
@@ -307,7 +396,7 @@ if unit_test_enabled :
 
 if unit_test_enabled :
     print( '\nUnit test of : get_next_sessions()' )
-    display( get_next_sessions( CALENDAR, current_timestamp() ) )
+    display( get_session_index().get_next_sessions( current_timestamp() ) )
 
 
 # ### Countdown
@@ -360,7 +449,7 @@ def get_seconds_to_opening() :
         opening = curr_time   
         log('Market is_open_now')
     else : # market opens in a future day  
-        opening, _ = get_next_sessions( CALENDAR, curr_time ).iloc[ 0 ]
+        opening, _ = get_session_index().get_next_sessions( curr_time ).iloc[ 0 ]
         log('Market opens in a future day')
     open_datetime = opening.timetuple()
     open_date, open_time = open_datetime[:3], open_datetime[3:6]
@@ -380,6 +469,37 @@ if unit_test_enabled :
     get_seconds_to_opening() 
 
 
+# ### Request scheduler
+# All calls of data & trading clients share 1 budget of API_MAX_REQUESTS_PER_MINUTE requests
+# - served by priority : order submission > LTP fetch > bracket verification > diagnostics
+# - identical reads in flight are sent once
+# - requests rejected by 429 drain the budget & are sent again by the scheduler (not by the session)
+# - requests go through 1 pooled keep-alive session per endpoint, opened before the market opens
+
+# In[ ]:
+
+
+# Burst of at least ORDER_WORKERS requests : orders of 1 bar aren't throttled to the average rate
+API_SCHEDULER = RequestScheduler( TokenBucket( API_MAX_REQUESTS_PER_MINUTE, burst=max( API_BURST, ORDER_WORKERS ) ) )
+
+def get_scheduled_client( client ) :
+    return ScheduledClient( client, API_SCHEDULER, CLIENT_REQUEST_KINDS )
+
+# Clients of the same endpoint share 1 pool of keep-alive connections, with timeouts & jittered retries
+def get_pooled_client( client ) :
+    return http_session.attach_session( client, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT )
+
+# Opens the connections (TCP + TLS) before the 1st request of the day
+def prewarm_connections() :
+    if REPLAY_SOURCE is None : # no API request in replay mode
+        http_session.prewarm_sessions( log=log )
+
+def log_api_counters() :
+    counters = pd.DataFrame( API_SCHEDULER.get_counters() ).T
+    counters[ 'waited' ] = counters[ 'waited' ].round( 1 )
+    log( f'API requests per kind :\n{counters.to_string()}' )
+
+
 # ### Trading account
 
 # **Define function**
@@ -391,7 +511,7 @@ def get_trading_client() :
     api_key, api_secret = get_credentials( CREDENTIALS_PATH )    
     try :
         # Get client instance for paper trading
-        TRADING_CLIENT = TradingClient( api_key, api_secret, paper=True )
+        TRADING_CLIENT = get_scheduled_client( get_pooled_client( TradingClient( api_key, api_secret, paper=True ) ) )
         # Get account info
         account = TRADING_CLIENT.get_account()    
         log( f'Account Status: {account.status}' )    
@@ -439,7 +559,7 @@ if unit_test_enabled :
 def get_data_client() :
     api_key, api_secret = get_credentials( CREDENTIALS_PATH )  
     try :
-        DATA_CLIENT = StockHistoricalDataClient( api_key, api_secret )
+        DATA_CLIENT = get_scheduled_client( get_pooled_client( StockHistoricalDataClient( api_key, api_secret ) ) )
         return DATA_CLIENT
     except Exception as ex :
         log( f'***** ERROR : Could not instantiate Historical Data Client\n{ex.message}' )
@@ -469,33 +589,26 @@ if unit_test_enabled :
 def get_historical_data( verbose=False) :
     # Define time window
     window_start, window_end = get_time_window()
+    if REPLAY_SOURCE is not None : # recorded prices until the end of the window
+        data = REPLAY_SOURCE.get_history( window_end, WINDOW_SIZE, TICKERS )
+        log( f'{len( data ):>4} most recent records until {window_end:%B %d %Hh%M} (replay)' )
+        return data
 
-    # Create request
-    request = StockBarsRequest( symbol_or_symbols=TICKERS, start=window_start, end=window_end,
-                timeframe=TimeFrame( HIST_INTERVAL, TimeFrameUnit.Minute ) )  # Minute Hour Day
-
-    # Submit request & get Pandas
+    # Submit request & get Pandas of Close prices, 1 column per ticker
     try :
-        data = DATA_CLIENT.get_stock_bars(request).df
+        data = get_bars( window_start, window_end )
     except Exception as ex :
         log( f'***** ERROR : Could not get historical data' )
         log_exception( ex )
         halt_program()
     #print( f'{ len( data ) } records fetched at {current_timestamp().time():%Hh%M} (UTC)' ) 
 
-    # Extract Close prices & set time as index 
-    data = data[[ 'close' ]].reset_index( level=0 )  
-    #print( f'\t last record timestamp : {data.index.max().time():%Hh%M}' )
-
     # Filter in open-market bars
     last_sessions = get_last_sessions()
     opening_time, closing_time = last_sessions.iloc[ -1 ]
     data = data.between_time( opening_time.time(), closing_time.time() )
     #print( f'\t {len( data )} records during market hours' )
 
-    # Pivot Panda's column 'symbol' to get 1 column per ticker
-    data = data.pivot( columns='symbol', values='close' )
-    
     # Filter in N most recent bars
     data = data[ -WINDOW_SIZE: ] 
             
@@ -515,6 +628,23 @@ def get_historical_data( verbose=False) :
 # In[37]:
 
 
+# Close prices of bars of all tickers in [ start, end ), 1 column per ticker (1 request)
+# feed : 'sip' (consolidated, delayed by HIST_MIN_DELAY), 'iex' (real-time) or None (default feed of the plan)
+def get_bars( start, end, feed=None ) :
+    if REPLAY_SOURCE is not None : # recorded prices
+        return REPLAY_SOURCE.get_bars( start, end, TICKERS )
+    request = StockBarsRequest( symbol_or_symbols=TICKERS, start=start, end=end, 
+                feed=DataFeed( feed ) if feed is not None else None,
+                timeframe=TimeFrame( HIST_INTERVAL, TimeFrameUnit.Minute ) )  # Minute Hour Day
+    data = DATA_CLIENT.get_stock_bars( request ).df
+    if len( data ) == 0 : # e.g. no trade yet
+        return pd.DataFrame( columns=pd.Index( TICKERS, name='symbol' ), dtype=float,
+                             index=pd.DatetimeIndex( [], tz='UTC', name='timestamp' ) )
+    # Extract Close prices & set time as index, then pivot column 'symbol' to get 1 column per ticker
+    data = data[[ 'close' ]].reset_index( level=0 ).pivot( columns='symbol', values='close' )
+    return data[ data.index < end ]   # no bar started at end (inclusive for Alpaca)
+
+
 def get_time_window( nb_days=5 ) :
     window_end   = current_timestamp() - timedelta( minutes=HIST_MIN_DELAY )
     window_size  = timedelta( days=nb_days ) # N-day window > 3-day long weekends
@@ -600,10 +730,23 @@ def simul_wait_until( open_dt ) :
     # Call normal function 
     normal_wait_until( open_dt )
 
+# Replay : virtual clock jumps to the next run instantly
+def replay_wait_until_next_run() :
+    # at a boundary, the next run is 1 interval later (the current one was run)
+    advance_clock( get_seconds_before_next_run() or INTERVAL )
+
+def replay_wait_until( open_dt ) :
+    log( f'Clock advanced to {open_dt:%H:%M:%S}' )
+    advance_clock( max( 0, ( open_dt - current_timestamp() ).total_seconds() ) )
+
 # Choose function's definition
 def get_prototypes( execution_mode ) :   # Choose normal or simulation functions
     if execution_mode == 'accelerated' : 
         return simul_wait_until, simul_wait_until_next_run, simul_get_ltps, simul_place_order
+    if execution_mode == 'replay' : 
+        return replay_wait_until, replay_wait_until_next_run, replay_get_ltps, replay_place_order
+    if execution_mode == 'normal' and MARKET_DATA_STREAM_ENABLED : 
+        return normal_wait_until, normal_wait_until_next_run, stream_get_ltps, normal_place_order
     else : 
         return normal_wait_until, normal_wait_until_next_run, normal_get_ltps, normal_place_order
 
@@ -631,7 +774,7 @@ def normal_get_ltps() :
     df_ltps = df_trades.pivot( index='timestamp', columns='symbol', values='price' )
     #log( f'{ltps.iloc[0].values}' ) # print ltp values
     str_ltps = [ f'{i:#.1f}' for i in df_ltps.iloc[ 0 ][ :10 ] ]
-    log( f'{" ".join( str_ltps )} ...' )
+    log( f'{" ".join( str_ltps )} ...', 'normal_get_ltps' )
 
     return df_ltps
 
@@ -644,10 +787,79 @@ def simul_get_ltps() :
     df_ltps = df_ltps * random_factor
     
     str_ltps = [ f'{i:#.1f}' for i in df_ltps.iloc[ 0 ][ :10 ] ]
-    log( f'{" ".join( str_ltps )} ... (random)' )
+    log( f'{" ".join( str_ltps )} ... (random)', 'simul_get_ltps' )
 
     return df_ltps
-        
+
+# Recorded prices at the virtual clock's time, with seeded variation
+def replay_get_ltps() :
+    df_ltps = REPLAY_SOURCE.get_ltps( current_timestamp(), TICKERS )
+    str_ltps = [ f'{i:#.1f}' for i in df_ltps.iloc[ 0 ][ :10 ] ]
+    log( f'{" ".join( str_ltps )} ... (replay)', 'replay_get_ltps' )
+    return df_ltps
+
+# Replay recorded prices : CSV file or date 'YYYYMMDD' of DATA_STORE, from start_time (virtual clock)
+def init_replay( source=None, start_time=None, seed=None, max_pct_delta=None ) :
+    global REPLAY_SOURCE, REPLAY_CLOCK
+    source = source or REPLAY_PATH
+    seed = REPLAY_SEED if seed is None else seed
+    max_pct_delta = REPLAY_MAX_PCT_DELTA if max_pct_delta is None else max_pct_delta
+    if source.endswith( '.csv' ) :
+        REPLAY_SOURCE = ReplaySource.from_csv( source, seed=seed, max_pct_delta=max_pct_delta )
+    else :
+        REPLAY_SOURCE = ReplaySource.from_store( DATA_STORE, source, seed=seed, max_pct_delta=max_pct_delta )
+    if start_time is None : # after enough records for the moving window & the feed's delay
+        records = REPLAY_SOURCE.history.index
+        start_time = records[ min( WINDOW_SIZE, len( records ) - 1 ) ] + timedelta( minutes=HIST_MIN_DELAY )
+    REPLAY_CLOCK = VirtualClock( start_time=pd.Timestamp( start_time ).to_pydatetime() )
+    log( f'Replay of {source} from {current_timestamp():%B %d %H:%M:%S} (seed={seed})' )
+
+# Streaming market data (normal mode, MARKET_DATA_STREAM_ENABLED) : LTPs = closes of bars aggregated from the
+# trades websocket, instead of polling latest trades on each tick
+# - the stream is started by the 1st call of each session, seeded by 1 REST request of latest trades,
+#   & stopped by save_results() at the end of the session
+# - each tick gets the bar of the interval that just ended as soon as it's closed (delays : 'close_bar' spans),
+#   labelled by the start of its interval as the REST bars of the warm start & of reconcile_history()
+def stream_get_ltps() :
+    aggregator = get_bar_aggregator()
+    if aggregator is None : # stream not available : polling
+        return normal_get_ltps()
+    bar_end = pd.Timestamp( current_timestamp() ).floor( f'{INTERVAL}s' )   # end of the last interval
+    bar_time = bar_end - pd.Timedelta( seconds=INTERVAL )                    # label : start of the interval
+    df_ltps = aggregator.wait_bar( bar_time, BAR_CLOSE_GRACE )
+    str_ltps = [ f'{i:#.1f}' for i in df_ltps.iloc[ 0 ][ :10 ] ]
+    log( f'{" ".join( str_ltps )} ... (bar {bar_time:%H:%M})', 'stream_get_ltps' )
+    return df_ltps
+
+def get_bar_aggregator() :
+    global BAR_AGGREGATOR, MARKET_DATA_STREAM
+    if BAR_AGGREGATOR is None and MARKET_DATA_STREAM is None :
+        try :
+            aggregator = BarAggregator( TICKERS, INTERVAL, LATENCY )
+            aggregator.seed( normal_get_ltps().iloc[ 0 ] )
+            MARKET_DATA_STREAM = AlpacaTradesFeed( *get_credentials( CREDENTIALS_PATH ), feed=MARKET_DATA_FEED )
+            MARKET_DATA_STREAM.start( aggregator )
+            BAR_AGGREGATOR = aggregator
+            log( f'Trades of {len( TICKERS )} tickers streamed ({MARKET_DATA_FEED}) into {INTERVAL}-second bars' )
+        except Exception as ex :
+            MARKET_DATA_STREAM = False   # not retried
+            log( '***** ERROR : Could not subscribe to market data stream, LTPs polled with REST' )
+            log_exception( ex )
+    return BAR_AGGREGATOR
+
+# End of session : stream stopped, a new aggregator is started & seeded by the 1st call of the next session
+def stop_market_data_stream() :
+    global BAR_AGGREGATOR, MARKET_DATA_STREAM
+    if MARKET_DATA_STREAM : # neither None nor False (stream not available)
+        try :
+            MARKET_DATA_STREAM.stop()
+        except Exception as ex :
+            log( '***** ERROR : Could not stop market data stream' )
+            log_exception( ex )
+    BAR_AGGREGATOR, MARKET_DATA_STREAM = None, None
+
+BAR_AGGREGATOR, MARKET_DATA_STREAM = None, None  # global variables
+
 get_ltps = normal_get_ltps
 
 
@@ -686,21 +898,46 @@ if unit_test_enabled :
 # In[44]:
 
 
-def save_results( daily_log, daily_history, daily_chrono, suffix='' ) :
+def save_results( daily_log, daily_history, suffix='' ) :
+    stop_market_data_stream()  # no bar of this session carried into the next one
     try : 
         # Daily historical data
-        save_df_to_csv( f'hist{ suffix }_', daily_history, 'Historical Data' )
-        # Chronometer records for performance measures
-        chrono_results = get_chrono_results( daily_chrono )
-        save_df_to_csv( f'chrono_ms{ suffix }_', chrono_results, 'Chronometer Records in ms' )
+        if isinstance( daily_history, PriceStore ) : # records not flushed yet during the day
+            nb_records = daily_history.flush()
+            spill_path = daily_history.spill_path or daily_history.spill_partition.path
+            log( f'Historical Data ({nb_records} last records) stored in : {spill_path}' )
+        else :
+            save_df( f'hist{ suffix }_', daily_history, 'Historical Data' )
+        # Latency percentiles per stage & ticker for performance measures
+        save_df( f'latency_ms{ suffix }_', LATENCY.get_summary( by_ticker=True ), 'Latency percentiles in ms' )
+        LATENCY.reset()
         # Daily updated orders
         daily_orders = get_daily_orders( current_timestamp().date() )
-        save_df_to_csv( f'orders{ suffix }_', daily_orders, 'Orders Summary' )
+        save_df( f'orders{ suffix }_', daily_orders, 'Orders Summary' )
+        # Brackets submitted during the session, as submitted (1 Pandas for all brackets)
+        save_df( f'brackets{ suffix }_', get_submitted_brackets(), 'Submitted Brackets' )
+        BRACKETS.clear()
     finally :
         # Log execution
+        log_api_counters()
         save_log( daily_log, suffix )    
 
 
+# **Price Store**
+# 
+# Daily history kept in a fixed-size ring buffer, flushed to file hist{suffix}_YYYYMMDD.csv
+
+# In[ ]:
+
+
+def get_price_store( history, suffix='' ) :
+    spill_path = f'{ CSV_DIR }hist{ suffix }_{ current_timestamp():%Y%m%d}.csv' if 'csv' in STORAGE_FORMATS else None
+    spill_partition = None
+    if 'columnar' in STORAGE_FORMATS : # rows appended to the columnar store as well
+        spill_partition = DATA_STORE.partition( f'hist{ suffix }', current_timestamp() )
+    return PriceStore.from_frame( history, HIST_CAPACITY, spill_path, spill_partition )
+
+
 # ## Orders
 # **Bracket Orders**
 # 
@@ -718,38 +955,74 @@ def save_results( daily_log, daily_history, daily_chrono, suffix='' ) :
 
 def normal_place_order( current_price, ticker, quantity, signal ) :
 
-    MIN_OFFSET = 0.015   # Minimum delta compared to base price ~= LTP 
-    target   = round( ( 1 + signal * TARGET_PCT   / 100) * current_price, 2 )
-    stoploss = round( ( 1 - signal * STOPLOSS_PCT / 100) * current_price - MIN_OFFSET, 2 ) 
-    log( f'{ticker}: [target (take_profit.limit_price),  stoploss] = [{target}, {stoploss}]' )
+    target, stoploss = get_bracket_prices( current_price, signal, TARGET_PCT, STOPLOSS_PCT ) # same as backtester
+    # Submit order request, then log (off the signal-to-wire path)
+    try : 
+        submitted_order = submit_bracket( ticker, quantity, signal, target, stoploss )
+        log( f'{ticker}: [target (take_profit.limit_price),  stoploss] = [{target}, {stoploss}]', 
+             'normal_place_order', ticker, 'order' )
+        log( f'{ticker}: submitted order \t ID = {submitted_order.id}' + 5*('='), 'normal_place_order', ticker, 'order' )
+        return submitted_order        
+    except Exception as ex :
+        log( f'{ticker}: ***** ERROR : Could not place order [{target}, {stoploss}]\n{get_error_fields( ex )}' )
+        return None
 
-    # Get position
-    if signal == +1 :
-        position = OrderSide.BUY  
-    else : # Case signal == -1
-        position = OrderSide.SELL
-    
-    # Set request parameters
-    order_request = MarketOrderRequest(
+# Fields of an API error (JSON message of alpaca-py's APIError), else its message alone
+def get_error_fields( ex ) :
+    try :
+        fields = json.loads( str( ex ) )
+    except ValueError :
+        fields = None
+    return fields if isinstance( fields, dict ) else { 'message':str( ex ) }
+
+# Bracket order request, validated by alpaca-py
+def build_bracket_request( ticker, quantity, signal=+1, target=2.0, stoploss=1.0 ) :
+    return MarketOrderRequest(
         symbol        = ticker,
         qty           = quantity,
-        side          = position,
+        side          = OrderSide.BUY if signal == +1 else OrderSide.SELL,
         time_in_force = TimeInForce.GTC,  # Good unTil Cancelled != DAY that expires at close time
         order_class   = OrderClass.BRACKET,
         take_profit   = TakeProfitRequest( limit_price=target ),
         stop_loss     = StopLossRequest( stop_price=stoploss ),
     )    
-    # Submit order request
-    try : 
-        submitted_order = TRADING_CLIENT.submit_order( order_data=order_request )
-        log( f'{ticker}: submitted order \t ID = {submitted_order.id}' + 5*('=') )
-        return submitted_order        
-    except Exception as ex :
-        log( f'{ticker}: ***** ERROR : Could not place order\n{eval( str( ex ) )}' )
-        return None
+
+# Pre-built request of the ticker (side & prices filled in, serialized once), else request built & validated now
+def submit_bracket( ticker, quantity, signal, target, stoploss ) :
+    if ( ORDER_TEMPLATES is not None ) and ORDER_TEMPLATES.is_ready( ticker, quantity ) :
+        return ORDER_TEMPLATES.submit( ticker, signal, target, stoploss )
+    return TRADING_CLIENT.submit_order( order_data=build_bracket_request( ticker, quantity, signal, target, stoploss ) )
+
+# Requests of all tickers validated & serialized at session start (symbol, qty, time in force, class)
+def init_order_templates() :
+    global ORDER_TEMPLATES
+    if REPLAY_SOURCE is not None : # replayed orders are local : no request
+        return
+    templates = order_templates.OrderTemplates(
+        build_bracket_request, parse_order=lambda fields : Order( **fields ),
+        call=lambda send, body : API_SCHEDULER.call( CLIENT_REQUEST_KINDS[ 'submit_order' ], send, body ) )
+    try :
+        failed = templates.prepare( getattr( TRADING_CLIENT, 'client', TRADING_CLIENT ), TICKERS, QUANTITY )
+    except Exception as ex : # e.g. internals of another alpaca-py : requests built after each signal
+        log( '***** ERROR : Could not pre-build order requests, orders submitted by submit_order()' )
+        log_exception( ex )
+        return
+    ORDER_TEMPLATES = templates
+    log( f'Order requests pre-built for {len( TICKERS ) - len( failed )} tickers'
+         + ( f', not validated : {failed}' if len( failed ) > 0 else '' ) )
+
+ORDER_TEMPLATES = None  # global variable
 
 wait_until, wait_until_next_run, get_ltps, place_order = get_prototypes( 'normal' )
 
+# Prototypes of the execution mode used by the library, returned to the main script
+def set_execution_mode( mode, delay=0, suffix='' ) :
+    global execution_mode, file_suffix, wait_until, wait_until_next_run, get_ltps, place_order
+    execution_mode, file_suffix = mode, suffix
+    set_clock_delay( delay )
+    wait_until, wait_until_next_run, get_ltps, place_order = get_prototypes( mode )
+    return wait_until, wait_until_next_run, get_ltps, place_order
+
 
 # In[46]:
 
@@ -757,36 +1030,18 @@ wait_until, wait_until_next_run, get_ltps, place_order = get_prototypes( 'normal
 # Random variation of prices to simulate volatility
 def simul_place_order( curr_price, ticker, quantity, signal ) :
 
-    MIN_OFFSET = 0.015   # Minimum delta compared to base price ~= LTP 
-    target   = round( ( 1 + signal * TARGET_PCT   / 100) * curr_price, 2 )
-    stoploss = round( ( 1 - signal * STOPLOSS_PCT / 100) * curr_price - MIN_OFFSET, 2 ) 
-    log( f'{ticker}: [target (take_profit.limit_price),  stoploss] = [{target}, {stoploss}]' )
-
-    # Get position
-    if signal == +1 :
-        position = OrderSide.BUY  
-    else : # Case signal == -1
-        position = OrderSide.SELL
-    
-    # Set request parameters
-    order_request = MarketOrderRequest(
-        symbol        = ticker,
-        qty           = quantity,
-        side          = position,
-        time_in_force = TimeInForce.GTC,  # Good unTil Cancelled != DAY that expires at close time
-        order_class   = OrderClass.BRACKET,
-        take_profit   = TakeProfitRequest( limit_price=target ),
-        stop_loss     = StopLossRequest( stop_price=stoploss ),
-    )    
-    # Submit order request
+    target, stoploss = get_bracket_prices( curr_price, signal, TARGET_PCT, STOPLOSS_PCT ) # same as backtester
+    # Submit order request, then log (off the signal-to-wire path)
     try : 
-        submitted_order = TRADING_CLIENT.submit_order( order_data=order_request )
-        log( f'{ticker}: submitted order \t ID = {submitted_order.id}' + 5*('=') )
+        submitted_order = submit_bracket( ticker, quantity, signal, target, stoploss )
+        log( f'{ticker}: [target (take_profit.limit_price),  stoploss] = [{target}, {stoploss}]', 
+             'simul_place_order', ticker, 'order' )
+        log( f'{ticker}: submitted order \t ID = {submitted_order.id}' + 5*('='), 'simul_place_order', ticker, 'order' )
         return submitted_order        
     except Exception as ex :
-        log( f'{ticker}: ***** ERROR : Could not place order' )
+        log( f'{ticker}: ***** ERROR : Could not place order [{target}, {stoploss}]' )
         # 2nd try to place order using base price
-        dict_ex = eval( str( ex ) )
+        dict_ex = get_error_fields( ex )
         log( f'{ticker}: {dict_ex}' )
         if ( 'base_price' in dict_ex.keys() ) :
             base_price = float( dict_ex[ 'base_price' ] )
@@ -799,7 +1054,41 @@ def simul_place_order( curr_price, ticker, quantity, signal ) :
         else :
             return None
 
+# Local bracket order filled by later replayed LTPs
+def replay_place_order( curr_price, ticker, quantity, signal ) :
+    target, stoploss = get_bracket_prices( curr_price, signal, TARGET_PCT, STOPLOSS_PCT ) # same as backtester
+    log( f'{ticker}: [target (take_profit.limit_price),  stoploss] = [{target}, {stoploss}]', 
+         'replay_place_order', ticker, 'order' )
+    submitted_order = REPLAY_SOURCE.submit_order( current_timestamp(), ticker, curr_price, quantity, signal,
+                                                  target, stoploss )
+    log( f'{ticker}: submitted order \t ID = {submitted_order.id}' + 5*('='), 'replay_place_order', ticker, 'order' )
+    return submitted_order
+
 single_order_to_df = lambda order : pd.DataFrame( dict( order ), index=[''] )
+
+
+# ### Dispatch
+# Submit orders of all tickers concurrently
+# - bounded pool of ORDER_WORKERS threads, orders of 1 ticker submitted in sequence
+# - requests are budgeted by API_SCHEDULER (order submissions first)
+# - bracket checks run in background
+
+# In[ ]:
+
+
+LATENCY          = LatencyRecorder()  # latency spans per stage & ticker
+ORDER_BOOK       = OrderBook( ORDER_BOOK_RECONCILE_INTERVAL )  # seeded by init_order_book()
+ORDER_DISPATCHER = OrderDispatcher( 
+    lambda *order_args : place_order( *order_args ),   # current prototype : normal or simulation
+    lambda order : check_submitted_bracket( order ), 
+    max_workers=ORDER_WORKERS, log=log,
+    on_submitted=ORDER_BOOK.on_order, latency=LATENCY )
+BULK_ORDERS      = BulkOrders(   # cancellations through the shared rate budget of TRADING_CLIENT
+    lambda order_id : TRADING_CLIENT.cancel_order_by_id( order_id ), 
+    lambda order_ids, symbols : get_order_statuses( order_ids, symbols ),
+    cancel_all=lambda : { str( r.id ):r.status for r in TRADING_CLIENT.cancel_orders() },
+    get_status=ORDER_BOOK.get_status,   # updated by trade update events
+    max_workers=ORDER_WORKERS, timeout=CANCEL_CONFIRM_TIMEOUT, log=log )
 # **Check function**
 
 # In[47]:
@@ -827,37 +1116,15 @@ if unit_test_enabled :
 
 
 def get_orders_by_status( status='all', verbose=True ) : # all pending canceled filled
-    # Set target status
-    if status == 'pending' : 
-        order_statuses = [ 'accepted', 'new', 'held', 'partially filled' ]
-    else : 
-        order_statuses = [ status ]
-    
-    # Submit request to list all Ordersget_orders_by_status
-    filter_all = GetOrdersRequest( status=QueryOrderStatus.ALL, limit=500 )
-    all_orders_unformatted = TRADING_CLIENT.get_orders( filter=filter_all )
-
     try :
-        # Convert Orders list to 1 Pandas
-        all_orders = list_of_dicts_to_df( all_orders_unformatted ).set_index( 'id' )
-        
-        # Select Pandas' columns
-        all_orders = all_orders[[ 'symbol', 'type', 'status', 'position_intent', 'limit_price', 'stop_price', 
-                          'qty', 'created_at', 'updated_at', 'expires_at', 'canceled_at', 'time_in_force' ]]
-        # Remove redundant key prefixes
-        all_orders = remove_prefixes( all_orders)
-    
-        # Filter orders by status
-        if status == 'all' :         
-            # Count orders per status
-            if verbose :
-                orders_counts = all_orders[ 'status' ].value_counts()
-                display( pd.DataFrame( orders_counts ) )
-            return all_orders
-        else :
-            subset_orders = all_orders[ all_orders[ 'status' ].isin( order_statuses ) ]            
-            subset_orders = remove_prefixes( subset_orders )
-            return subset_orders
+        # Sync local index of orders : only orders created since its cursor are requested
+        ORDER_INDEX.sync()
+        orders = ORDER_INDEX.get_orders( status )
+        # Count orders per status
+        if status == 'all' and verbose :
+            orders_counts = orders[ 'status' ].value_counts()
+            display( pd.DataFrame( orders_counts ) )
+        return orders
             
     except Exception as ex :
         print( f'***** ERROR : Could not get a list of orders as a Pandas' )
@@ -865,7 +1132,41 @@ def get_orders_by_status( status='all', verbose=True ) : # all pending canceled
         return None    
 
 
-# In[49]:
+# Orders created after a date (None : all), oldest first, legs nested in their bracket
+def list_orders_after( after, limit ) :
+    request = GetOrdersRequest( status=QueryOrderStatus.ALL, after=after, limit=limit, direction=Sort.ASC, nested=True )
+    return TRADING_CLIENT.get_orders( filter=request )
+
+# Open orders, legs listed as orders
+def list_open_orders( limit ) :
+    return TRADING_CLIENT.get_orders( filter=GetOrdersRequest( status=QueryOrderStatus.OPEN, limit=limit, nested=False ) )
+
+# Local index of all orders (lib/jv/order_index.py), persisted in the columnar store
+# - queries by status, symbol, date & parent bracket : ORDER_INDEX.get_orders( 'pending', symbols=[ 'AAPL' ] )
+# - open orders refreshed by trade update events & by 1 listing of open orders per sync
+ORDER_INDEX = OrderIndex( list_orders_after, STORE_DIR + 'order_index' if 'columnar' in STORAGE_FORMATS else None,
+                          list_open=list_open_orders, get_order=lambda order_id : TRADING_CLIENT.get_order_by_id( order_id ) )
+
+
+# Statuses of given orders : { id : status } (legs listed as orders)
+# - pages of 500 orders, most recent first, until all orders are found
+# - bounded by the creation of the oldest order (ORDER_INDEX) : 1 request unless > 500 orders were created since
+def get_order_statuses( order_ids, symbols=None ) :
+    order_ids, statuses = set( order_ids ), {}
+    after = ORDER_INDEX.get_oldest_creation( order_ids )
+    after, until = ( after - timedelta( seconds=1 ) if after is not None else None ), None
+    while True :
+        request = GetOrdersRequest( status=QueryOrderStatus.ALL, limit=500, symbols=symbols, nested=False,
+                                    after=after, until=until, direction=Sort.DESC )
+        page = TRADING_CLIENT.get_orders( filter=request )
+        statuses.update( { str( order.id ):enum_value( order.status ) for order in page if str( order.id ) in order_ids } )
+        if len( page ) < 500 or len( statuses ) == len( order_ids ) :
+            return statuses
+        # Next page : orders submitted before the oldest one of this page (until is exclusive)
+        next_until = min( order.submitted_at or order.created_at for order in page ) + timedelta( microseconds=1 )
+        if next_until == until : # > 500 orders submitted at the same time
+            return statuses
+        until = next_until
 
 
 def remove_prefixes( orders ) :
@@ -896,6 +1197,51 @@ if unit_test_enabled :
     display( pending_orders.head() )
 
 
+# #### Order book
+# Local state of orders & positions per ticker (ORDER_BOOK), instead of REST requests on each scan
+# - seeded once by the daily one-shot from all orders & open positions
+# - updated by submitted orders (ORDER_DISPATCHER) & by trade update events
+# - reconciled with REST every ORDER_BOOK_RECONCILE_INTERVAL seconds
+
+# In[ ]:
+
+
+def init_order_book( feed=None ) : # feed : trade updates source (websocket by default)
+    reconcile_order_book( force=True )
+    global TRADE_UPDATES_FEED
+    if TRADE_UPDATES_FEED is None :
+        if feed is None and REPLAY_SOURCE is not None : # trade updates of replayed brackets
+            feed = REPLAY_SOURCE
+        elif feed is None and TRADE_UPDATES_ENABLED :
+            try :
+                feed = AlpacaTradeUpdatesFeed( *get_credentials( CREDENTIALS_PATH ), paper=True )
+            except Exception as ex :
+                log( '***** ERROR : Could not subscribe to trade updates, order book reconciled with REST only' )
+                log_exception( ex )
+        if feed is not None :
+            feed.start( on_trade_update )
+            TRADE_UPDATES_FEED = feed
+    log( f'Order book : {len( ORDER_BOOK.get_tickers_pending() )} tickers with pending orders, '
+         f'{len( ORDER_BOOK.get_tickers_positions() )} with open positions' )
+
+def on_trade_update( event ) : # order book & order index updated without request
+    ORDER_BOOK.on_trade_update( event )
+    ORDER_INDEX.on_trade_update( event )
+
+def reconcile_order_book( force=False ) :
+    if REPLAY_SOURCE is not None : # replayed orders are local : no REST
+        if force : ORDER_BOOK.seed( REPLAY_SOURCE.get_orders(), [] )
+        return
+    if force or ORDER_BOOK.needs_reconcile() :
+        all_orders = get_orders_by_status( 'all', verbose=False )
+        positions  = TRADING_CLIENT.get_all_positions()
+        nb_corrected = ORDER_BOOK.reconcile( all_orders, positions )
+        if nb_corrected > 0 and not force :
+            log( f'Order book : {nb_corrected} tickers corrected by reconciliation' )
+
+TRADE_UPDATES_FEED = None  # global variable
+
+
 # #### Daily Orders
 
 # **Define function**
@@ -904,9 +1250,11 @@ if unit_test_enabled :
 
 
 def get_daily_orders( date_in ) :
-    all_orders   = get_orders_by_status( 'all', verbose=False )
-    daily_mask   = ( all_orders[ 'created_at' ].apply( datetime.date ) == date_in )
-    return all_orders [ daily_mask ]
+    if REPLAY_SOURCE is not None :
+        return REPLAY_SOURCE.get_orders()
+    ORDER_INDEX.sync()
+    day_start = pd.Timestamp( date_in ).tz_localize( 'UTC' )
+    return ORDER_INDEX.get_orders( 'all', start=day_start, end=day_start + timedelta( days=1 ) )
 
 
 # **Check function**
@@ -939,6 +1287,38 @@ if unit_test_enabled :
     display( daily_orders.head() )    
 
 
+# **Columnar store**
+# 
+# Same Pandas stored in typed binary columns, 1 folder per dataset & date : STORE_DIR/{dataset}/YYYYMMDD/
+# - memory-mapped reads (no parsing) for backtests, appends during the day
+# - existing CSV files are converted once by convert_csv_dir( CSV_DIR, DATA_STORE )
+
+# In[ ]:
+
+
+DATA_STORE = ColumnarStore( STORE_DIR )
+
+def save_df( file_prefix, df_in, text_in='Pandas', timestamp=None ) : # in formats of STORAGE_FORMATS
+    if 'csv' in STORAGE_FORMATS :
+        save_df_to_csv( file_prefix, df_in, text_in, timestamp )
+    if 'columnar' in STORAGE_FORMATS and len( df_in ) > 0 :
+        if timestamp is None :
+            timestamp = current_timestamp()
+        dataset = file_prefix.rstrip( '_' )
+        try :
+            DATA_STORE.write( dataset, timestamp, df_in )
+            log( f'{text_in} stored in : {STORE_DIR}{dataset}/{timestamp:%Y%m%d}' )
+        except Exception as ex :
+            log( f'***** ERROR : Could not store {text_in} in columnar format' )
+            log_exception( ex )
+
+def read_daily_df( file_prefix, date, index_column=None, timestamp_index=False ) : # date : 'YYYYMMDD'
+    partition = DATA_STORE.partition( file_prefix.rstrip( '_' ), date )
+    if partition.exists() :
+        return partition.read()
+    return read_df_from_csv( f'{CSV_DIR}{file_prefix}{date}.csv', index_column, timestamp_index )
+
+
 # Read from file
 
 # In[57]:
@@ -990,35 +1370,25 @@ if unit_test_enabled :
 # In[61]:
 
 
-def check_bracket( order_id ) :
-    order = TRADING_CLIENT.get_order_by_id( order_id )
-    # convert to pandas
-    selected_cols = [ 'symbol', 'type', 'status', 'position_intent', 'limit_price', 'stop_price', 
-                          'qty', 'created_at', 'expires_at', 'time_in_force' ]
-    o_dict = dict( order )
-    if o_dict['legs'] is None :
-        o_pandas = pd.DataFrame( o_dict, index=[ 'id' ] )
-    else : 
-        o_pandas = pd.DataFrame( o_dict ).set_index( 'id' )
-
-    has_child_orders = ( o_pandas[ 'legs' ].iloc[0] != None )
-    if has_child_orders :
-        o_legs = o_pandas[ 'legs' ] 
-        # print( 'This is a bracket order linked to 1 target order & 1 stoploss order' )
-    o_pandas = o_pandas[ selected_cols ].drop_duplicates() 
-
-    if has_child_orders :
-        list_of_dicts = []
-        for order in o_legs :
-            order_dict = dict( order )
-            list_of_dicts.append( order_dict )
-        leg_pandas = pd.DataFrame( list_of_dicts ).set_index( 'id' )
-        leg_pandas = leg_pandas[ selected_cols ] 
-        
-        o_pandas = pd.concat( [ o_pandas, leg_pandas ] )
-        o_pandas = remove_prefixes( o_pandas )
-        
-    return o_pandas
+def check_bracket( order_id ) : # Pandas of the bracket (parent & legs), 1 request
+    if REPLAY_SOURCE is not None : # replayed brackets are filled by REPLAY_SOURCE
+        return None
+    return brackets_to_frame( [ BracketRecord.from_order( TRADING_CLIENT.get_order_by_id( order_id ) ) ] )
+
+def check_submitted_bracket( order ) : # consistency of a submitted bracket from its submit response, no request
+    bracket = BracketRecord.from_order( order )
+    BRACKETS[ bracket.parent.id ] = bracket   # written by the bracket thread of ORDER_DISPATCHER only
+    errors = bracket.check()
+    if len( errors ) > 0 :
+        ticker = bracket.parent.symbol
+        log( f'{ticker}: ***** ERROR : Inconsistent bracket {bracket.parent.id} : {"; ".join( errors )}', 
+             'check_submitted_bracket', ticker, 'order' )
+    return bracket
+
+def get_submitted_brackets() : # Pandas of the brackets submitted during the session (parents & legs)
+    return brackets_to_frame( list( BRACKETS.values() ) )
+
+BRACKETS = {}   # parent order id -> BracketRecord of the brackets submitted during the session
 
 
 # **Check function**
@@ -1038,8 +1408,8 @@ if unit_test_enabled :
 
 
 def check_last_bracket() :
-    all_orders = get_orders_by_status( 'all', verbose=False )
-    bracket_orders = all_orders[ all_orders[ 'type' ]=='market' ]
+    ORDER_INDEX.sync()
+    bracket_orders = ORDER_INDEX.get_orders( 'all', order_type='market' )
     nb_bracket_orders = len( bracket_orders )
     if  nb_bracket_orders == 0 : 
         print( 'List of bracket orders is empty' )  
@@ -1065,27 +1435,19 @@ if unit_test_enabled :
 # In[65]:
 
 
-def cancel_order( order_id ) :
-    # Check for bracket orders that may be canceled
-        nb_pending_bracket_orders, _ = list_pending_bracket_orders()
-        if nb_pending_bracket_orders > 0 :         
-            try : 
-                # Submit cancel request
-                TRADING_CLIENT.cancel_order_by_id( order_id )
-                # Get canceled order info
-                order_info = TRADING_CLIENT.get_order_by_id( order_id )   
-                sleep( 1 ) # wait until request is processed
-                nb_pending_bracket_orders_after, _ = list_pending_bracket_orders()
-                nb_canceled_orders = nb_pending_bracket_orders - nb_pending_bracket_orders_after
-                if nb_canceled_orders == 1 :
-                    print( f'order {order_id} was canceled' )
-                else :
-                    print( f'***** ERROR: order {order_id} could not be canceled' )
-                    print( f'For more info run : check_bracket( "{order_id}" )' )
-                return order_info
-            except Exception as ex :
-                log( f'***** ERROR : Could not cancel order {order_id}' )
-                log_exception( ex )
+def cancel_order( order_id ) : # outcome of the cancellation, confirmed without listing pending orders
+    outcomes = BULK_ORDERS.cancel( pd.DataFrame( { 'symbol':[ None ] }, index=pd.Index( [ order_id ], name='id' ) ) )
+    log_cancel_outcomes( outcomes )
+    if not outcomes[ 'confirmed' ].iloc[ 0 ] :
+        print( f'For more info run : check_bracket( "{order_id}" )' )
+    return outcomes
+
+def log_cancel_outcomes( outcomes, text_in='orders' ) :
+    for order_id, outcome in outcomes[ outcomes[ 'request' ] == 'failed' ].iterrows() :
+        log( f'***** ERROR : Could not cancel order {order_id} ({outcome["status"]}) : {outcome["error"]}' )
+    counts = ' '.join( f'{status}={count}' for status, count in outcomes[ 'status' ].value_counts().items() )
+    log( f'{len( outcomes )} {text_in} : {counts}, {outcomes[ "confirmed" ].sum()} confirmed '
+         f'in {outcomes[ "seconds" ].max():.2f}s' )
 
 
 # In[66]:
@@ -1152,14 +1514,14 @@ if unit_test_enabled :
 # In[71]:
 
 
+# 1 snapshot of pending brackets, cancellations sent concurrently & confirmed by batched status queries
 def cancel_pending_brackets() :
     nb_orders, orders = list_pending_bracket_orders( verbose=True )
-    while True : 
-        if nb_orders == 0 :
-            break
-        last_order_id = orders.index[0]
-        cancel_order( last_order_id ) 
-        nb_orders, orders = list_pending_bracket_orders( verbose=False )
+    if nb_orders == 0 :
+        return None
+    outcomes = BULK_ORDERS.cancel( orders )
+    log_cancel_outcomes( outcomes, 'brackets' )
+    return outcomes
 
 
 # **Check function**
@@ -1264,7 +1626,7 @@ def get_5_depth_quote() :
 if unit_test_enabled :
     print( '\nUnit test of : get_5_depth_quote()' )
     CRYPTO_TICKERS = [ 'BTC/USD', 'ETH/USD' ]
-    CRYPTO_DATA_CLIENT = CryptoHistoricalDataClient()
+    CRYPTO_DATA_CLIENT = get_scheduled_client( CryptoHistoricalDataClient() )
     display( get_5_depth_quote() )
 
 
@@ -1288,24 +1650,30 @@ if unit_test_enabled :
 # In[78]:
 
 
+# End-of-day flatten : all open orders canceled by 1 request, then all positions closed by 1 request
+# - terminal states of canceled & closing orders confirmed by batched status queries (or trade update events)
 def liquidate_all_open_positions() :
+    pending_orders = get_orders_by_status( 'pending', verbose=False )
+    if ( pending_orders is not None ) and len( pending_orders ) > 0 :
+        log_cancel_outcomes( BULK_ORDERS.cancel( pending_orders, all_open=True ), 'open orders' )
     positions = TRADING_CLIENT.get_all_positions()       # Get all open positions
     nb_positions = len( positions )
     print( f'{nb_positions} positions to liquidate' )
     if nb_positions > 0 :
-        # Submit liquidation 
-        responses = TRADING_CLIENT.close_all_positions(  # Close all open positions 
-                        cancel_orders=True )             # Cancel all open orders first
+        # Submit liquidation (orders canceled above)
+        responses = TRADING_CLIENT.close_all_positions( cancel_orders=False )
         if len( responses ) > 0 :
-            # Convert responses to Pandas with columns id & status
-            list_tuples = [ [ resp.body.id, resp.status ] for resp in responses ]
-            df_tuples = pd.DataFrame( list_tuples, columns=[ 'id', 'status'] ).set_index( 'id' )
-            # Get Pandas with info of liquidated orders
-            all_orders = get_orders_by_status( 'all', verbose=False ) 
-            selected_orders = all_orders[ all_orders.index.isin( df_tuples.index ) ]
-            # Concatenate columns of both Pandas 
-            selected_orders = pd.concat( [ df_tuples, selected_orders ], axis=1 )
-            display( selected_orders )    
+            # Outcome per closing order : request status, then terminal status (filled)
+            outcomes = { str( r.order_id or r.symbol ):new_outcome( r.symbol ) for r in responses }
+            for r in responses :
+                outcome = outcomes[ str( r.order_id or r.symbol ) ]
+                outcome[ 'request' ] = 'sent' if 200 <= r.status < 300 else 'failed'
+                if r.order_id is None : # no order created
+                    outcome[ 'error' ], outcome[ 'status' ] = str( r.body ), 'rejected'
+            closing_orders = BULK_ORDERS.confirm( outcomes )
+            log_cancel_outcomes( closing_orders, 'positions closed' )
+            display( closing_orders )    
+            return closing_orders
 
 
 # **Check function**
@@ -1324,46 +1692,29 @@ if unit_test_enabled :
 # In[81]:
 
 
+# Parameters of the last optimization as arrays per ticker (struct of arrays), O(1) access per ticker :
+# STRATEGY_PARAMS.get_opt_params( ticker ), STRATEGY_PARAMS.get_window_size( ticker )
+# - 'opt_params' strings are parsed without eval(), then cached in a JSON file regenerated when the CSV changes
 def get_strategy_params() :
-    # Filter columns
-    selected_cols = [ 'date', 'ticker', 'metric_type', 'slow_window', 'fast_window', 'long_entry', \
-                      'short_entry', 'opt_params' ]
-    parameters = pd.read_csv( STRATEGY_PARAMS_PATH, converters={ 'opt_params':eval } )[ selected_cols ]
-    last_update = parameters[ 'date' ][ -1: ].values[ 0 ]
-    #print( 'Last update on optimized parameters :', last_update )
-    
-    # Filter rows
-    date_and_metric_masks = ( parameters[ 'date' ]==last_update ) & ( parameters[ 'metric_type' ]=='delta ratio' )
-    parameters = parameters[ date_and_metric_masks ].drop( columns=[ 'date', 'metric_type' ] )
-    parameters[ 'ticker' ] = parameters[ 'ticker' ].str.replace( '-', '.' ) # Adapt tickers to Alpaca standard 
-    # Todo adapt code with index = ticker
-    #parameters[ selected_cols ].set_index( 'ticker' )
-    return parameters
+    return load_strategy_params( STRATEGY_PARAMS_PATH, RSI_WINDOW_SIZE )
 
-get_strategy_params().round( 2 ).head(13)
+if unit_test_enabled :
+    display( get_strategy_params().to_frame().round( 2 ).head(13) )
 
 
 # ## Daily Process
 
 # In[83]:
 
-def get_chrono_results( chrono_list_of_records ) : # input in nano-s & output in mili-s
-    chrono = pd.DataFrame( chrono_list_of_records, columns=CHRONO_COLS ).set_index( 'ticker' )
-    chrono[ 'delta_signal' ]     = chrono[ 'signal_generated_time' ] - chrono[ 'ltp_received_time' ]
-    chrono[ 'delta_signal_cpu' ] = chrono[ 'signal_generated_cpu' ]  - chrono[ 'ltp_received_cpu' ]
-    chrono[ 'delta_order' ]      = chrono[ 'order_submitted_time' ]  - chrono[ 'ltp_received_time' ]
-    chrono[ 'delta_order_cpu' ]  = chrono[ 'order_submitted_cpu' ]   - chrono[ 'ltp_received_cpu' ]
-    chrono[ chrono.columns ] = ( chrono[ chrono.columns ] / 1e6 ).round( 1 ) 
-    return chrono
+# Latency of the stages of each tick : spans recorded by scan_trades() & ORDER_DISPATCHER
+# - percentiles per stage can be read live : LATENCY.get_summary(), logged every LATENCY_LOG_TICKS ticks
+# - percentiles per stage & ticker are stored at the end of the day in latency_ms{suffix}_YYYYMMDD
 
-
-# In[84]:
-
-
-if unit_test_enabled :
-    print( '\nUnit test of : get_chrono_results()' )
-    daily_chrono = [ ['NVDA', *[57909497369, 1629441737304739], *[57957208836, 1629441816779205], *[ None, None ] ] ]
-    display( get_chrono_results( daily_chrono ) )
+def log_latency() :
+    summary = LATENCY.get_summary()
+    for stage, row in summary.iterrows() :
+        log( f'{stage:>15} : {row["count"]:>5} spans, p50 {row["wall_p50"]:>8.1f} ms, p99 {row["wall_p99"]:>8.1f} ms, '
+             f'max {row["wall_max"]:>8.1f} ms (CPU p50 {row["cpu_p50"]:.1f} ms)', 'log_latency' )
 
 
 # ## Daily One-Shot
@@ -1371,18 +1722,27 @@ if unit_test_enabled :
 # In[85]:
 
 
-def run_daily_one_shot( daily_history, closing_time ) :
+def run_daily_one_shot() :
     #log( 'One-shot st7f1c35e7-c173-40cc-b19d-ad54c0a9e523arted' )
     #chrono_start = [ process_time_ns(), perf_counter_ns() ] # Un-comment to measure performance 1/2
-    ltps = complete_history( closing_time ) # Complete truncated historical LTPs due to Alpaca's feed delay
-    daily_history = get_historical_data()
+    # Warm start : history until the current interval, without waiting for Alpaca's feed delay
+    daily_history = complete_history()
+
+    # Seed streaming indicators once, then scan_trades() updates them with each new LTP
+    init_signal_states( daily_history )
+
+    # Seed local order book once, then trade update events & submitted orders update it
+    init_order_book()
 
-    # Concatenate both    
-    daily_history = pd.concat( [ daily_history, ltps ] )
+    # Order requests of all tickers pre-built once, only side & prices filled in on a signal
+    init_order_templates()
 
     # Display daily_history
     print( 'History sample (10 first tickers) :' )
     display( daily_history.iloc[ :, :10 ].round( 2 ) )
+
+    # Store daily_history in a fixed-size ring buffer updated by scan_trades()
+    daily_history = get_price_store( daily_history, file_suffix )
     
     # log( get_chrono( *chrono_start ) ) # Un-comment to measure performance 2/2
     #log( 'One-shot completed' )
@@ -1392,25 +1752,47 @@ def run_daily_one_shot( daily_history, closing_time ) :
 # In[86]:
 
 
-# Get last trading prices to complete truncated historical data due to Alpaca's feed delay 
-def complete_history( closing_time ) :
-    nb_truncated_records = round_up( HIST_MIN_DELAY / HIST_INTERVAL)
-    log( f'Recovering {nb_truncated_records} records to complete historical data (15-minute gap)' )
-    ltps = get_ltps()
-    for i in range( nb_truncated_records - 1 ) :        
-        sleep( 1 )
-        if not f_market_is_still_open( closing_time ) : 
-            next_opening, closing_time = get_next_sessions( CALENDAR, current_timestamp() ).iloc[ 0 ]
-            wait_until( next_opening )
-        wait_until_next_run()
-        ltps = pd.concat( [ ltps, get_ltps() ] )
+# Warm start of the history, instead of waiting HIST_MIN_DELAY minutes for consolidated bars
+# - consolidated bars until now - HIST_MIN_DELAY & real-time bars (MARKET_DATA_FEED) after : 2 concurrent requests
+# - bars of prior sessions read from DATA_STORE (dataset 'bars', HIST_CACHE_ENABLED) : only later bars requested
+# - real-time bars are provisional, replaced in the daily history by reconcile_history() once consolidated
+def complete_history() :
+    global WARM_START
+    cache = DATA_STORE if HIST_CACHE_ENABLED and ( REPLAY_SOURCE is None ) else None
+    WARM_START = WarmStart( TICKERS, get_bars, INTERVAL, HIST_MIN_DELAY * 60, cache, 
+                            real_time_feed=MARKET_DATA_FEED )
+    try :
+        history = WARM_START.load( get_last_sessions(), current_timestamp() )[ -WINDOW_SIZE: ]
+    except Exception as ex :
+        log( '***** ERROR : Could not get historical data' )
+        log_exception( ex )
+        halt_program()
 
     # Get data info
-    dates = ltps.index
+    dates = history.index
     date_first, date_last = f'{dates.min():%B %d %Hh%M}', f'{dates.max():%B %d %Hh%M}'
-    log( f'{len( ltps ):>4} additional  records from {date_first} to {date_last}' )   
+    log( f'{len( history ):>4} most recent records from {date_first} to {date_last}, '
+         f'{len( WARM_START.provisional )} provisional ({MARKET_DATA_FEED} feed)' )   
         
-    return ltps
+    return history
+
+# Provisional bars of the daily history replaced by consolidated ones once available (1 request per tick at most)
+def reconcile_history( daily_history ) :
+    if ( WARM_START is None ) or len( WARM_START.get_due( current_timestamp() ) ) == 0 :
+        return 0
+    try :
+        bars = WARM_START.reconcile( current_timestamp() )
+    except Exception as ex : # retried on next tick
+        log( '***** ERROR : Could not reconcile provisional bars' )
+        log_exception( ex )
+        return 0
+    nb_updated = daily_history.update_frame( bars )
+    if nb_updated > 0 : # indicators re-seeded with consolidated prices
+        init_signal_states( daily_history.to_frame() )
+    log( f'{nb_updated} provisional records replaced by consolidated bars, {len( WARM_START.provisional )} left' )
+    return nb_updated
+
+WARM_START = None  # global variable
 
 # _ = complete_history()  # Un-comment to check function
 
@@ -1437,24 +1819,44 @@ def get_tickers_items( items, text_in ) :
 # In[92]:
 
 
-def log_signal( signal_record ) :
+def log_signal( signal_record, ticker=None ) :
     # Get string from Pandas row as field1=value1 field2=value2 ... 
     signal_results = [ f'{k}={int( v )}' if 'Signal' in k else f'{k}={v:.1f}' \
-              for k, v in signal_record.to_dict().items() ]
-    log( ' '.join( signal_results ) )
+              for k, v in signal_record.items() ]
+    log( ' '.join( signal_results ), 'log_signal', ticker, 'signal' )
+
+
+# **Streaming signal states**
+# 
+# - 1 state per ticker, seeded once by the daily one-shot (1 C call for all tickers), then updated with each new LTP in O(1)
+# - all tickers are updated at once by vectorized operations (1 call per scan)
+# - per-ticker versions : signal_state.SignalState (Python) & c_signal_gen.CSignalState (C)
+# - window-based version of all tickers : c_signal_gen.SignalWorkspace (1 C call per scan, reused buffers),
+#   used by the backtester & optimizer only : the live scan updates SignalStateMatrix with 1 row per tick
+#   (O(1) per ticker, no heap allocation of price windows), where SignalWorkspace recomputes whole windows
+
+# In[ ]:
+
+
+def init_signal_states( history ) :
+    global SIGNAL_STATES
+    tickers = [ t for t in history.columns if t in STRATEGY_PARAMS ]
+    params_table  = STRATEGY_PARAMS.get_params_table( tickers )
+    SIGNAL_STATES = SignalStateMatrix( RSI_WINDOW_SIZE, params_table, tickers )
+    SIGNAL_STATES.seed( history[ tickers ].to_numpy( dtype=float ) )
+    log( f'{len( tickers )} signal states seeded with {len( history )} records' )
+
+def update_signal_states( ltps ) : # ltps = last trading price per ticker, returns signal per ticker
+    return SIGNAL_STATES.update( ltps[ SIGNAL_STATES.tickers ].to_numpy( dtype=float ) )
+
+SIGNAL_STATES = None  # global variable
 
 
 # In[93]:
 
 
 def f_market_is_open_today() :
-    current_time = current_timestamp()
-    period_time  = timedelta( days=7 ) # 1-week period
-    schedule_window = CALENDAR.schedule( start_date = current_time - period_time, 
-                                         end_date   = current_time )
-    last_open_date  = schedule_window.index[ -1 ].date()    
-    is_open_today   = ( last_open_date == current_time.date() )
-    return is_open_today
+    return get_session_index().is_open_today( current_timestamp() )
     
 def f_market_is_still_open( close_dt ) :
     curr_time = current_timestamp()    
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 23 08:41:05 2025
+
+@author: jean vallee
+"""
+
+# Log messages written by a background thread
+# - log records ( timestamp, caller, ticker, event, message ) are queued : no I/O on the caller's thread
+# - text lines keep the format of api_orders_*.log, JSON lines are written to a .jsonl file alongside
+# - files are flushed & synced to disk every fsync_interval seconds, so a crash loses a few seconds at most
+# - the file is chosen per record (e.g. 1 file per day)
+
+import os
+import json
+import queue
+import threading
+import time
+
+
+class LogSink :
+
+    def __init__( self, get_path, queue_size=10000, fsync_interval=5.0, echo=True, structured=True ) :
+        # get_path( timestamp ) : path of the text file of a record (None : record is not written)
+        self.get_path, self.fsync_interval = get_path, fsync_interval
+        self.echo, self.structured = echo, structured   # print messages, write .jsonl records
+        self.records = queue.Queue( maxsize=queue_size )
+        self.nb_dropped = 0   # records dropped while the queue was full
+        self.path, self.files = None, []
+        self.last_sync = time.monotonic()
+        self.thread = threading.Thread( target=self.run, daemon=True, name='log_sink' )
+        self.thread.start()
+
+    def write( self, timestamp, caller, message, ticker=None, event='' ) :
+        try :
+            self.records.put_nowait( ( timestamp, caller, ticker, event, message ) )
+        except queue.Full :  # never block the caller
+            self.nb_dropped += 1
+
+    def flush( self ) : # blocks until queued records are written & synced
+        done = threading.Event()
+        self.records.put( done )
+        done.wait()
+
+    def close( self ) :
+        self.records.put( None )
+        self.thread.join()
+
+    # --- Writer thread ---
+
+    def run( self ) :
+        while True :
+            try :
+                record = self.records.get( timeout=self.fsync_interval )
+            except queue.Empty :
+                record = False
+            if record is None :
+                break
+            if isinstance( record, threading.Event ) :
+                self.sync()
+                record.set()
+                continue
+            if record :
+                try :
+                    self.write_record( *record )
+                except Exception as ex :  # the logger must survive any error
+                    print( f'***** ERROR : Could not write log record\n{ex}' )
+            if time.monotonic() - self.last_sync >= self.fsync_interval :
+                self.sync()
+        self.sync()
+        self.close_files()
+
+    def write_record( self, timestamp, caller, ticker, event, message ) :
+        if self.nb_dropped > 0 :
+            nb_dropped, self.nb_dropped = self.nb_dropped, 0
+            self.write_record( timestamp, 'log_sink', None, 'error', f'***** ERROR : {nb_dropped} log records dropped' )
+        line = f'{timestamp:%H:%M:%S} {caller:>15}():  {message}'
+        if self.echo :
+            print( line )
+        path = self.get_path( timestamp )
+        if path is None :
+            return
+        if path != self.path :
+            self.open_files( path )
+        self.files[ 0 ].write( line + '\n' )
+        if self.structured :
+            if event == '' :
+                event = 'error' if 'ERROR' in message else 'message'
+            json_record = { 'timestamp':timestamp.isoformat(), 'caller':caller, 'ticker':ticker,
+                            'event':event, 'message':message }
+            self.files[ 1 ].write( json.dumps( json_record ) + '\n' )
+
+    def open_files( self, path ) :
+        self.sync()
+        self.close_files()
+        os.makedirs( os.path.dirname( path ) or '.', exist_ok=True )
+        self.files = [ open( path, 'a' ) ]
+        if self.structured :
+            self.files.append( open( os.path.splitext( path )[ 0 ] + '.jsonl', 'a' ) )
+        self.path = path
+
+    def sync( self ) :
+        for file in self.files :
+            file.flush()
+            os.fsync( file.fileno() )
+        self.last_sync = time.monotonic()
+
+    def close_files( self ) :
+        for file in self.files :
+            file.close()
+        self.files, self.path = [], None
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    from datetime import datetime, timezone
+
+    folder = tempfile.mkdtemp()
+    sink = LogSink( lambda timestamp : os.path.join( folder, f'api_orders_{timestamp:%Y%m%d}.log' ), echo=False )
+    start = time.perf_counter()
+    for i in range( 10000 ) :
+        sink.write( datetime.now( timezone.utc ), 'scan_signals', f'T{i % 50}: Signal=1', f'T{i % 50}', 'signal' )
+    elapsed = time.perf_counter() - start
+    sink.flush()
+    path = os.path.join( folder, f'api_orders_{datetime.now( timezone.utc ):%Y%m%d}.log' )
+    with open( path ) as log_file : nb_lines = len( log_file.readlines() )
+    print( f'{nb_lines} records written to {path}, {elapsed / 10000 * 1e6:.1f} µs per call' )
+    sink.close()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 28 08:37:14 2025
+
+@author: jean vallee
+"""
+
+# Walk-forward optimizer of the strategy parameters, writing optim_ema_rsi_params.csv
+# - candidates : ( slow_window, fast_window, long_entry, short_entry, min_reversals ) vectors
+# - population-based search (differential evolution) : each generation is evaluated in 1 batch,
+#   1 column of signals per candidate (C batch kernel, or signal_matrix's vectorized NumPy version)
+# - objective : backtest of the position held between signals, vectorized over candidates & bars
+# - walk-forward : the bars after the 1st train_ratio are cut into nb_folds validation windows, each one
+#   scored with the parameters optimized on the bars before it (anchored : from the 1st bar, rolling : 
+#   the same nb of bars as the 1st train window). Parameters of the last fold are written (the most
+#   recent train window), with the train metric of that fold & the mean validation metric of all folds
+# - tickers are optimized in parallel by a process pool, price arrays are shared with the workers
+#   through 1 shared memory block (no copy per job)
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.jv.signal_matrix import generate_signals_matrix, PARAMS_COLS
+
+PARAM_NAMES = PARAMS_COLS + [ 'min_reversals' ]   # order of opt_params
+DEFAULT_BOUNDS = { 'slow_window':( 10, 200 ), 'fast_window':( 2, 50 ), 'long_entry':( 10, 40 ),
+                   'short_entry':( 60, 90 ), 'min_reversals':( 2, 10 ) }
+METRIC_TYPES = [ 'delta simple', 'delta ratio' ]
+CSV_COLUMNS  = [ 'date', 'ticker', 'metric_type' ] + PARAM_NAMES + \
+               [ 'opt_params', 'tolerance', 'pop_size', 'max_iter', 'train_metric', 'valid_metric', 'duration' ]
+FOLD_COLUMNS = [ 'fold_train_metrics', 'fold_valid_metrics' ]   # returned only (not in the CSV file)
+PENALTY = 1e6   # objective of invalid candidates (slow <= fast, short <= long, too few reversals)
+
+
+# --- Objective ---
+
+def get_signals( prices, candidates, rsi_window, kernel='c' ) : # ( nb_bars x nb_candidates ) signals
+    nb_candidates = len( candidates )
+    prices_2d = np.repeat( prices[ :, None ], nb_candidates, axis=1 )
+    params_table = { col:candidates[ :, k ] for k, col in enumerate( PARAMS_COLS ) }
+    if kernel == 'c' :
+        from lib.jv.wrapper_c_signal_gen import SignalWorkspace, is_lib_available
+        if not is_lib_available() : kernel = 'numpy'
+    if kernel == 'c' :
+        workspace = SignalWorkspace( nb_candidates, len( prices ), params_table, rsi_window )
+        workspace.run( prices_2d )
+        return np.nan_to_num( workspace.outputs[ 'Signal' ].T )
+    return generate_signals_matrix( prices_2d, params_table, rsi_window, return_all=True )
+
+
+# Objective to minimize per candidate ( -delta of the strategy vs buy & hold ) on bars [ start, end )
+def evaluate( prices, candidates, rsi_window, metric_type='delta ratio', start=0, kernel='c' ) :
+    candidates = np.atleast_2d( candidates )
+    signals = get_signals( prices, candidates, rsi_window, kernel )
+    # Position = last non-zero signal (+1 long, -1 short), flat before the 1st signal
+    rows = np.where( signals != 0, np.arange( len( prices ) )[ :, None ], 0 )
+    np.maximum.accumulate( rows, axis=0, out=rows )
+    positions = np.take_along_axis( signals, rows, axis=0 )[ start: ]
+    prices = prices[ start: ]
+
+    returns  = np.diff( prices ) / prices[ :-1 ]
+    strategy = np.prod( 1.0 + positions[ :-1 ] * returns[ :, None ], axis=0 ) - 1.0
+    buy_hold = prices[ -1 ] / prices[ 0 ] - 1.0
+    if metric_type == 'delta simple' :
+        delta = strategy - buy_hold
+    elif metric_type == 'delta ratio' :
+        delta = ( 1.0 + strategy ) / ( 1.0 + buy_hold ) - 1.0
+    else :
+        raise ValueError( f'Unknown metric type : {metric_type}' )
+
+    nb_reversals = np.count_nonzero( np.diff( positions, axis=0 ), axis=0 )
+    slow_window, fast_window, long_entry, short_entry, min_reversals = candidates.T
+    invalid = ( slow_window <= fast_window ) | ( short_entry <= long_entry ) | ( nb_reversals < min_reversals )
+    return np.where( invalid, PENALTY, -delta )
+
+
+# --- Search ---
+
+# Differential evolution (rand/1/bin) : returns ( best candidate, its objective, nb of iterations )
+def optimize_prices( prices, bounds=DEFAULT_BOUNDS, rsi_window=14, metric_type='delta ratio', pop_size=3,
+                     max_iter=4, tolerance=0.005, mutation=0.7, crossover=0.9, seed=None, kernel='c' ) :
+    rng = np.random.default_rng( seed )
+    lower = np.array( [ bounds[ name ][ 0 ] for name in PARAM_NAMES ], dtype=np.float64 )
+    upper = np.array( [ bounds[ name ][ 1 ] for name in PARAM_NAMES ], dtype=np.float64 )
+    nb_members, nb_params = max( pop_size * len( lower ), 4 ), len( lower )   # pop_size per parameter
+
+    population = lower + rng.random( ( nb_members, nb_params ) ) * ( upper - lower )
+    scores = evaluate( prices, population, rsi_window, metric_type, kernel=kernel )
+    nb_iterations = 0
+    for nb_iterations in range( 1, max_iter + 1 ) :
+        # 3 distinct members other than the target, per target
+        others = np.array( [ rng.choice( np.delete( np.arange( nb_members ), i ), 3, replace=False )
+                             for i in range( nb_members ) ] )
+        a, b, c = population[ others[ :, 0 ] ], population[ others[ :, 1 ] ], population[ others[ :, 2 ] ]
+        mutants = np.clip( a + mutation * ( b - c ), lower, upper )
+        crossed = rng.random( ( nb_members, nb_params ) ) < crossover
+        crossed[ np.arange( nb_members ), rng.integers( nb_params, size=nb_members ) ] = True
+        trials = np.where( crossed, mutants, population )
+
+        trial_scores = evaluate( prices, trials, rsi_window, metric_type, kernel=kernel )   # 1 batch
+        better = trial_scores < scores
+        population[ better ], scores[ better ] = trials[ better ], trial_scores[ better ]
+        if np.std( scores ) <= tolerance * abs( np.mean( scores ) ) :
+            break
+    best = int( np.argmin( scores ) )
+    return population[ best ], scores[ best ], nb_iterations
+
+
+# --- Walk-forward ---
+
+# ( train_start, valid_start, valid_end ) per fold, in chronological order
+def get_folds( nb_bars, train_ratio=0.7, nb_folds=3, anchored=True ) :
+    train_size = int( nb_bars * train_ratio )
+    valid_bounds = np.linspace( train_size, nb_bars, nb_folds + 1 ).astype( int )
+    return [ ( 0 if anchored else valid_start - train_size, valid_start, valid_end )
+             for valid_start, valid_end in zip( valid_bounds[ :-1 ], valid_bounds[ 1: ] ) ]
+
+
+# --- Process pool ---
+
+WORKER = {}   # per worker process : shared memory block & its price matrix
+
+def init_worker( shm_name, shape ) :
+    shm = shared_memory.SharedMemory( name=shm_name )
+    WORKER[ 'shm' ], WORKER[ 'prices' ] = shm, np.ndarray( shape, dtype=np.float64, buffer=shm.buf )
+
+def run_job( job ) : # job = ( column, ticker, settings ) -> rows of the CSV file (1 per metric type)
+    column, ticker, settings = job
+    start_time = time.perf_counter()
+    prices = WORKER[ 'prices' ][ :, column ]
+    prices = prices[ ~np.isnan( prices ) ]
+    folds  = get_folds( len( prices ), settings[ 'train_ratio' ], settings[ 'nb_folds' ], settings[ 'anchored' ] )
+    search_keys = [ 'bounds', 'rsi_window', 'metric_type', 'pop_size', 'max_iter', 'tolerance', 'seed', 'kernel' ]
+    fold_bests = [ optimize_prices( prices[ train_start:valid_start ], **{ key:settings[ key ] for key in search_keys } )[ 0 ]
+                   for train_start, valid_start, _ in folds ]
+    best = fold_bests[ -1 ]
+
+    duration = time.perf_counter() - start_time
+    rows = []
+    for metric_type in settings[ 'metric_types' ] :
+        # Indicators of the validation window are warmed up by the bars of the train window
+        evaluate_fold = lambda params, train_start, start, end : float( evaluate(
+                            prices[ train_start:end ], params, settings[ 'rsi_window' ], metric_type, 
+                            start - train_start, settings[ 'kernel' ] )[ 0 ] )
+        train_metrics = [ evaluate_fold( params, train_start, train_start, valid_start )
+                          for params, ( train_start, valid_start, _ ) in zip( fold_bests, folds ) ]
+        valid_metrics = [ evaluate_fold( params, train_start, valid_start, valid_end )
+                          for params, ( train_start, valid_start, valid_end ) in zip( fold_bests, folds ) ]
+        rows.append( [ settings[ 'date' ], ticker.replace( '.', '-' ), metric_type, *best.tolist(),
+                       '[' + ', '.join( f'np.float64({value!r})' for value in best.tolist() ) + ']',
+                       settings[ 'tolerance' ], settings[ 'pop_size' ], settings[ 'max_iter' ],
+                       train_metrics[ -1 ], float( np.mean( valid_metrics ) ),
+                       f'{int( duration // 60 ):02d}m {int( duration % 60 ):02d}s' if len( rows ) == 0 else None,
+                       train_metrics, valid_metrics ] )
+    return rows
+
+
+# Optimizes all tickers (columns of prices_df) & appends results to csv_path (existing CSV schema)
+def optimize_tickers( prices_df, csv_path=None, metric_types=METRIC_TYPES, objective='delta ratio',
+                      bounds=DEFAULT_BOUNDS, rsi_window=14, pop_size=3, max_iter=4, tolerance=0.005,
+                      train_ratio=0.7, nb_folds=3, anchored=True, nb_workers=None, seed=0, kernel='c', log=print ) :
+    # nb_workers : size of the process pool (default : nb of CPUs, 0 : no pool)
+    # nb_folds, anchored : walk-forward validation windows (see get_folds())
+    prices_2d = np.ascontiguousarray( prices_df.to_numpy( dtype=np.float64 ) )
+    settings  = { 'date':f'{pd.Timestamp.now():%Y-%m-%d %H:%M:%S}', 'metric_types':metric_types,
+                  'metric_type':objective, 'bounds':bounds, 'rsi_window':rsi_window, 'pop_size':pop_size,
+                  'max_iter':max_iter, 'tolerance':tolerance, 'train_ratio':train_ratio, 'nb_folds':nb_folds,
+                  'anchored':anchored, 'kernel':kernel }
+    jobs = [ ( j, str( ticker ), { **settings, 'seed':seed + j } ) for j, ticker in enumerate( prices_df.columns ) ]
+
+    start_time = time.perf_counter()
+    if nb_workers == 0 :
+        WORKER[ 'prices' ] = prices_2d
+        results = [ run_job( job ) for job in jobs ]
+    else :
+        shm = shared_memory.SharedMemory( create=True, size=max( prices_2d.nbytes, 1 ) )
+        try :
+            np.ndarray( prices_2d.shape, dtype=np.float64, buffer=shm.buf )[ : ] = prices_2d
+            with ProcessPoolExecutor( nb_workers or os.cpu_count(), initializer=init_worker,
+                                      initargs=( shm.name, prices_2d.shape ) ) as pool :
+                results = list( pool.map( run_job, jobs ) )
+        finally :
+            shm.close()
+            shm.unlink()
+    log( f'{len( jobs )} tickers optimized in {time.perf_counter() - start_time:.1f}s' )
+
+    results = pd.DataFrame( [ row for rows in results for row in rows ], columns=CSV_COLUMNS + FOLD_COLUMNS )
+    if csv_path is not None :
+        results[ CSV_COLUMNS ].to_csv( csv_path, mode='a', index=False, header=not os.path.exists( csv_path ) )
+    return results
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    from lib.jv.strategy_params import load_strategy_params
+
+    # 1 year of 2-minute bars (random walks) for 4 tickers
+    rng = np.random.default_rng( 7 )
+    nb_bars = 195 * 252
+    prices_df = pd.DataFrame( 100 * np.exp( np.cumsum( rng.normal( 0, 1e-3, ( nb_bars, 4 ) ), axis=0 ) ),
+                              columns=[ 'AAA', 'BBB', 'CCC', 'BRK.B' ] )
+
+    # Same objective with C & NumPy kernels
+    candidates = np.array( [ [ 40, 12, 25, 75, 3 ], [ 120, 30, 20, 80, 5 ], [ 10, 20, 25, 75, 3 ] ], dtype=float )
+    prices = prices_df[ 'AAA' ].to_numpy()[ :5000 ]
+    assert np.allclose( evaluate( prices, candidates, 14, kernel='c' ), evaluate( prices, candidates, 14, kernel='numpy' ) )
+    start = time.perf_counter()
+    evaluate( prices_df[ 'AAA' ].to_numpy(), np.repeat( candidates, 5, axis=0 ), 14 )
+    print( f'15 candidates x {nb_bars} bars evaluated in {time.perf_counter() - start:.2f}s' )
+
+    # Walk-forward folds : validation windows cover all bars after the 1st train window, in order
+    assert get_folds( 1000, 0.7, 3 ) == [ ( 0, 700, 800 ), ( 0, 800, 900 ), ( 0, 900, 1000 ) ]
+    assert get_folds( 1000, 0.7, 3, anchored=False ) == [ ( 0, 700, 800 ), ( 100, 800, 900 ), ( 200, 900, 1000 ) ]
+
+    csv_path = os.path.join( tempfile.mkdtemp(), 'optim_ema_rsi_params.csv' )
+    results = optimize_tickers( prices_df, csv_path, nb_workers=2 )
+    print( results.drop( columns=[ 'opt_params', *FOLD_COLUMNS ] ).round( 3 ).to_string() )
+    print( results[ [ 'ticker', 'metric_type', *FOLD_COLUMNS ] ].to_string( 
+               formatters={ col:lambda metrics : str( np.round( metrics, 3 ).tolist() ) for col in FOLD_COLUMNS } ) )
+    assert all( len( metrics ) == 3 for metrics in results[ 'fold_valid_metrics' ] )
+    assert np.allclose( results[ 'valid_metric' ], [ np.mean( metrics ) for metrics in results[ 'fold_valid_metrics' ] ] )
+    assert list( pd.read_csv( csv_path ).columns ) == CSV_COLUMNS
+    params = load_strategy_params( csv_path, 14 )
+    assert params.tickers == list( prices_df.columns ) and np.allclose( params.slow_window, results[ 'slow_window' ][ 1::2 ] )
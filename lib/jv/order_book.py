@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 22 09:14:38 2025
+
+@author: jean vallee
+"""
+
+# Local book of orders & positions per ticker
+# - seeded once from the list of all orders & open positions (REST)
+# - updated by submitted orders & by trade update events (websocket or local stub feed)
+# - reconciled periodically against REST
+# Then tickers to skip by scan_trades() are obtained without any API request
+
+import threading
+import queue
+import time
+
+PENDING_STATUSES = { 'accepted', 'new', 'held', 'partially_filled', 'pending_new', 'accepted_for_bidding' }
+
+
+# Enum or string (e.g. OrderStatus.NEW, 'OrderStatus.NEW' or 'new') -> 'new'
+def enum_value( value ) :
+    value = getattr( value, 'value', value )
+    return str( value ).split( '.' )[ -1 ].lower() if value is not None else None
+
+def get_field( item, name, default=None ) : # field of a pydantic model or of a dict
+    if isinstance( item, dict ) :
+        return item.get( name, default )
+    return getattr( item, name, default )
+
+
+class OrderBook :
+
+    def __init__( self, reconcile_interval=600, clock=time.monotonic ) :
+        self.lock = threading.Lock()
+        self.orders    = {}   # order id -> { 'symbol', 'type', 'status', 'parent_id' }
+        self.pending   = {}   # symbol -> ids of pending orders
+        self.positions = {}   # symbol -> quantity of open position
+        self.reconcile_interval, self.clock = reconcile_interval, clock
+        self.last_reconcile = None
+        self.nb_events = 0
+
+    def is_seeded( self ) :
+        return self.last_reconcile is not None
+
+    # --- Seed & reconcile from REST ---
+
+    def seed( self, orders, positions ) :
+        # orders : Pandas of get_orders_by_status( 'all' ) (index = id) or list of orders
+        # positions : list of positions (TRADING_CLIENT.get_all_positions())
+        with self.lock :
+            previous_pending = { symbol:set( ids ) for symbol, ids in self.pending.items() }
+            self.orders, self.pending, self.positions = {}, {}, {}
+            if hasattr( orders, 'iterrows' ) :
+                for order_id, row in orders.iterrows() :
+                    self.upsert( order_id, row[ 'symbol' ], row[ 'type' ], row[ 'status' ] )
+            else :
+                for order in orders :
+                    self.upsert_order( order )
+            for position in positions :
+                self.set_position( get_field( position, 'symbol' ), get_field( position, 'qty' ) )
+            self.last_reconcile = self.clock()
+            # Nb of tickers whose pending state differed from REST
+            symbols = set( previous_pending ) | set( self.pending )
+            return sum( previous_pending.get( s, set() ) != self.pending.get( s, set() ) for s in symbols )
+
+    reconcile = seed   # same operation, returns the nb of tickers corrected
+
+    def needs_reconcile( self ) :
+        return ( not self.is_seeded() ) or ( self.clock() - self.last_reconcile >= self.reconcile_interval )
+
+    # --- Incremental updates ---
+
+    def on_order( self, order ) : # submitted order (response of submit_order) with its legs
+        with self.lock :
+            self.upsert_order( order )
+
+    def on_trade_update( self, event ) : # TradeUpdate of the trade_updates stream (or dict)
+        with self.lock :
+            self.nb_events += 1
+            order = get_field( event, 'order' )
+            self.upsert_order( order, with_legs=False )
+            position_qty = get_field( event, 'position_qty' )
+            if position_qty is not None :
+                self.set_position( get_field( order, 'symbol' ), position_qty )
+
+    def upsert_order( self, order, parent_id=None, with_legs=True ) :
+        order_id = str( get_field( order, 'id' ) )
+        self.upsert( order_id, get_field( order, 'symbol' ), get_field( order, 'type' ),
+                     get_field( order, 'status' ), parent_id )
+        legs = get_field( order, 'legs' ) if with_legs else None
+        for leg in legs or [] :
+            self.upsert_order( leg, parent_id=order_id )
+
+    def upsert( self, order_id, symbol, order_type, status, parent_id=None ) :
+        order_id, status = str( order_id ), enum_value( status )
+        previous = self.orders.get( order_id )
+        if previous is not None :
+            parent_id = parent_id or previous[ 'parent_id' ]
+            symbol = symbol or previous[ 'symbol' ]
+        self.orders[ order_id ] = { 'symbol':symbol, 'type':enum_value( order_type ),
+                                    'status':status, 'parent_id':parent_id }
+        ids = self.pending.setdefault( symbol, set() )
+        if status in PENDING_STATUSES :
+            ids.add( order_id )
+        else :
+            ids.discard( order_id )
+        if len( ids ) == 0 :
+            del self.pending[ symbol ]
+
+    def set_position( self, symbol, qty ) :
+        qty = float( qty or 0 )
+        if qty == 0 :
+            self.positions.pop( symbol, None )
+        else :
+            self.positions[ symbol ] = qty
+
+    # --- Queries ---
+
+    def get_tickers_pending( self ) :
+        with self.lock :
+            return set( self.pending )
+
+    def get_tickers_positions( self ) :
+        with self.lock :
+            return set( self.positions )
+
+    def get_status( self, order_id ) : # last status known (seed, submission or trade update), None if unknown
+        with self.lock :
+            order = self.orders.get( str( order_id ) )
+            return order[ 'status' ] if order is not None else None
+
+    def get_tickers_to_skip( self ) : # same rule as get_tickers_to_process() : pending orders
+        return self.get_tickers_pending()
+
+
+# --- Trade update feeds ---
+
+class StubTradeUpdatesFeed :
+    """
+    Local feed of trade updates for tests : events pushed by push() are passed to the handler
+    by a background thread, as by the websocket feed
+    """
+    def __init__( self ) :
+        self.events = queue.Queue()
+        self.thread = None
+
+    def push( self, event ) :
+        self.events.put( event )
+
+    def start( self, handler ) :
+        def run() :
+            while True :
+                event = self.events.get()
+                if event is None :
+                    break
+                handler( event )
+                self.events.task_done()
+        self.thread = threading.Thread( target=run, daemon=True, name='trade_updates' )
+        self.thread.start()
+
+    def join( self ) : # wait until all pushed events are handled
+        self.events.join()
+
+    def stop( self ) :
+        self.events.put( None )
+
+
+class AlpacaTradeUpdatesFeed :
+    """
+    Websocket feed of trade updates of the paper trading account
+    """
+    def __init__( self, api_key, api_secret, paper=True ) :
+        from alpaca.trading.stream import TradingStream   # imported only when used
+        self.stream = TradingStream( api_key, api_secret, paper=paper )
+        self.thread = None
+
+    def start( self, handler ) :
+        async def async_handler( event ) :
+            handler( event )
+        self.stream.subscribe_trade_updates( async_handler )
+        self.thread = threading.Thread( target=self.stream.run, daemon=True, name='trade_updates' )
+        self.thread.start()
+
+    def stop( self ) :
+        self.stream.stop()
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    from types import SimpleNamespace as Obj
+
+    book = OrderBook()
+    book.seed( [ Obj( id='a1', symbol='NVDA', type='market', status='filled', legs=[
+                    Obj( id='a2', symbol='NVDA', type='limit', status='new', legs=None ),
+                    Obj( id='a3', symbol='NVDA', type='stop',  status='held', legs=None ) ] ) ],
+               [ Obj( symbol='NVDA', qty='1' ) ] )
+    print( 'Seeded :', book.get_tickers_to_skip(), book.get_tickers_positions() )
+
+    feed = StubTradeUpdatesFeed()
+    feed.start( book.on_trade_update )
+    book.on_order( Obj( id='b1', symbol='MSFT', type='market', status='pending_new', legs=None ) )
+    feed.push( { 'event':'fill', 'order':Obj( id='a2', symbol='NVDA', type='limit', status='filled' ), 'position_qty':'0' } )
+    feed.push( { 'event':'canceled', 'order':Obj( id='a3', symbol='NVDA', type='stop', status='canceled' ) } )
+    feed.join()
+    assert book.get_tickers_to_skip() == { 'MSFT' } and book.get_tickers_positions() == set()
+    print( 'After events :', book.get_tickers_to_skip(), book.get_tickers_positions() )
+    feed.stop()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 20 09:30:44 2025
+
+@author: jean vallee
+"""
+
+# Concurrent submission of orders through a bounded pool of threads
+# - orders of different tickers are submitted concurrently
+# - orders of the same ticker are submitted in the order they were received
+# - each request consumes 1 token of the shared rate budget
+# - bracket checks run on a separate thread, off the critical path of submissions, from the submitted order
+# - submissions & bracket checks are measured as latency spans 'submit_order' & 'confirm_bracket' per ticker
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
+
+class OrderJob :
+    __slots__ = ( 'ticker', 'price', 'quantity', 'signal', 'future' )
+
+    def __init__( self, ticker, price, quantity, signal ) :
+        self.ticker, self.price, self.quantity, self.signal = ticker, price, quantity, signal
+        self.future = Future()
+
+
+class OrderDispatcher :
+
+    def __init__( self, place_order, check_bracket=None, max_workers=8, rate_limiter=None, log=print,
+                  on_submitted=None, latency=None ) :
+        # place_order( current_price, ticker, quantity, signal ) returns the submitted order or None
+        # on_submitted( order ) is called with each submitted order (e.g. to update an order book)
+        # check_bracket( order ) checks each submitted order from its submit response (no request)
+        # latency : latency.LatencyRecorder (optional)
+        self.place_order, self.check_bracket = place_order, check_bracket
+        self.on_submitted, self.latency = on_submitted, latency
+        self.rate_limiter, self.log = rate_limiter, log
+        self.executor = ThreadPoolExecutor( max_workers=max_workers, thread_name_prefix='order' )
+        self.bracket_executor = ThreadPoolExecutor( max_workers=1, thread_name_prefix='bracket' )
+        self.lock   = threading.Lock()
+        self.queues = {}   # ticker -> jobs waiting for the ticker's running job
+
+    def submit( self, ticker, price, quantity, signal ) : # returns a Future of the job
+        job = OrderJob( ticker, price, quantity, signal )
+        with self.lock :
+            queue = self.queues.get( ticker )
+            if queue is not None :     # ticker busy : wait for its previous jobs
+                queue.append( job )
+                return job.future
+            self.queues[ ticker ] = deque()
+        self.executor.submit( self.run, job )
+        return job.future
+
+    def dispatch( self, orders ) : # orders : list of ( ticker, price, quantity, signal )
+        futures = [ self.submit( *order ) for order in orders ]
+        wait( futures )
+        return [ future.result() for future in futures ]
+
+    def run( self, job ) :
+        try :
+            if self.rate_limiter is not None :
+                self.rate_limiter.acquire()
+            if self.latency is not None :
+                order = self.latency.timed( 'submit_order', self.place_order, job.price, job.ticker, job.quantity,
+                                            job.signal, ticker=job.ticker )
+            else :
+                order = self.place_order( job.price, job.ticker, job.quantity, job.signal )
+            if ( order is not None ) and ( self.on_submitted is not None ) :
+                self.on_submitted( order )
+            job.future.set_result( job )
+            if ( order is not None ) and ( self.check_bracket is not None ) :
+                self.bracket_executor.submit( self.run_check_bracket, job.ticker, order )
+        except Exception as ex : # e.g. bracket check after shutdown() : the order was submitted
+            self.log( f'{job.ticker}: ***** ERROR : Could not dispatch order\n{ex}', 'dispatch' )
+        finally :
+            if not job.future.done() :
+                job.future.set_result( job )
+            self.start_next( job.ticker )
+
+    def start_next( self, ticker ) :
+        with self.lock :
+            queue = self.queues[ ticker ]
+            if len( queue ) == 0 :
+                del self.queues[ ticker ]
+                return
+            next_job = queue.popleft()
+        self.executor.submit( self.run, next_job )
+
+    def run_check_bracket( self, ticker, order ) :
+        try :
+            if self.latency is not None :
+                self.latency.timed( 'confirm_bracket', self.check_bracket, order, ticker=ticker )
+            else :
+                self.check_bracket( order )
+        except Exception as ex :
+            self.log( f'{ticker}: ***** ERROR : Could not check bracket {order.id}\n{ex}', 'dispatch' )
+
+    def shutdown( self, wait=True ) :
+        self.executor.shutdown( wait=wait )
+        self.bracket_executor.shutdown( wait=wait )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+    from time import perf_counter_ns
+    from types import SimpleNamespace
+    from lib.jv.rate_limit import TokenBucket  # run from root folder : python -m lib.jv.order_dispatch
+    from lib.jv.latency import LatencyRecorder
+
+    # Stub of place_order() with a 200-ms REST round-trip
+    submitted = []
+    def stub_place_order( current_price, ticker, quantity, signal ) :
+        time.sleep( 0.2 )
+        submitted.append( ( ticker, signal ) )
+        return SimpleNamespace( id=f'{ticker}-{len( submitted )}' )
+
+    dispatcher = OrderDispatcher( stub_place_order, lambda order : time.sleep( 0.001 ), max_workers=8,
+                                  rate_limiter=TokenBucket( 200, burst=20 ), latency=LatencyRecorder() )
+    orders = [ ( f'T{i}', 100.0, 1, +1 ) for i in range( 16 ) ]
+    orders += [ ( 'T0', 101.0, 1, -1 ) ]  # 2nd order of T0
+    start = perf_counter_ns()
+    jobs = dispatcher.dispatch( orders )
+    print( f'{len( jobs )} orders submitted in {( perf_counter_ns() - start ) / 1e6:.0f} ms (serial : 3400 ms)' )
+    assert [ signal for ticker, signal in submitted if ticker == 'T0' ] == [ +1, -1 ]  # T0's orders in sequence
+    dispatcher.bracket_executor.shutdown()   # bracket check not scheduled : job completed once, error logged
+    assert dispatcher.submit( 'T1', 99.0, 1, -1 ).result( timeout=5 ).ticker == 'T1'
+    dispatcher.shutdown()
+    print( dispatcher.latency.get_summary() )
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Nov  5 08:57:19 2025
+
+@author: jean vallee
+"""
+
+# Local index of all orders, synced incrementally with the broker instead of listing the last 500 orders
+# - 1 row per order (bracket legs included), columns as arrays : enums as int32 codes of categories,
+#   prices as float64, dates as int64 ns since epoch (UTC), parent bracket as a row number
+# - sync() requests only orders created after a cursor (pages of page_size orders, oldest first) :
+#   the cursor is the last order created, it only moves forward (rows are added by these pages only)
+# - open rows are refreshed by trade update events (on_trade_update()), & by sync() from 1 listing of open
+#   orders : rows open in the index but not listed anymore are requested by id (only when they close)
+# - queries by status, symbol, date & parent bracket use indexes (sets of rows per status, symbol, parent),
+#   Pandas are built for the selected rows only
+# - persisted as 1 partition of the columnar store, reloaded on the 1st sync
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from lib.jv.columnar_store import ColumnarPartition
+from lib.jv.order_book import PENDING_STATUSES, enum_value, get_field
+
+ENUM_COLUMNS  = [ 'symbol', 'type', 'status', 'side', 'position_intent', 'time_in_force', 'order_class' ]
+FLOAT_COLUMNS = [ 'limit_price', 'stop_price', 'qty', 'filled_qty', 'filled_avg_price' ]
+DATE_COLUMNS  = [ 'created_at', 'updated_at', 'expires_at', 'canceled_at', 'filled_at' ]
+TERMINAL_STATUSES = { 'canceled', 'filled', 'expired', 'rejected', 'replaced' }
+NAT = np.iinfo( np.int64 ).min   # missing date
+
+
+class OrderIndex :
+
+    def __init__( self, list_orders, path=None, page_size=500, initial_capacity=1024, list_open=None, get_order=None ) :
+        # list_orders( after, limit ) : orders created after a date (None : all), oldest first, with their legs
+        #                               (e.g. TradingClient.get_orders with nested=True), pydantic models or dicts
+        # list_open( limit ) : open orders, legs listed as orders (e.g. status=OPEN, nested=False), None : no refresh
+        # get_order( order_id ) : 1 order (e.g. TradingClient.get_order_by_id)
+        # path : folder of the persisted index (ColumnarPartition), None : not persisted
+        self.list_orders, self.page_size = list_orders, page_size
+        self.list_open, self.get_order = list_open, get_order
+        self.partition = ColumnarPartition( path ) if path is not None else None
+        self.lock = threading.RLock()
+        self.ids, self.rows = [], {}                          # row -> id, id -> row
+        self.categories = { column:[] for column in ENUM_COLUMNS }
+        self.codes      = { column:{} for column in ENUM_COLUMNS }
+        self.arrays = { column:np.full( initial_capacity, get_missing( column ) )
+                        for column in ENUM_COLUMNS + FLOAT_COLUMNS + DATE_COLUMNS + [ 'parent' ] }
+        self.by_status, self.by_symbol, self.by_parent = {}, {}, {}   # code or row -> set of rows
+        self.loaded = False
+
+    def __len__( self ) :
+        return len( self.ids )
+
+    # --- Upserts ---
+
+    def upsert_order( self, order, parent_id=None ) : # order (& its legs) of the broker's API or of an event
+        with self.lock :
+            order_id = str( get_field( order, 'id' ) )
+            row = self.get_row( order_id )
+            for column in ENUM_COLUMNS :
+                value = get_field( order, column )
+                value = None if is_missing( value ) else value
+                if value is not None or column == 'symbol' :
+                    self.set_code( row, column, value if column == 'symbol' else enum_value( value ) )
+            for column in FLOAT_COLUMNS :
+                value = get_field( order, column )
+                if not is_missing( value ) :
+                    self.arrays[ column ][ row ] = float( value )
+            for column in DATE_COLUMNS :
+                value = get_field( order, column )
+                if not is_missing( value ) :
+                    self.arrays[ column ][ row ] = pd.Timestamp( value ).as_unit( 'ns' ).value
+            if parent_id is not None :
+                parent = self.get_row( str( parent_id ) )
+                self.arrays[ 'parent' ][ row ] = parent
+                self.by_parent.setdefault( parent, set() ).add( row )
+            for leg in get_field( order, 'legs' ) or [] :
+                self.upsert_order( leg, order_id )
+            return row
+
+    def get_row( self, order_id ) : # row of an order, added if new
+        row = self.rows.get( order_id )
+        if row is None :
+            row = self.rows[ order_id ] = len( self.ids )
+            self.ids.append( order_id )
+            if row >= len( self.arrays[ 'parent' ] ) : # capacity doubled
+                for column, values in self.arrays.items() :
+                    self.arrays[ column ] = np.concatenate( [ values, np.full_like( values, get_missing( column ) ) ] )
+        return row
+
+    def set_code( self, row, column, value ) :
+        codes = self.codes[ column ]
+        code = codes.get( value, -1 ) if value is not None else -1
+        if code == -1 and value is not None :
+            code = codes[ value ] = len( self.categories[ column ] )
+            self.categories[ column ].append( value )
+        previous = self.arrays[ column ][ row ]
+        self.arrays[ column ][ row ] = code
+        index = { 'status':self.by_status, 'symbol':self.by_symbol }.get( column )
+        if index is not None and previous != code :
+            index.get( previous, set() ).discard( row )
+            index.setdefault( code, set() ).add( row )
+
+    # --- Sync ---
+
+    def get_cursor( self ) : # orders created after the cursor are requested (None : all orders)
+        with self.lock :
+            created = self.arrays[ 'created_at' ][ :len( self.ids ) ]
+            created = created[ created != NAT ]
+            if len( created ) == 0 :
+                return None
+            return pd.Timestamp( int( created.max() ) - 1000, tz='UTC' )   # 1 us before : orders created at the cursor
+
+    def get_open_ids( self ) :
+        with self.lock :
+            terminal = [ self.codes[ 'status' ][ s ] for s in TERMINAL_STATUSES if s in self.codes[ 'status' ] ]
+            is_open = ~np.isin( self.arrays[ 'status' ][ :len( self.ids ) ], terminal )
+            return [ self.ids[ row ] for row in np.flatnonzero( is_open ) ]
+
+    def sync( self ) : # upserts new orders & open orders whose status changed, returns their nb
+        with self.lock :
+            if not self.loaded :
+                self.load()
+            nb_orders = self.sync_new() + self.refresh_open()
+            if nb_orders > 0 :
+                self.save()
+            return nb_orders
+
+    def sync_new( self ) : # orders created after the cursor
+        after, nb_orders, seen = self.get_cursor(), 0, set()
+        while True :
+            page = list( self.list_orders( after, self.page_size ) )
+            new_ids = { str( get_field( order, 'id' ) ) for order in page } - seen - set( self.rows )
+            for order in page :
+                self.upsert_order( order )
+            seen |= new_ids
+            nb_orders += len( new_ids )
+            if len( page ) < self.page_size or len( new_ids ) == 0 :
+                break
+            after = pd.Timestamp( max( get_field( order, 'created_at' ) for order in page ) ) - pd.Timedelta( microseconds=1 )
+        return nb_orders
+
+    def refresh_open( self ) : # open rows closed since the last sync (e.g. no trade update event)
+        if self.list_open is None :
+            return 0
+        open_orders = list( self.list_open( self.page_size ) )
+        for order in open_orders : # e.g. partially filled
+            self.update_order( order )
+        if len( open_orders ) >= self.page_size : # open orders beyond 1 page : closed ones unknown
+            return 0
+        closed_ids = set( self.get_open_ids() ) - { str( get_field( order, 'id' ) ) for order in open_orders }
+        for order_id in closed_ids :
+            try :
+                self.update_order( self.get_order( order_id ) )
+            except Exception : # e.g. network error : requested again by the next sync
+                pass
+        return len( closed_ids )
+
+    def update_order( self, order ) : # order already indexed (rows are added by sync_new() only)
+        with self.lock :
+            if str( get_field( order, 'id' ) ) in self.rows :
+                self.upsert_order( order )
+
+    def on_trade_update( self, event ) : # TradeUpdate of the trade_updates stream (or dict)
+        self.update_order( get_field( event, 'order' ) )
+
+    # --- Queries ---
+
+    def query( self, status=None, symbols=None, start=None, end=None, parent_id=None, order_type=None ) :
+        # rows of orders, most recent first
+        # status : 'all' (or None), 'pending', 1 status or a list ; start, end : dates of creation [ start, end )
+        with self.lock :
+            candidates = None
+            if status not in [ None, 'all' ] :
+                statuses = PENDING_STATUSES if status == 'pending' else ( [ status ] if isinstance( status, str ) else status )
+                candidates = self.get_rows( self.by_status, 'status', statuses )
+            if symbols is not None :
+                rows = self.get_rows( self.by_symbol, 'symbol', [ symbols ] if isinstance( symbols, str ) else symbols )
+                candidates = rows if candidates is None else candidates & rows
+            if parent_id is not None :
+                rows = set( self.by_parent.get( self.rows.get( str( parent_id ) ), set() ) )
+                candidates = rows if candidates is None else candidates & rows
+            rows = np.arange( len( self.ids ) ) if candidates is None else np.fromiter( candidates, dtype=np.int64 )
+            created = self.arrays[ 'created_at' ][ rows ]
+            mask = np.ones( len( rows ), dtype=bool )
+            if start is not None : mask &= created >= pd.Timestamp( start ).as_unit( 'ns' ).value
+            if end is not None   : mask &= created <  pd.Timestamp( end ).as_unit( 'ns' ).value
+            if order_type is not None :
+                mask &= self.arrays[ 'type' ][ rows ] == self.codes[ 'type' ].get( order_type, -2 )
+            rows = rows[ mask ]
+            return rows[ np.argsort( -created[ mask ], kind='stable' ) ]
+
+    def get_rows( self, index, column, values ) :
+        codes = [ self.codes[ column ][ v ] for v in values if v in self.codes[ column ] ]
+        return set().union( *[ index.get( code, set() ) for code in codes ] )
+
+    def get_oldest_creation( self, order_ids ) : # creation date of the oldest of the orders, None if 1 is unknown
+        with self.lock :
+            rows = [ self.rows.get( str( order_id ) ) for order_id in order_ids ]
+            if len( rows ) == 0 or None in rows :
+                return None
+            created = self.arrays[ 'created_at' ][ rows ]
+            return None if ( created == NAT ).any() else pd.Timestamp( int( created.min() ), tz='UTC' )
+
+    def get_orders( self, status=None, **filters ) : # Pandas of orders (index = id), most recent first
+        return self.to_frame( self.query( status, **filters ) )
+
+    def to_frame( self, rows ) :
+        with self.lock :
+            data = {}
+            for column in ENUM_COLUMNS :
+                values = np.array( self.categories[ column ] + [ None ], dtype=object )
+                data[ column ] = values[ self.arrays[ column ][ rows ] ]   # code -1 : last item (None)
+            for column in FLOAT_COLUMNS :
+                data[ column ] = self.arrays[ column ][ rows ]
+            for column in DATE_COLUMNS :
+                data[ column ] = pd.to_datetime( np.where( self.arrays[ column ][ rows ] == NAT, np.datetime64( 'NaT' ),
+                                                           self.arrays[ column ][ rows ].astype( 'datetime64[ns]' ) ), utc=True )
+            ids = np.array( self.ids + [ None ], dtype=object )
+            data[ 'parent_id' ] = ids[ self.arrays[ 'parent' ][ rows ] ]
+            return pd.DataFrame( data, index=pd.Index( ids[ rows ], name='id' ) )
+
+    # --- Persistence ---
+
+    def save( self ) :
+        if self.partition is not None :
+            self.partition.write( self.to_frame( np.arange( len( self.ids ) ) ) )
+
+    def load( self ) : # persisted rows, before the 1st sync
+        self.loaded = True
+        if self.partition is None or not self.partition.exists() :
+            return 0
+        orders = self.partition.read()
+        for order_id, order in zip( orders.index, orders.to_dict( 'records' ) ) :
+            order[ 'id' ] = order_id
+            self.upsert_order( order, None if is_missing( order[ 'parent_id' ] ) else order[ 'parent_id' ] )
+        return len( orders )
+
+
+def is_missing( value ) : # None or NaN (e.g. read from the persisted index)
+    return value is None or value is pd.NaT or ( isinstance( value, float ) and np.isnan( value ) )
+
+def get_missing( column ) : # value of missing items, of the dtype of the column
+    if column in FLOAT_COLUMNS :
+        return np.float64( np.nan )
+    if column in DATE_COLUMNS :
+        return np.int64( NAT )
+    return np.int32( -1 )   # no category, no parent
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    # Stub of the broker : 2000 brackets (parent + 2 legs), created 1 minute apart, listed by pages
+    def new_bracket( i, created_at ) :
+        new_order = lambda suffix, order_type, status : { 'id':f'order-{i}{suffix}', 'symbol':f'T{i % 40}',
+            'type':f'OrderType.{order_type.upper()}', 'status':status, 'side':'buy', 'qty':'1',
+            'created_at':created_at, 'updated_at':created_at, 'limit_price':None, 'stop_price':None }
+        return { **new_order( '', 'market', 'filled' ), 'order_class':'bracket',
+                 'legs':[ new_order( '-target', 'limit', 'new' ), new_order( '-stoploss', 'stop', 'held' ) ] }
+    start_date = pd.Timestamp( '2025-10-01 13:30', tz='UTC' )
+    brackets = [ new_bracket( i, start_date + pd.Timedelta( minutes=i ) ) for i in range( 2000 ) ]
+    for bracket in brackets[ :-10 ] : # legs of older brackets are closed
+        bracket[ 'legs' ][ 0 ][ 'status' ], bracket[ 'legs' ][ 1 ][ 'status' ] = 'filled', 'canceled'
+    nb_requests = [ 0 ]
+    def list_orders( after, limit ) :
+        nb_requests[ 0 ] += 1
+        return [ b for b in brackets if after is None or b[ 'created_at' ] > after ][ :limit ]
+    def list_open( limit ) :
+        nb_requests[ 0 ] += 1
+        orders = [ order for b in brackets for order in [ b ] + b[ 'legs' ] ]
+        return [ order for order in orders if order[ 'status' ] not in TERMINAL_STATUSES ][ :limit ]
+    def get_order( order_id ) :
+        nb_requests[ 0 ] += 1
+        return next( order for b in brackets for order in [ b ] + b[ 'legs' ] if order[ 'id' ] == order_id )
+
+    path = os.path.join( tempfile.mkdtemp(), 'order_index' )
+    index = OrderIndex( list_orders, path, list_open=list_open, get_order=get_order )
+    start = time.perf_counter()
+    print( f'1st sync : {index.sync()} orders ({len( index )} with legs) in {time.perf_counter() - start:.2f}s, '
+           f'{nb_requests[ 0 ]} requests' )   # > 500 orders : none dropped
+    assert len( index ) == 6000 and len( index.get_orders( 'pending' ) ) == 20
+
+    # Incremental sync : orders created since the last one, 1 listing of open orders, closed legs by id
+    # (the cursor doesn't go back to the oldest open bracket)
+    brackets[ -5 ][ 'legs' ][ 0 ][ 'status' ] = 'filled'
+    brackets.append( new_bracket( 2000, start_date + pd.Timedelta( minutes=2000 ) ) )
+    nb_requests[ 0 ] = 0
+    assert index.sync() == 2 and nb_requests[ 0 ] == 3 and len( index.get_orders( 'pending' ) ) == 21
+    nb_requests[ 0 ] = 0
+    assert index.sync() == 0 and nb_requests[ 0 ] == 2
+
+    # Trade update event of an open leg : no request
+    brackets[ -2 ][ 'legs' ][ 1 ][ 'status' ] = 'canceled'
+    index.on_trade_update( { 'event':'canceled', 'order':brackets[ -2 ][ 'legs' ][ 1 ] } )
+    assert len( index.get_orders( 'pending' ) ) == 20
+
+    # Indexed queries
+    start = time.perf_counter()
+    legs = index.get_orders( parent_id='order-1995' )
+    daily = index.get_orders( 'all', symbols=[ 'T1', 'T2' ], start='2025-10-02', end='2025-10-02 12:00' )
+    print( f'Queries in {( time.perf_counter() - start ) * 1e3:.1f} ms' )
+    assert list( legs[ 'status' ] ) == [ 'filled', 'held' ] and set( legs[ 'type' ] ) == { 'limit', 'stop' }
+    assert len( daily ) == 3 * len( [ i for i in range( 630, 1350 ) if i % 40 in [ 1, 2 ] ] ) and daily[ 'created_at' ].is_monotonic_decreasing
+
+    # Reloaded from disk : same orders, only new ones requested
+    index.save()
+    reloaded = OrderIndex( list_orders, path )
+    nb_requests[ 0 ] = 0
+    assert reloaded.sync() == 0 and nb_requests[ 0 ] == 1
+    assert reloaded.get_orders().equals( index.get_orders() )
+    print( index.get_orders( 'pending' ).head( 3 ) )
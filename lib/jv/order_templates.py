@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Nov  7 08:52:11 2025
+
+@author: jean vallee
+"""
+
+# Pre-built bracket order requests per ticker, instead of 3 pydantic models built & serialized after each signal
+# - at session start : 1 request per ticker validated by alpaca-py (symbol, qty, time in force, class),
+#   serialized to a JSON skeleton missing only side & prices ; URL & auth headers of the client cached
+# - on a signal : side & prices written in the skeleton of the ticker, body encoded once & sent as is
+#   in a copy of a request prepared at session start, through the session of the client
+#   (no pydantic validation, no JSON encoding, no request preparation by requests)
+# - response handled as by alpaca-py's RESTClient (APIError on HTTP errors) : callers' error handling unchanged
+# - private internals of alpaca-py's RESTClient (session, URL, API version, auth headers) used through
+#   ClientInternals only, checked at session start : if a later alpaca-py changes them, prepare() raises
+#   & orders are submitted by submit_order() (internals of alpaca-py 0.44.0)
+
+import json
+import requests
+from requests.exceptions import HTTPError
+
+ALPACA_PY_VERSION = '0.44.0'   # version of alpaca-py whose private internals are used below
+
+
+class ClientInternals :
+    """
+    Private internals of an alpaca-py REST client (e.g. TradingClient) : session, URL & auth headers
+    """
+    NAMES = [ '_session', '_base_url', '_api_version', '_get_default_headers' ]
+
+    def __init__( self, client ) : # AttributeError if an internal is missing (alpaca-py changed)
+        missing = [ name for name in self.NAMES if not hasattr( client, name ) ]
+        if len( missing ) > 0 :
+            raise AttributeError( f'{type( client ).__name__} without {missing} '
+                                  f'(internals of alpaca-py {ALPACA_PY_VERSION})' )
+        self.client = client
+
+    def get_session( self ) :
+        return self.client._session
+
+    def get_url( self, path ) :
+        return self.client._base_url + '/' + self.client._api_version + path
+
+    def get_headers( self ) :
+        return self.client._get_default_headers()
+
+
+class OrderTemplates :
+
+    def __init__( self, build_request, parse_order=None, call=None, path='/orders' ) :
+        # build_request( ticker, quantity ) : validated request, any side & prices (e.g. MarketOrderRequest)
+        # parse_order( fields ) : submitted order from the response (e.g. Order( **fields )), None : dict
+        # call( function, *args ) : wrapper of each submission (e.g. shared rate budget), None : direct call
+        self.build_request, self.parse_order, self.call, self.path = build_request, parse_order, call, path
+        self.templates = {}   # ticker -> ( quantity, { side : body until the target price } )
+        self.session = self.prepared = self.settings = None
+
+    def prepare( self, client, tickers, quantity ) : # at session start, returns the tickers not validated
+        # client : alpaca-py REST client (e.g. TradingClient) whose session, URL & auth headers are used
+        internals = ClientInternals( client )   # raises if alpaca-py's internals changed
+        self.session = internals.get_session()
+        url = internals.get_url( self.path )
+        headers = { **internals.get_headers(), 'Content-Type':'application/json' }
+        self.prepared = self.session.prepare_request( requests.Request( 'POST', url, headers=headers, data=b'{}' ) )
+        self.settings = self.session.merge_environment_settings( url, {}, None, None, None )   # proxies, TLS
+        self.settings[ 'timeout' ] = getattr( self.session, 'timeout', None )   # http_session.PooledSession
+        self.templates, failed = {}, []
+        for ticker in tickers :
+            try :
+                fields = self.build_request( ticker, quantity ).to_request_fields()
+            except Exception :
+                failed.append( ticker )
+                continue
+            for name in [ 'side', 'take_profit', 'stop_loss' ] :
+                fields.pop( name, None )
+            skeleton = json.dumps( fields, separators=( ',', ':' ) )[ :-1 ]   # without closing brace
+            self.templates[ ticker ] = ( quantity, { side:f'{skeleton},"side":"{side}","take_profit":{{"limit_price":'
+                                                     for side in [ 'buy', 'sell' ] } )
+        return failed
+
+    def is_ready( self, ticker, quantity ) :
+        template = self.templates.get( ticker )
+        return ( template is not None ) and ( template[ 0 ] == quantity )
+
+    def get_body( self, ticker, signal, target, stoploss ) : # JSON body (bytes) of 1 bracket order
+        head = self.templates[ ticker ][ 1 ][ 'buy' if signal > 0 else 'sell' ]
+        return f'{head}{float( target )!r}}},"stop_loss":{{"stop_price":{float( stoploss )!r}}}}}'.encode()
+
+    def submit( self, ticker, signal, target, stoploss ) : # submitted order
+        body = self.get_body( ticker, signal, target, stoploss )
+        return self.send( body ) if self.call is None else self.call( self.send, body )
+
+    def send( self, body ) :
+        prepared = self.prepared.copy()
+        prepared.body = body
+        prepared.headers[ 'Content-Length' ] = str( len( body ) )
+        response = self.session.send( prepared, allow_redirects=False, **self.settings )
+        try :
+            response.raise_for_status()
+        except HTTPError as http_error :
+            from alpaca.common.exceptions import APIError   # imported only when used
+            raise APIError( response.text, http_error )
+        fields = response.json()
+        return fields if self.parse_order is None else self.parse_order( fields )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import multiprocessing
+    import time
+    import uuid
+    import numpy as np
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from alpaca.trading.client import TradingClient
+    from alpaca.trading.models import Order
+    from alpaca.trading.requests import MarketOrderRequest, TakeProfitRequest, StopLossRequest
+    from alpaca.trading.enums import OrderSide, OrderClass, TimeInForce
+    from lib.jv.backtester import get_bracket_prices
+    from lib.jv.http_session import attach_session
+
+    # Local stub of Alpaca's trading endpoint, in its own process (no GIL shared with the client) :
+    # time of arrival & body of each order (GET /received), accepted bracket as response
+    class StubHandler( BaseHTTPRequestHandler ) :
+        protocol_version = 'HTTP/1.1'   # keep-alive
+        disable_nagle_algorithm = True  # response not delayed by the client's delayed ACKs
+        received = []                   # ( perf_counter, body ), perf_counter is shared by processes on Linux
+
+        def do_POST( self ) :
+            body = self.rfile.read( int( self.headers[ 'Content-Length' ] ) )
+            self.received.append( ( time.perf_counter(), body.decode() ) )
+            fields, now = json.loads( body ), '2025-11-07T14:30:00Z'
+            new_order = lambda order_type, side, **prices : {
+                'id':str( uuid.uuid4() ), 'client_order_id':'stub', 'created_at':now, 'updated_at':now,
+                'submitted_at':now, 'asset_id':str( uuid.uuid4() ), 'symbol':fields[ 'symbol' ],
+                'asset_class':'us_equity', 'qty':str( fields[ 'qty' ] ), 'filled_qty':'0', 'order_class':'bracket',
+                'order_type':order_type, 'type':order_type, 'side':side, 'time_in_force':fields[ 'time_in_force' ],
+                'status':'accepted', 'extended_hours':False, **prices }
+            exit_side = 'sell' if fields[ 'side' ] == 'buy' else 'buy'
+            self.reply( { **new_order( 'market', fields[ 'side' ] ), 'legs':[
+                new_order( 'limit', exit_side, limit_price=str( fields[ 'take_profit' ][ 'limit_price' ] ) ),
+                new_order( 'stop', exit_side, stop_price=str( fields[ 'stop_loss' ][ 'stop_price' ] ) ) ] } )
+
+        def do_GET( self ) :
+            received = list( self.received )
+            self.received.clear()
+            self.reply( received )
+
+        def reply( self, content ) :
+            response = json.dumps( content ).encode()
+            self.send_response( 200 )
+            self.send_header( 'Content-Length', str( len( response ) ) )
+            self.end_headers()
+            self.wfile.write( response )
+
+        def log_message( self, *args ) :
+            pass
+
+    server = ThreadingHTTPServer( ( '127.0.0.1', 0 ), StubHandler )
+    stub = multiprocessing.get_context( 'fork' ).Process( target=server.serve_forever, daemon=True )
+    stub.start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    client = attach_session( TradingClient( 'stub-key', 'stub-secret', url_override=url ) )
+
+    build_request = lambda ticker, quantity, side=OrderSide.BUY, target=2.0, stoploss=1.0 : MarketOrderRequest(
+        symbol=ticker, qty=quantity, side=side, time_in_force=TimeInForce.GTC, order_class=OrderClass.BRACKET,
+        take_profit=TakeProfitRequest( limit_price=target ), stop_loss=StopLossRequest( stop_price=stoploss ) )
+    tickers = [ f'T{i}' for i in range( 50 ) ]
+    templates = OrderTemplates( build_request, parse_order=lambda fields : Order( **fields ) )
+    assert templates.prepare( client, tickers, 1 ) == [] and not templates.is_ready( 'T0', 2 )
+    try : # client of another alpaca-py without the internals used : no template, orders by submit_order()
+        OrderTemplates( build_request ).prepare( object(), tickers, 1 )
+        raise AssertionError( 'internals not checked' )
+    except AttributeError as ex :
+        print( ex )
+
+    # Previous place_order() : request built after the signal, serialized & prepared by requests
+    def place_order_before( price, ticker, signal ) :
+        target, stoploss = get_bracket_prices( price, signal, 4, 2 )
+        request = build_request( ticker, 1, OrderSide.BUY if signal == +1 else OrderSide.SELL, target, stoploss )
+        return client.submit_order( order_data=request )
+
+    def place_order_after( price, ticker, signal ) :
+        target, stoploss = get_bracket_prices( price, signal, 4, 2 )
+        return templates.submit( ticker, signal, target, stoploss )
+
+    # Signal-to-wire time : from the signal until the body is received by the stub
+    prices = np.random.default_rng( 0 ).uniform( 20, 500, 1000 )
+    for place_order in [ place_order_before, place_order_after ] * 2 :   # 1st round : warm-up
+        client._session.get( url + '/received' )
+        signal_times, orders = [], []
+        for i, price in enumerate( prices ) :
+            signal_times.append( time.perf_counter() )
+            orders.append( place_order( price, tickers[ i % 50 ], +1 if i % 2 == 0 else -1 ) )
+        received = client._session.get( url + '/received' ).json()
+        wire_times = np.array( [ t for t, body in received ] ) - np.array( signal_times )
+        bodies = [ json.loads( body ) for t, body in received ]
+        print( f'{place_order.__name__:<18} : signal-to-wire p50 {np.percentile( wire_times, 50 ) * 1e6:.0f} µs, '
+               f'p99 {np.percentile( wire_times, 99 ) * 1e6:.0f} µs' )
+        if place_order == place_order_before :
+            bodies_before = bodies
+    assert bodies == bodies_before and orders[ 1 ].legs[ 0 ].side == 'buy'   # identical requests
+    print( received[ -1 ][ 1 ] )
+
+    # Construction & serialization alone
+    for name, build_body in [
+            ( 'before', lambda : json.dumps( build_request( 'T0', 1, OrderSide.SELL, 101.23, 99.5 ).to_request_fields() ).encode() ),
+            ( 'after', lambda : templates.get_body( 'T0', -1, 101.23, 99.5 ) ) ] :
+        start = time.perf_counter()
+        for i in range( 10000 ) :
+            build_body()
+        print( f'Request body {name:<6} : {( time.perf_counter() - start ) / 10000 * 1e6:.1f} µs' )
+    stub.terminate()
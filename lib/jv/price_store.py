@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 19 10:21:17 2025
+
+@author: jean vallee
+"""
+
+# Fixed-capacity store of prices ( timestamps x tickers ) replacing the daily_history Pandas
+# - append  : O(1), no reallocation (ring buffer)
+# - window  : zero-copy view of the N most recent rows, for the signal generators
+# - flush   : rows are appended to a CSV file (and/or a columnar partition) before being overwritten
+#             & at the end of the day, the 1st flush replaces the file of a previous run (restart, replay)
+# Each row is written twice (at i and i + capacity), so any window of N <= capacity rows
+# is contiguous in memory.
+
+import os
+import numpy as np
+import pandas as pd
+
+
+class PriceStore :
+
+    def __init__( self, tickers, capacity=1024, spill_path=None, spill_partition=None ) :
+        self.tickers    = list( tickers )
+        self.capacity   = capacity
+        self.spill_path = spill_path  # CSV file of rows flushed to disk
+        self.spill_partition = spill_partition  # ColumnarPartition of rows flushed to disk
+        self.values     = np.full( ( 2 * capacity, len( self.tickers ) ), np.nan, dtype=np.float64 )
+        self.timestamps = np.zeros( 2 * capacity, dtype=np.int64 )  # ns since epoch (UTC)
+        self.nb_rows    = 0   # nb of rows appended since creation
+        self.nb_flushed = 0   # nb of rows already flushed to disk
+
+    def __len__( self ) : # nb of rows available in memory
+        return min( self.nb_rows, self.capacity )
+
+    def append( self, timestamp, prices ) : # prices : 1 value per ticker, in the order of self.tickers
+        # Flush oldest row to disk before it's overwritten
+        if ( self.nb_rows - self.nb_flushed >= self.capacity ) and self.can_spill() :
+            self.flush()
+        i = self.nb_rows % self.capacity
+        self.values[ i ] = self.values[ i + self.capacity ] = prices
+        self.timestamps[ i ] = self.timestamps[ i + self.capacity ] = pd.Timestamp( timestamp ).value
+        self.nb_rows += 1
+
+    def append_frame( self, df_in ) : # Pandas ( timestamps x tickers ), e.g. output of get_ltps()
+        prices_2d = df_in.reindex( columns=self.tickers ).to_numpy( dtype=np.float64 )
+        for timestamp, prices in zip( df_in.index, prices_2d ) :
+            self.append( timestamp, prices )
+
+    def update_frame( self, df_in ) : # overwrites prices of rows with the same timestamps, not flushed yet
+        # NaN prices of df_in keep the stored ones, returns the nb of rows updated
+        nb_rows = min( len( self ), self.nb_rows - self.nb_flushed )
+        start = self.nb_rows % self.capacity + self.capacity - nb_rows
+        rows = { timestamp:k for k, timestamp in enumerate( self.window_timestamps( nb_rows ).tolist() ) }
+        prices_2d = df_in.reindex( columns=self.tickers ).to_numpy( dtype=np.float64 )
+        nb_updated = 0
+        for timestamp, prices in zip( pd.DatetimeIndex( df_in.index ).as_unit( 'ns' ).asi8.tolist(), prices_2d ) :
+            k = rows.get( timestamp )
+            if k is None :
+                continue
+            i = ( start + k ) % self.capacity
+            self.values[ i ] = self.values[ i + self.capacity ] = np.where( np.isnan( prices ), self.values[ i ], prices )
+            nb_updated += 1
+        return nb_updated
+
+    def window( self, nb_rows=None ) : # zero-copy view of the N most recent rows
+        nb_rows = len( self ) if nb_rows is None else min( nb_rows, len( self ) )
+        end = self.nb_rows % self.capacity + self.capacity
+        return self.values[ end - nb_rows : end ]
+
+    def window_timestamps( self, nb_rows=None ) :
+        nb_rows = len( self ) if nb_rows is None else min( nb_rows, len( self ) )
+        end = self.nb_rows % self.capacity + self.capacity
+        return self.timestamps[ end - nb_rows : end ]
+
+    def last( self ) : # most recent prices as a Pandas Series indexed by ticker
+        return pd.Series( self.window( 1 )[ -1 ], index=self.tickers )
+
+    def to_frame( self, nb_rows=None ) : # copy of the N most recent rows as a Pandas
+        index = pd.to_datetime( self.window_timestamps( nb_rows ), utc=True ).rename( 'timestamp' )
+        return pd.DataFrame( self.window( nb_rows ).copy(), index=index, columns=self.tickers )
+
+    def can_spill( self ) :
+        return ( self.spill_path is not None ) or ( self.spill_partition is not None )
+
+    def flush( self, spill_path=None ) : # append rows not flushed yet to the CSV file & columnar partition
+        spill_path = spill_path or self.spill_path
+        nb_rows = self.nb_rows - self.nb_flushed
+        if nb_rows <= 0 or ( spill_path is None and self.spill_partition is None ) :
+            return 0
+        rows = self.to_frame( nb_rows )
+        first_flush = ( self.nb_flushed == 0 )   # file of a previous run of the same date replaced
+        if spill_path is not None :
+            write_header = first_flush or not os.path.exists( spill_path )
+            rows.to_csv( spill_path, mode='w' if first_flush else 'a', header=write_header )
+        if self.spill_partition is not None :
+            if first_flush :
+                self.spill_partition.write( rows )
+            else :
+                self.spill_partition.append( rows )
+        self.nb_flushed = self.nb_rows
+        return nb_rows
+
+    @classmethod
+    def from_frame( cls, df_in, capacity=1024, spill_path=None, spill_partition=None ) :
+        store = cls( df_in.columns, max( capacity, len( df_in ) ), spill_path, spill_partition )
+        store.append_frame( df_in )
+        return store
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    history = pd.read_csv( './data/alpaca/hist_20251010.csv', index_col='timestamp', parse_dates=True )
+    spill_path = os.path.join( tempfile.mkdtemp(), 'hist_demo.csv' )
+
+    store = PriceStore( history.columns, capacity=64, spill_path=spill_path )
+    store.append_frame( history )
+    assert np.array_equal( store.window( 30 ), history.to_numpy()[ -30: ], equal_nan=True )
+    assert np.shares_memory( store.window( 30 ), store.values )  # no copy
+    store.flush()
+    spilled = pd.read_csv( spill_path, index_col='timestamp', parse_dates=True )
+    assert np.allclose( spilled.to_numpy(), history.to_numpy(), equal_nan=True )
+    print( f'{len( history )} rows appended to a {store.capacity}-row store & spilled to {spill_path}' )
+
+    # 2nd run of the same date (restart, replay) : file replaced, not appended to
+    store = PriceStore.from_frame( history, capacity=64, spill_path=spill_path )
+    store.flush()
+    assert len( pd.read_csv( spill_path, index_col='timestamp' ) ) == len( history )
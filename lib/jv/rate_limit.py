@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 20 08:47:02 2025
+
+@author: jean vallee
+"""
+
+# Budget of API requests shared by threads
+# Alpaca's "Basic" plan allows 200 requests per minute
+# "429 Too Many Requests" responses are handled here only (not by the HTTP session nor the clients) :
+# no token until a full refill or the server's Retry-After, then the request is sent again with a new token
+
+import heapq
+import threading
+import time
+from concurrent.futures import Future
+
+THROTTLE_RETRIES = 2   # times a request rejected by 429 is sent again (not processed by the server)
+
+
+class TokenBucket :
+    """
+    Token bucket : 1 token per request, refilled continuously at rate_per_minute.
+    Up to burst tokens may be consumed at once (default : 1 second of requests).
+    """
+    def __init__( self, rate_per_minute=200, burst=None, clock=time.monotonic ) :
+        self.rate   = rate_per_minute / 60.0   # tokens per second
+        self.burst  = burst if burst is not None else max( 1, int( self.rate ) )
+        self.clock  = clock
+        self.tokens = float( self.burst )
+        self.last_refill = clock()
+        self.lock = threading.Lock()
+
+    def refill( self ) :
+        now = self.clock()
+        self.tokens = min( self.burst, self.tokens + ( now - self.last_refill ) * self.rate )
+        self.last_refill = now
+
+    def try_acquire( self, tokens=1 ) : # returns 0 if tokens were consumed, else seconds to wait
+        with self.lock :
+            self.refill()
+            if self.tokens >= tokens :
+                self.tokens -= tokens
+                return 0.0
+            return ( tokens - self.tokens ) / self.rate
+
+    def acquire( self, tokens=1, timeout=None ) : # blocks until tokens are available
+        deadline = None if timeout is None else self.clock() + timeout
+        while True :
+            wait_time = self.try_acquire( tokens )
+            if wait_time == 0.0 :
+                return True
+            if deadline is not None and self.clock() + wait_time > deadline :
+                return False
+            time.sleep( wait_time )
+
+    def drain( self, retry_after=None ) : # after a "429 Too Many Requests" response : no token during
+        # retry_after seconds if the server gave them, else during a full refill of the bucket
+        with self.lock :
+            self.refill()
+            wait_time = retry_after if retry_after is not None else self.burst / self.rate
+            self.tokens = min( self.tokens, 0.0 ) - wait_time * self.rate
+
+
+# Priority of requests : lower value is served first
+PRIORITIES = { 'order':0, 'ltp':1, 'bracket':2, 'diagnostic':3 }
+
+
+class RequestScheduler :
+    """
+    Shared budget of API requests served by priority
+    - a request waits until it is the most urgent one & a token is available
+    - identical reads in flight are coalesced : only the 1st one is sent, others get its result
+    - requests rejected by 429 drain the budget & are sent again, up to throttle_retries times
+    - counters per kind of request : sent, coalesced, throttled (429), errors, waited seconds
+    """
+    def __init__( self, bucket=None, priorities=PRIORITIES, throttle_retries=THROTTLE_RETRIES ) :
+        self.bucket     = bucket if bucket is not None else TokenBucket()
+        self.priorities, self.throttle_retries = priorities, throttle_retries
+        self.condition  = threading.Condition()
+        self.waiting    = []   # heap of ( priority, sequence ) of requests waiting for a token
+        self.sequence   = 0
+        self.in_flight  = {}   # coalescing key -> Future of the read in flight
+        self.counters   = { kind:dict.fromkeys( [ 'sent', 'coalesced', 'throttled', 'errors', 'waited' ], 0 ) 
+                            for kind in priorities }
+
+    def acquire( self, kind ) : # blocks until the request can be sent, returns seconds waited
+        start = self.bucket.clock()
+        with self.condition :
+            ticket = ( self.priorities[ kind ], self.sequence )
+            self.sequence += 1
+            heapq.heappush( self.waiting, ticket )
+            while True :
+                wait_time = None
+                if self.waiting[ 0 ] == ticket :  # most urgent request
+                    wait_time = self.bucket.try_acquire()
+                    if wait_time == 0.0 :
+                        heapq.heappop( self.waiting )
+                        self.condition.notify_all()  # next request becomes the most urgent one
+                        break
+                self.condition.wait( wait_time )  # woken up by a more urgent request or on refill
+            waited = self.bucket.clock() - start
+            self.count( kind, 'sent', 1 )
+            self.count( kind, 'waited', waited )
+        return waited
+
+    def count( self, kind, counter, value=1 ) :
+        self.counters[ kind ][ counter ] += value
+
+    def call( self, kind, function, *args, key=None, **kwargs ) :
+        # key : coalescing key of a read request (None : never coalesced, e.g. order submission)
+        if key is not None :
+            with self.condition :
+                future = self.in_flight.get( key )
+                if future is not None :
+                    self.count( kind, 'coalesced' )
+                    leader = False
+                else :
+                    future = self.in_flight[ key ] = Future()
+                    leader = True
+            if not leader :
+                return future.result()
+        try :
+            result = self.send( kind, function, *args, **kwargs )
+        except Exception as ex :
+            if key is not None :
+                self.release( key ).set_exception( ex )
+            raise
+        if key is not None :
+            self.release( key ).set_result( result )
+        return result
+
+    def send( self, kind, function, *args, **kwargs ) : # 1 token per attempt
+        for attempt in range( self.throttle_retries + 1 ) :
+            self.acquire( kind )
+            try :
+                return function( *args, **kwargs )
+            except Exception as ex :
+                throttled = ( getattr( ex, 'status_code', None ) == 429 )
+                with self.condition :
+                    if throttled :
+                        self.count( kind, 'throttled' )
+                        self.bucket.drain( get_retry_after( ex ) )
+                    if not throttled or attempt == self.throttle_retries :
+                        self.count( kind, 'errors' )
+                        raise
+
+    def release( self, key ) :
+        with self.condition :
+            return self.in_flight.pop( key )
+
+    def get_counters( self ) :
+        return { kind:dict( counters ) for kind, counters in self.counters.items() }
+
+
+class ScheduledClient :
+    """
+    Proxy of an API client (e.g. TradingClient) whose method calls go through a RequestScheduler
+    - kinds : method name -> kind of request (default : 'diagnostic')
+    - methods named get_* are reads, coalesced when called with identical arguments
+    """
+    def __init__( self, client, scheduler, kinds ) :
+        self.client, self.scheduler, self.kinds = client, scheduler, kinds
+
+    def __getattr__( self, name ) :
+        attribute = getattr( self.client, name )
+        if not callable( attribute ) :
+            return attribute
+        kind = self.kinds.get( name, 'diagnostic' )
+        is_read = name.startswith( 'get_' )
+        def scheduled_call( *args, **kwargs ) :
+            key = ( name, repr( args ), repr( sorted( kwargs.items() ) ) ) if is_read else None
+            return self.scheduler.call( kind, attribute, *args, key=key, **kwargs )
+        return scheduled_call
+
+
+def get_retry_after( ex ) : # seconds of the Retry-After header of a 429 response (e.g. APIError), else None
+    response = getattr( ex, 'response', None )
+    try :
+        return float( response.headers[ 'Retry-After' ] )
+    except ( AttributeError, KeyError, TypeError, ValueError ) :
+        return None
+
+
+# Kind of request per method of Alpaca's clients
+CLIENT_REQUEST_KINDS = {
+    'submit_order'            : 'order',
+    'cancel_order_by_id'      : 'order',
+    'cancel_orders'           : 'order',
+    'close_all_positions'     : 'order',
+    'get_stock_latest_trade'  : 'ltp',
+    'get_stock_latest_quote'  : 'ltp',
+    'get_stock_bars'          : 'ltp',
+    'get_order_by_id'         : 'bracket',
+    'get_orders'              : 'bracket',
+    'get_all_positions'       : 'bracket' }
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    from concurrent.futures import ThreadPoolExecutor
+
+    scheduler = RequestScheduler( TokenBucket( 600, burst=1 ) )  # 10 requests / second
+    served = []
+    def request( name ) :
+        time.sleep( 0.05 )
+        served.append( name )
+        return name
+
+    # Low-priority requests queued first, then 1 order & 3 identical LTP reads
+    with ThreadPoolExecutor( 16 ) as executor :
+        futures = [ executor.submit( scheduler.call, 'diagnostic', request, f'diag{i}' ) for i in range( 4 ) ]
+        time.sleep( 0.01 )
+        futures += [ executor.submit( scheduler.call, 'ltp', request, 'ltp', key='ltps' ) for i in range( 3 ) ]
+        futures += [ executor.submit( scheduler.call, 'order', request, 'order' ) ]
+    print( 'Served :', served )
+    assert served.index( 'order' ) < served.index( 'ltp' ) < served.index( 'diag3' )
+    assert served.count( 'ltp' ) == 1 and all( f.result() for f in futures )
+    print( { kind:( c[ 'sent' ], c[ 'coalesced' ] ) for kind, c in scheduler.get_counters().items() } )
+
+    # Order rejected by 429 : no token during a full refill (or Retry-After), then sent again
+    class RateLimitError( Exception ) :
+        status_code, response = 429, None
+    responses = [ RateLimitError(), 'order' ]
+    def limited_request() :
+        response = responses.pop( 0 )
+        if isinstance( response, Exception ) :
+            raise response
+        return response
+    scheduler = RequestScheduler( TokenBucket( 60, burst=1 ) )   # 1 request / second
+    start = time.monotonic()
+    assert scheduler.call( 'order', limited_request ) == 'order'
+    counters = scheduler.get_counters()[ 'order' ]
+    assert counters[ 'sent' ] == 2 and counters[ 'throttled' ] == 1 and counters[ 'errors' ] == 0
+    print( f'Throttled order sent again after {time.monotonic() - start:.1f} s' )
+    assert time.monotonic() - start >= 1.0
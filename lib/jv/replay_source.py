@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 30 09:26:03 2025
+
+@author: jean vallee
+"""
+
+# Replay of recorded prices (hist_*.csv files or columnar store) as the data source of daily_process()
+# - LTPs & historical data are read from the recorded price matrix at the time of a virtual clock
+#   (async_runtime.VirtualClock : jumps instantly to the next tick, doesn't move with wall time)
+# - optional price perturbation drawn from a seeded random.Random : identical from run to run
+# - bracket orders are kept locally, their legs are filled by later LTPs (same rule as backtester)
+#   and trade updates are passed to the handler given to start(), as by the websocket feed
+
+import random
+import threading
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+
+class ReplaySource :
+
+    def __init__( self, history, seed=0, max_pct_delta=0 ) :
+        # history : ( timestamps x tickers ) prices, timestamps in UTC
+        # max_pct_delta : max variation of replayed prices (%), 0 : prices replayed as recorded
+        self.history = history.sort_index().ffill()
+        self.times   = self.history.index.as_unit( 'ns' ).asi8   # ns since epoch
+        self.prices  = self.history.to_numpy( dtype=np.float64 )
+        self.columns = { ticker:j for j, ticker in enumerate( self.history.columns ) }
+        self.random, self.max_pct_delta = random.Random( seed ), max_pct_delta
+        self.lock = threading.Lock()
+        self.orders, self.brackets = [], {}   # all orders, open brackets per ticker
+        self.handler = None
+
+    @classmethod
+    def from_csv( cls, csv_path, **kwargs ) :
+        history = pd.read_csv( csv_path, index_col='timestamp' )
+        history.index = pd.to_datetime( history.index, utc=True )
+        return cls( history, **kwargs )
+
+    @classmethod
+    def from_store( cls, store, date, dataset='hist', **kwargs ) : # columnar_store.ColumnarStore
+        return cls( store.read( dataset, date ), **kwargs )
+
+    def get_row( self, current_time ) : # last recorded row at current time
+        row = np.searchsorted( self.times, pd.Timestamp( current_time ).value, side='right' ) - 1
+        return max( row, 0 )
+
+    # --- Data ---
+
+    def get_history( self, end_time, nb_records, tickers=None ) : # nb_records last records until end_time
+        row = self.get_row( end_time )
+        data = self.history.iloc[ max( 0, row + 1 - nb_records ):row + 1 ]
+        return data if tickers is None else data[ tickers ]
+
+    def get_bars( self, start, end, tickers=None ) : # records of [ start, end ), as warm_start's fetch_bars()
+        first, last = np.searchsorted( self.times, [ pd.Timestamp( start ).value, pd.Timestamp( end ).value ] )
+        data = self.history.iloc[ first:last ]
+        return data if tickers is None else data[ tickers ]
+
+    def get_ltps( self, current_time, tickers=None ) : # 1 record at current time (as normal_get_ltps())
+        tickers = list( self.history.columns ) if tickers is None else tickers
+        ltp_time = pd.Timestamp( current_time ).replace( microsecond=0 )
+        with self.lock :
+            random_factor = 1 + self.random.randint( -self.max_pct_delta, +self.max_pct_delta ) / 100
+            ltps = self.prices[ self.get_row( current_time ), [ self.columns[ t ] for t in tickers ] ] * random_factor
+            self.fill_brackets( dict( zip( tickers, ltps ) ), ltp_time )
+        return pd.DataFrame( [ ltps ], index=pd.DatetimeIndex( [ ltp_time ], name='timestamp' ),
+                             columns=pd.Index( tickers, name='symbol' ) )
+
+    # --- Orders ---
+
+    def start( self, handler ) : # same interface as order_book's trade updates feeds
+        self.handler = handler
+
+    def submit_order( self, current_time, ticker, price, quantity, signal, target, stoploss ) :
+        order_id = f'replay-{ticker}-{pd.Timestamp( current_time ):%Y%m%d%H%M%S}'   # same ids run to run
+        new_order = lambda suffix, order_type, status, **fields : SimpleNamespace(
+            id=order_id + suffix, symbol=ticker, type=order_type, status=status, qty=quantity,
+            side='buy' if signal * ( -1 if suffix else 1 ) > 0 else 'sell', created_at=current_time,
+            updated_at=current_time, **fields )
+        legs = [ new_order( '-target', 'limit', 'new', limit_price=target, stop_price=None ),
+                 new_order( '-stoploss', 'stop', 'new', limit_price=None, stop_price=stoploss ) ]
+        order = new_order( '', 'market', 'filled', limit_price=None, stop_price=None, filled_avg_price=price,
+                           legs=legs )
+        with self.lock :
+            self.orders += [ order, *legs ]
+            self.brackets[ ticker ] = ( signal, quantity, target, stoploss, legs )
+        self.notify( 'fill', order, signal * quantity )
+        return order
+
+    def fill_brackets( self, ltps, ltp_time ) : # 1st leg reached by the LTP is filled, the other one canceled
+        for ticker, ( signal, quantity, target, stoploss, legs ) in list( self.brackets.items() ) :
+            price = ltps.get( ticker )
+            if price is None :
+                continue
+            if signal * ( price - target ) >= 0 :
+                filled, canceled = legs
+            elif signal * ( price - stoploss ) <= 0 :
+                canceled, filled = legs
+            else :
+                continue
+            filled.status, filled.filled_avg_price, canceled.status = 'filled', price, 'canceled'
+            filled.updated_at = canceled.updated_at = ltp_time
+            del self.brackets[ ticker ]
+            self.notify( 'fill', filled, 0 )
+            self.notify( 'canceled', canceled, None )
+
+    def notify( self, event, order, position_qty ) :
+        if self.handler is not None :
+            self.handler( { 'event':event, 'order':vars( order ), 'position_qty':position_qty } )
+
+    def get_orders( self ) : # Pandas of all orders (index = id), as get_orders_by_status( 'all' )
+        with self.lock :
+            records = [ { key:value for key, value in vars( order ).items() if key != 'legs' } for order in self.orders ]
+        return pd.DataFrame( records ).set_index( 'id' ) if len( records ) > 0 else pd.DataFrame()
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+    from lib.jv.async_runtime import VirtualClock
+    from lib.jv.order_book import OrderBook
+
+    def replay_day( seed ) :
+        source = ReplaySource.from_csv( './data/alpaca/hist_20251010.csv', seed=seed, max_pct_delta=1 )
+        book = OrderBook()
+        book.seed( [], [] )
+        source.start( book.on_trade_update )
+        clock = VirtualClock( start_time=source.history.index[ 100 ].to_pydatetime() )
+        closes = []
+        while clock.now() <= source.history.index[ -1 ] :
+            ltps = source.get_ltps( clock.now() )
+            closes.append( ltps.iloc[ 0 ].to_numpy() )
+            for ticker in [ t for t in ltps.columns[ :5 ] if t not in book.get_tickers_to_skip() ] :
+                price = ltps.iloc[ 0 ][ ticker ]
+                order = source.submit_order( clock.now(), ticker, price, 1, +1, round( price * 1.004, 2 ),
+                                             round( price * 0.998, 2 ) )
+                book.on_order( order )   # as ORDER_DISPATCHER's on_submitted
+            clock.advance( 120 )   # next tick, instantly
+        return np.array( closes ), source.get_orders()
+
+    start = time.perf_counter()
+    closes_1, orders_1 = replay_day( seed=42 )
+    elapsed = time.perf_counter() - start
+    closes_2, orders_2 = replay_day( seed=42 )
+    assert np.array_equal( closes_1, closes_2 ) and orders_1.equals( orders_2 )
+    print( f'{len( closes_1 )} ticks replayed in {elapsed:.2f}s, identical run to run' )
+    print( orders_1[ 'status' ].value_counts().to_dict() )
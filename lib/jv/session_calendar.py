@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 25 10:12:40 2025
+
+@author: jean vallee
+"""
+
+# Index of trading sessions built once from the exchange's calendar, instead of 1 call of
+# CALENDAR.schedule() per query
+# - sessions of [ today - days_before, today + days_after ] as arrays of epoch seconds
+# - lookups by binary search on session dates : O(log n)
+# - today's session is looked up again on date roll only, the index is rebuilt when dates leave its range
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+
+class SessionIndex :
+
+    def __init__( self, calendar, days_before=366, days_after=366 ) :
+        # calendar : pandas_market_calendars calendar, or any object with the same schedule() method
+        self.calendar = calendar
+        self.days_before, self.days_after = days_before, days_after
+        self.first_day = self.last_day = None   # range of the index (date ordinals)
+        self.today, self.today_session = None, None
+
+    def build( self, current_time ) :
+        start = current_time - timedelta( days=self.days_before )
+        end   = current_time + timedelta( days=self.days_after )
+        self.schedule = self.calendar.schedule( start_date=start, end_date=end )[[ 'market_open', 'market_close' ]]
+        self.days   = [ d.toordinal() for d in self.schedule.index.date ]   # sorted session dates
+        self.opens  = self.schedule[ 'market_open' ].to_numpy( dtype='datetime64[s]' ).astype( np.int64 )
+        self.closes = self.schedule[ 'market_close' ].to_numpy( dtype='datetime64[s]' ).astype( np.int64 )
+        self.first_day, self.last_day = start.date().toordinal(), end.date().toordinal()
+        self.today = None
+
+    def refresh( self, current_time ) : # on date roll only
+        today = current_time.date().toordinal()
+        if today == self.today :
+            return today
+        # Rebuild if the next 2 weeks aren't covered
+        if ( self.first_day is None ) or not ( self.first_day <= today - 14 and today + 14 <= self.last_day ) :
+            self.build( current_time )
+        i = bisect_left( self.days, today )
+        self.today_session = i if ( i < len( self.days ) and self.days[ i ] == today ) else None
+        self.today = today
+        return today
+
+    # --- Queries ---
+
+    def get_sessions( self, start_day, end_day ) : # sessions of dates ordinals in [ start_day, end_day ]
+        i, j = bisect_left( self.days, start_day ), bisect_right( self.days, end_day )
+        return self.schedule.iloc[ i:j ]
+
+    def is_open_today( self, current_time ) :
+        self.refresh( current_time )
+        return self.today_session is not None
+
+    def get_today_endpoints( self, current_time ) : # ( open, close ) in UTC, ( None, None ) if closed today
+        self.refresh( current_time )
+        if self.today_session is None :
+            return None, None
+        return to_utc( self.opens[ self.today_session ] ), to_utc( self.closes[ self.today_session ] )
+
+    def is_open_now( self, current_time ) :
+        self.refresh( current_time )
+        if self.today_session is None :
+            return False
+        epoch = current_time.timestamp()
+        return self.opens[ self.today_session ] <= epoch <= self.closes[ self.today_session ]
+
+    def get_last_sessions( self, current_time, nb_days=7 ) : # sessions of the last N days & today
+        today = self.refresh( current_time )
+        return self.get_sessions( today - nb_days, today )
+
+    def get_next_sessions( self, current_time, nb_days=7 ) : # sessions from tomorrow to N+1 days later
+        today = self.refresh( current_time )
+        return self.get_sessions( today + 1, today + 1 + nb_days )
+
+    def get_next_open( self, current_time ) : # 1st opening time after current time
+        self.refresh( current_time )
+        i = int( np.searchsorted( self.opens, current_time.timestamp(), side='right' ) )
+        return to_utc( self.opens[ i ] ) if i < len( self.opens ) else None
+
+
+to_utc = lambda epoch : datetime.fromtimestamp( int( epoch ), tz=timezone.utc )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import pandas as pd
+
+    class WeekdayCalendar : # stub of NYSE calendar without holidays
+        def __init__( self ) :
+            self.nb_calls = 0
+        def schedule( self, start_date, end_date ) :
+            self.nb_calls += 1
+            days = pd.bdate_range( pd.Timestamp( start_date ).date(), pd.Timestamp( end_date ).date() )
+            opens  = [ pd.Timestamp( f'{d:%Y-%m-%d} 13:30', tz='UTC' ) for d in days ]
+            closes = [ pd.Timestamp( f'{d:%Y-%m-%d} 20:00', tz='UTC' ) for d in days ]
+            return pd.DataFrame( { 'market_open':opens, 'market_close':closes }, index=days )
+
+    calendar = WeekdayCalendar()
+    sessions = SessionIndex( calendar )
+    friday, saturday = datetime( 2025, 10, 10, 15, tzinfo=timezone.utc ), datetime( 2025, 10, 11, 15, tzinfo=timezone.utc )
+    assert sessions.is_open_today( friday ) and sessions.is_open_now( friday ) and not sessions.is_open_today( saturday )
+    assert sessions.get_today_endpoints( friday )[ 0 ] == datetime( 2025, 10, 10, 13, 30, tzinfo=timezone.utc )
+    assert sessions.get_last_sessions( saturday ).iloc[ -1 ].equals( calendar.schedule( friday, friday ).iloc[ 0 ] )
+    assert sessions.get_next_sessions( friday ).index[ 0 ] == pd.Timestamp( '2025-10-13' )
+    assert sessions.get_next_open( saturday ) == datetime( 2025, 10, 13, 13, 30, tzinfo=timezone.utc )
+    for minutes in range( 0, 365 * 24 * 60, 2 ) :  # 1 year of 2-minute ticks
+        sessions.is_open_now( friday + timedelta( minutes=minutes ) )
+    print( f'{len( sessions.days )} sessions indexed, {calendar.nb_calls} calls of schedule() for 1 year of queries' )
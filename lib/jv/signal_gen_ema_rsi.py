@@ -2,7 +2,8 @@ import sys
 import pandas as pd
 import numpy as np
 import ta
-import matplotlib.pyplot  as plt     # plot custom charts
+from lib.jv.lazy_import import LazyImport
+plt = LazyImport( 'matplotlib.pyplot' )  # plot custom charts (imported on 1st plot)
 
 
 def generate_signal( data, rsi_window, optim_param_list, verbose, close_column ) :
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 18 14:05:31 2025
+
+@author: jean vallee
+"""
+
+# Vectorized version of the signal generator for all tickers at once
+# - input  : price matrix ( timestamps x tickers ), e.g. daily_history
+# - params : 1 set of strategy parameters per column ( slow_window, fast_window, long_entry, short_entry )
+# Each NumPy operation processes 1 row of all tickers, so the Python overhead per row
+# no longer depends on the number of tickers.
+# Whole windows (seeding, backtests) are processed in 1 C call (wrapper_c_signal_gen.seed_signal_states()),
+# or row by row with the same NumPy updates if the C library can't be loaded.
+# Values of each column are identical to those of signal_state.SignalState
+
+import numpy as np
+
+from lib.jv.signal_state import RECORD_COLS
+PARAMS_COLS = [ 'slow_window', 'fast_window', 'long_entry', 'short_entry' ]
+SIGNAL_ROWS = [ RECORD_COLS.index( col ) for col in [ 'EMA_Signal', 'RSI_Signal', 'Signal' ] ]
+STATE_FIELDS = [ 'prev_price', 'slow_sum', 'fast_sum', 'slow_ema', 'fast_ema', 
+                 'sum_gain', 'sum_loss', 'avg_gain', 'avg_loss', 'prev_pre_signal' ]
+
+
+class SignalStateMatrix :
+    """
+    Streaming indicators of N tickers, updated by 1 row of N prices at a time.
+    """
+    def __init__( self, rsi_window, params_table, tickers=None ) :
+        slow_window, fast_window, long_entry, short_entry = \
+                            [ np.asarray( params_table[ col ], dtype=np.float64 ) for col in PARAMS_COLS ]
+        nb_tickers = len( slow_window )
+        self.params_table = dict( zip( PARAMS_COLS, [ slow_window, fast_window, long_entry, short_entry ] ) )
+        self.tickers = list( tickers ) if tickers is not None else list( range( nb_tickers ) )
+        self.index   = { ticker:j for j, ticker in enumerate( self.tickers ) }
+        # Windows are truncated to int as in c_signal_generator.c
+        self.slow_window = np.trunc( slow_window ).astype( np.int64 )
+        self.fast_window = np.trunc( fast_window ).astype( np.int64 )
+        self.rsi_window  = int( rsi_window )
+        self.ema_enabled = ( slow_window > fast_window )
+        self.long_entry, self.short_entry = long_entry, short_entry
+
+        nan_vector = lambda : np.full( nb_tickers, np.nan )
+        self.nb_prices  = np.zeros( nb_tickers, dtype=np.int64 )
+        self.prev_price = nan_vector()
+        self.slow_sum, self.fast_sum = np.zeros( nb_tickers ), np.zeros( nb_tickers )
+        self.slow_ema, self.fast_ema = nan_vector(), nan_vector()
+        self.sum_gain, self.sum_loss = np.zeros( nb_tickers ), np.zeros( nb_tickers )
+        self.avg_gain, self.avg_loss = nan_vector(), nan_vector()
+        self.prev_pre_signal = nan_vector()
+        self.close  = nan_vector()
+        self.record = np.full( ( len( RECORD_COLS ), nb_tickers ), np.nan )
+
+    def seed( self, prices_2d, start_rows=None, return_all=False ) :
+        # start_rows : 1st row used per column (default : all rows)
+        # Returns the vector of last signals, or the ( nb_bars x nb_tickers ) signal matrix if return_all is True
+        prices_2d = np.asarray( prices_2d, dtype=np.float64 )
+        if not self.nb_prices.any() : # initial state : whole window in 1 C call
+            try :
+                return self.seed_c( prices_2d, start_rows, return_all )
+            except ( OSError, ImportError ) : # C library missing or outdated : 1 NumPy update per row
+                pass
+        signals = np.zeros( prices_2d.shape, dtype=np.int8 )
+        for t in range( len( prices_2d ) ) :
+            active = None if start_rows is None else ( t >= start_rows )
+            signals[ t ] = self.update( prices_2d[ t ], active )
+        return signals if return_all else self.get_signals()
+
+    def seed_c( self, prices_2d, start_rows, return_all ) :
+        from lib.jv.wrapper_c_signal_gen import seed_signal_states  # C library loaded on 1st call
+        states, record, signals = seed_signal_states( prices_2d, self.params_table, self.rsi_window, 
+                                                      start_rows, return_all )
+        for field in STATE_FIELDS :
+            setattr( self, field, states[ field ].copy() )
+        self.nb_prices = states[ 'nb_prices' ].astype( np.int64 )
+        self.close  = self.prev_price.copy()   # last price, as prev_price
+        self.record = np.ascontiguousarray( record )
+        return signals if return_all else self.get_signals()
+
+    def update( self, close_prices, active=None ) :
+        # active : optional boolean mask of the columns to update (others keep their state)
+        # NaN prices (e.g. no trade yet) : columns keep their state, no new signal
+        close_prices = np.asarray( close_prices, dtype=np.float64 )
+        i = self.nb_prices   # index of new price in the whole series of each column
+        priced = ~np.isnan( close_prices )
+        active = priced if active is None else ( active & priced )
+        keep = lambda new, old : np.where( active, new, old )
+
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            # 1. EMAs & EMA crossover signal
+            enabled = self.ema_enabled
+            slow_sum, slow_ema = update_ema( self.slow_sum, self.slow_ema, i, self.slow_window, close_prices )
+            fast_sum, fast_ema = update_ema( self.fast_sum, self.fast_ema, i, self.fast_window, close_prices )
+            slow_ema = np.where( enabled, slow_ema, np.nan )
+            fast_ema = np.where( enabled, fast_ema, np.nan )
+
+            valid = ~( np.isnan( slow_ema ) | np.isnan( fast_ema ) )
+            current_pre_signal = np.sign( fast_ema - slow_ema )
+            prev = self.prev_pre_signal
+            no_prev = np.isnan( prev ) | ( prev == 0.0 )
+            crossover = np.where( current_pre_signal != prev, np.sign( current_pre_signal - prev ), 0.0 )
+            ema_signal = np.where( valid, np.where( no_prev, 0.0, crossover ), 0.0 )
+            ema_signal = np.where( enabled, ema_signal, np.nan )
+            prev_pre_signal = np.where( valid, current_pre_signal, prev )
+
+            # 2. RSI & RSI threshold signal
+            window = self.rsi_window
+            change = close_prices - self.prev_price
+            gain, loss = np.fmax( 0.0, change ), np.fmax( 0.0, -change )
+            seeding = ( i > 0 ) & ( i <= window )
+            sum_gain = np.where( seeding, self.sum_gain + gain, self.sum_gain )
+            sum_loss = np.where( seeding, self.sum_loss + loss, self.sum_loss )
+            alpha_rsi = 1.0 / window if window > 0 else np.nan
+            avg_gain = np.where( i == window, sum_gain / window,
+                       np.where( i > window, ( self.avg_gain * ( 1.0 - alpha_rsi ) ) + ( gain * alpha_rsi ),
+                                 self.avg_gain ) )
+            avg_loss = np.where( i == window, sum_loss / window,
+                       np.where( i > window, ( self.avg_loss * ( 1.0 - alpha_rsi ) ) + ( loss * alpha_rsi ),
+                                 self.avg_loss ) )
+            rs = np.where( avg_loss == 0.0, np.where( avg_gain > 0.0, 1e10, 0.0 ), avg_gain / avg_loss )
+            rsi = np.where( ( window > 0 ) & ( i > window ), 100.0 - ( 100.0 / ( 1.0 + rs ) ), np.nan )
+
+            rsi_signal = np.where( rsi < self.long_entry, 1.0, np.where( rsi > self.short_entry, -1.0, 0.0 ) )
+
+            # 3. Aggregated signal (NaN EMA signal gives no signal)
+            signal = np.sign( np.nan_to_num( ema_signal + rsi_signal, nan=0.0 ) )
+
+        # Store new state
+        self.slow_sum, self.slow_ema = keep( slow_sum, self.slow_sum ), keep( slow_ema, self.slow_ema )
+        self.fast_sum, self.fast_ema = keep( fast_sum, self.fast_sum ), keep( fast_ema, self.fast_ema )
+        self.prev_pre_signal = keep( prev_pre_signal, self.prev_pre_signal )
+        self.sum_gain, self.sum_loss = keep( sum_gain, self.sum_gain ), keep( sum_loss, self.sum_loss )
+        self.avg_gain, self.avg_loss = keep( avg_gain, self.avg_gain ), keep( avg_loss, self.avg_loss )
+        self.prev_price = keep( close_prices, self.prev_price )
+        self.close      = keep( close_prices, self.close )
+        self.nb_prices  = keep( i + 1, i )
+        new_record = np.vstack( [ slow_ema, fast_ema, ema_signal, rsi, rsi_signal, signal ] )
+        self.record = keep( new_record, self.record )
+        # Signals of the last price aren't repeated on NaN prices
+        signals = self.record[ SIGNAL_ROWS ]
+        self.record[ SIGNAL_ROWS ] = np.where( priced | np.isnan( signals ), signals, 0.0 )
+        return self.get_signals()
+
+    def get_signals( self ) : # compact vector of last signals (-1, 0, +1) per column
+        return np.nan_to_num( self.record[ -1 ] ).astype( np.int8 )
+
+    def get_record( self, ticker ) : # same fields as last row of generate_signals_c()'s output
+        j = self.index[ ticker ]
+        return { 'Close':self.close[ j ], **dict( zip( RECORD_COLS, self.record[ :, j ] ) ) }
+
+
+# Returns ( updated sums, updated EMAs ) : SMA of first window prices, then EMA
+def update_ema( ema_sum, ema, nb_prices, window, close_prices ) :
+    seeding = ( nb_prices < window )
+    ema_sum = np.where( seeding, ema_sum + close_prices, ema_sum )
+    alpha   = 2.0 / ( window + 1.0 )
+    ema = np.where( nb_prices == window - 1, ema_sum / window,
+          np.where( seeding, np.nan, ( close_prices * alpha ) + ( ema * ( 1.0 - alpha ) ) ) )
+    return ema_sum, np.where( window > 0, ema, np.nan )
+
+
+# Batched signal generator : all tickers (columns) in 1 call
+def generate_signals_matrix( prices_2d, params_table, rsi_window=14, window_sizes=None, return_all=False ) :
+    """
+    prices_2d    : ( nb_bars x nb_tickers ) prices, 1 column per ticker
+    params_table : mapping of PARAMS_COLS to 1 value per column (dict of arrays, DataFrame...)
+    window_sizes : optional nb of most recent bars used per column (default : all bars)
+    Returns the vector of last signals (int8), or the ( nb_bars x nb_tickers ) signal matrix
+    if return_all is True
+    """
+    prices_2d = np.asarray( prices_2d, dtype=np.float64 )
+    start_rows = None if window_sizes is None else len( prices_2d ) - np.asarray( window_sizes )
+    return SignalStateMatrix( rsi_window, params_table ).seed( prices_2d, start_rows, return_all )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import pandas as pd
+    from lib.jv.signal_state import SignalState  # run from root folder : python -m lib.jv.signal_matrix
+
+    history = pd.read_csv( './data/alpaca/hist_20251010.csv', index_col='timestamp' )
+    rng = np.random.default_rng( 42 )
+    nb_tickers = history.shape[ 1 ]
+    params_table = {
+        'slow_window' : rng.uniform( 10, 30, nb_tickers ), 'fast_window' : rng.uniform( 2, 12, nb_tickers ),
+        'long_entry'  : rng.uniform( 15, 45, nb_tickers ), 'short_entry' : rng.uniform( 55, 85, nb_tickers ) }
+
+    signals = generate_signals_matrix( history, params_table, return_all=True )
+    for j, ticker in enumerate( history.columns ) :
+        state_j = SignalState( 14, [ params_table[ col ][ j ] for col in PARAMS_COLS ] )
+        expected = [ state_j.update( price )[ -1 ] for price in history[ ticker ] ]
+        assert np.array_equal( signals[ :, j ], expected ), ticker
+    print( f'Matrix signals match per-ticker signals for {nb_tickers} tickers' )
+
+    # NaN prices (no trade) : state unchanged, EMAs & crossovers resume with the next prices
+    prices_2d = history.to_numpy( dtype=np.float64 )
+    with_gap, without_gap = SignalStateMatrix( 14, params_table ), SignalStateMatrix( 14, params_table )
+    with_gap.seed( prices_2d[ :-5 ] )
+    without_gap.seed( prices_2d[ :-5 ] )
+    assert not with_gap.update( np.full( nb_tickers, np.nan ) ).any()   # no new signal
+    for prices in prices_2d[ -5: ] :
+        assert np.array_equal( with_gap.update( prices ), without_gap.update( prices ) )
+    assert np.array_equal( with_gap.record, without_gap.record, equal_nan=True )
+    assert not np.isnan( with_gap.slow_ema[ with_gap.ema_enabled ] ).any()
+    print( 'NaN prices skipped : same indicators as without them' )
+
+    # Whole window in 1 C call : same signals & states as 1 NumPy update per row (with gaps & moving windows)
+    gappy = prices_2d.copy()
+    gappy[ rng.random( gappy.shape ) < 0.05 ] = np.nan
+    start_rows = rng.integers( 0, len( gappy ) // 2, nb_tickers )
+    in_c, by_row = SignalStateMatrix( 14, params_table ), SignalStateMatrix( 14, params_table )
+    signals_c = in_c.seed( gappy, start_rows, return_all=True )
+    signals_by_row = np.vstack( [ by_row.update( prices, t >= start_rows ) for t, prices in enumerate( gappy ) ] )
+    assert np.array_equal( signals_c, signals_by_row )
+    assert np.array_equal( in_c.record, by_row.record, equal_nan=True )
+    for field in [ 'nb_prices', 'close', 'slow_ema', 'fast_ema', 'avg_gain', 'avg_loss', 'prev_pre_signal' ] :
+        assert np.array_equal( getattr( in_c, field ), getattr( by_row, field ), equal_nan=True ), field
+    for prices in prices_2d[ -5: ] : # then updated by the live tick
+        assert np.array_equal( in_c.update( prices ), by_row.update( prices ) )
+    print( 'C seeding matches NumPy updates per row' )
+    print( 'Last signals :', dict( zip( history.columns, generate_signals_matrix( history, params_table ).tolist() ) ) )
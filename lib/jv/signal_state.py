@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 18 09:12:40 2025
+
+@author: jean vallee
+"""
+
+# Streaming version of the signal generator : 1 state per ticker
+# - seeded once with historical prices
+# - then updated with 1 new LTP at a time, in O(1) whatever the window size
+# Values are identical to those of generate_signals_c() for the last bar of the
+# whole price series (c_signal_generator.c : signal_state_update() is its C twin)
+
+import math
+
+RECORD_COLS = [ 'slow_EMA', 'fast_EMA', 'EMA_Signal', 'RSI', 'RSI_Signal', 'Signal' ]   # of all signal paths
+
+
+class SignalState :
+
+    def __init__( self, rsi_window, optim_param_list ) :
+        slow_window, fast_window, long_entry, short_entry = optim_param_list[ :4 ]
+        # Windows are truncated to int as in c_signal_generator.c
+        self.slow_window = int( slow_window )
+        self.fast_window = int( fast_window )
+        self.rsi_window  = int( rsi_window )
+        self.ema_enabled = ( slow_window > fast_window )
+        self.long_entry, self.short_entry = long_entry, short_entry
+
+        self.nb_prices, self.prev_price = 0, math.nan
+        self.slow_sum, self.fast_sum = 0.0, 0.0
+        self.slow_ema, self.fast_ema = math.nan, math.nan
+        self.sum_gain, self.sum_loss = 0.0, 0.0
+        self.avg_gain, self.avg_loss = math.nan, math.nan
+        self.prev_pre_signal = math.nan
+        self.close, self.record = math.nan, [ math.nan ] * len( RECORD_COLS )
+
+    def seed( self, close_prices ) :
+        for close_price in close_prices :
+            self.update( close_price )
+        return self.record
+
+    def update( self, close_price ) :
+        if math.isnan( close_price ) : # no trade : state unchanged, no new signal
+            self.record = [ *self.record[ :2 ], 0.0 if self.ema_enabled else math.nan, self.record[ 3 ], 0.0, 0.0 ]
+            return self.record
+        i = self.nb_prices   # index of new price in the whole series
+
+        # 1. EMAs & EMA crossover signal
+        ema_signal = math.nan
+        if self.ema_enabled :
+            self.slow_sum, self.slow_ema = update_ema( self.slow_sum, self.slow_ema, i, self.slow_window, close_price )
+            self.fast_sum, self.fast_ema = update_ema( self.fast_sum, self.fast_ema, i, self.fast_window, close_price )
+            if math.isnan( self.slow_ema ) or math.isnan( self.fast_ema ) :
+                ema_signal = 0.0
+            else :
+                if self.fast_ema > self.slow_ema :   current_pre_signal = 1.0
+                elif self.slow_ema > self.fast_ema : current_pre_signal = -1.0
+                else :                               current_pre_signal = 0.0
+
+                if math.isnan( self.prev_pre_signal ) or self.prev_pre_signal == 0.0 :
+                    ema_signal = 0.0
+                elif current_pre_signal != self.prev_pre_signal :
+                    ema_signal = 1.0 if current_pre_signal - self.prev_pre_signal > 0.0 else -1.0
+                else :
+                    ema_signal = 0.0
+                self.prev_pre_signal = current_pre_signal
+
+        # 2. RSI & RSI threshold signal
+        window, rsi = self.rsi_window, math.nan
+        if window > 0 and i > 0 :
+            change = close_price - self.prev_price
+            gain, loss = max( 0.0, change ), max( 0.0, -change )
+            if i <= window :
+                self.sum_gain += gain
+                self.sum_loss += loss
+                if i == window :
+                    self.avg_gain = self.sum_gain / window
+                    self.avg_loss = self.sum_loss / window
+            else :
+                alpha_rsi = 1.0 / window
+                self.avg_gain = ( self.avg_gain * ( 1.0 - alpha_rsi ) ) + ( gain * alpha_rsi )
+                self.avg_loss = ( self.avg_loss * ( 1.0 - alpha_rsi ) ) + ( loss * alpha_rsi )
+            if i > window :  # batch RSI is NaN up to index window (window + 1 points required)
+                if self.avg_loss == 0.0 : rs = 1e10 if self.avg_gain > 0.0 else 0.0
+                else :                    rs = self.avg_gain / self.avg_loss
+                rsi = 100.0 - ( 100.0 / ( 1.0 + rs ) )
+
+        if math.isnan( rsi ) :          rsi_signal = 0.0
+        elif rsi < self.long_entry :    rsi_signal = 1.0
+        elif rsi > self.short_entry :   rsi_signal = -1.0
+        else :                          rsi_signal = 0.0
+
+        # 3. Aggregated signal (NaN EMA signal gives no signal)
+        total = ema_signal + rsi_signal
+        signal = 1.0 if total > 0.0 else ( -1.0 if total < 0.0 else 0.0 )
+
+        self.prev_price = close_price
+        self.nb_prices += 1
+        self.close  = close_price
+        self.record = [ self.slow_ema, self.fast_ema, ema_signal, rsi, rsi_signal, signal ]
+        return self.record
+
+    def get_signal( self ) :
+        return self.record[ -1 ]
+
+    def get_record( self ) : # same fields as last row of generate_signals_c()'s output
+        return { 'Close':self.close, **dict( zip( RECORD_COLS, self.record ) ) }
+
+
+# Returns ( updated sum, updated EMA ) : SMA of first window prices, then EMA
+def update_ema( ema_sum, ema, nb_prices, window, close_price ) :
+    if window <= 0 :
+        return ema_sum, math.nan
+    if nb_prices < window :
+        ema_sum += close_price
+        return ema_sum, ( ema_sum / window if nb_prices == window - 1 else math.nan )
+    alpha = 2.0 / ( window + 1.0 )
+    return ema_sum, ( close_price * alpha ) + ( ema * ( 1.0 - alpha ) )
+
+
+# Seeds 1 state per ticker from a history of prices (1 column per ticker)
+def seed_signal_states( history, strategy_params, rsi_window, state_class=SignalState ) :
+    signal_states = {}
+    for ticker, params_i in zip( strategy_params[ 'ticker' ], strategy_params[ 'opt_params' ] ) :
+        if ticker not in history.columns :
+            continue
+        state_i = state_class( rsi_window, params_i )
+        state_i.seed( history[ ticker ].to_numpy( dtype=float ) )
+        signal_states[ ticker ] = state_i
+    return signal_states
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import numpy as np
+    import pandas as pd
+    import lib.jv.wrapper_c_signal_gen as c_signal_gen  # run from root folder : python -m lib.jv.signal_state
+
+    np.random.seed( 42 )
+    close = np.cumsum( np.random.randn( 200 ) + np.sin( np.linspace( 0, 10, 200 ) ) * 5 ) + 100
+    optim_params, rsi_win = [ 20, 10, 30.0, 70.0 ], 14
+
+    batch = c_signal_gen.generate_signals_c( pd.DataFrame( { 'Close':close } ), rsi_win, optim_params, True )
+    py_state, c_state = SignalState( rsi_win, optim_params ), c_signal_gen.CSignalState( rsi_win, optim_params )
+    py_state.seed( close[ :50 ] )
+    c_state.seed( close[ :50 ] )
+    for i in range( 50, len( close ) ) :
+        py_record, c_record = py_state.update( close[ i ] ), c_state.update( close[ i ] )
+        batch_record = batch[ RECORD_COLS ].iloc[ i ].to_numpy()
+        assert np.array_equal( py_record, batch_record, equal_nan=True ), ( i, py_record, batch_record )
+        assert np.array_equal( c_record,  batch_record, equal_nan=True ), ( i, c_record,  batch_record )
+    print( 'Streaming states match batch results :', py_state.get_record() )
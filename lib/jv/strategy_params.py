@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 27 09:12:26 2025
+
+@author: jean vallee
+"""
+
+# Optimized strategy parameters as a table of arrays (1 row per ticker)
+# - read from optim_ema_rsi_params.csv without eval() : 'opt_params' strings are parsed by a regular expression
+# - cached in a JSON file, regenerated only when the CSV file changes (modification time or size)
+# - per-ticker access is O(1) : ticker -> row, then 1 value per array
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+PARAMS_COLS = [ 'slow_window', 'fast_window', 'long_entry', 'short_entry', 'min_reversals' ]  # order of opt_params
+NUMBER_PATTERN = re.compile( r'\s*(?:np\.float64\(\s*)?([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|nan|inf)\s*\)?\s*' )
+
+
+# '[np.float64(13.37), np.float64(11.12), ...]' or '[13.37, 11.12, ...]' -> [ 13.37, 11.12, ... ]
+def parse_opt_params( text ) :
+    text = text.strip()
+    if not ( text.startswith( '[' ) and text.endswith( ']' ) ) :
+        raise ValueError( f'Invalid parameters list : {text}' )
+    values = []
+    for item in text[ 1:-1 ].split( ',' ) :
+        match = NUMBER_PATTERN.fullmatch( item )
+        if match is None :
+            raise ValueError( f'Invalid parameter value : {item}' )
+        values.append( float( match.group( 1 ) ) )
+    return values
+
+
+class StrategyParams :
+    """
+    Struct of arrays : slow_window, fast_window, long_entry, short_entry, min_reversals & window_size
+    hold 1 value per ticker, at the ticker's row (rows[ ticker ])
+    """
+    def __init__( self, tickers, opt_params_2d, rsi_window ) :
+        self.tickers = list( tickers )
+        self.rows = { ticker:row for row, ticker in enumerate( self.tickers ) }
+        self.opt_params = np.asarray( opt_params_2d, dtype=np.float64 ).reshape( len( self.tickers ), -1 )
+        for k, col in enumerate( PARAMS_COLS[ :self.opt_params.shape[ 1 ] ] ) :
+            setattr( self, col, self.opt_params[ :, k ] )   # views of columns
+        # Moving window per ticker : max( RSI window, slow EMA window rounded up )
+        self.window_size = np.maximum( rsi_window, np.ceil( self.slow_window ) ).astype( np.int64 )
+
+    def __len__( self ) :
+        return len( self.tickers )
+
+    def __contains__( self, ticker ) :
+        return ticker in self.rows
+
+    def get_opt_params( self, ticker ) : # [ slow_window, fast_window, long_entry, short_entry, ... ]
+        return self.opt_params[ self.rows[ ticker ] ]
+
+    def get_window_size( self, ticker ) :
+        return self.window_size[ self.rows[ ticker ] ]
+
+    def get_params_table( self, tickers=None ) : # 1 array per PARAMS_COLS of given tickers, in their order
+        rows = slice( None ) if tickers is None else [ self.rows[ ticker ] for ticker in tickers ]
+        return { col:self.opt_params[ rows, k ] for k, col in enumerate( PARAMS_COLS[ :4 ] ) }
+
+    def to_frame( self ) : # for display
+        df_out = pd.DataFrame( self.opt_params, columns=PARAMS_COLS[ :self.opt_params.shape[ 1 ] ] )
+        df_out.insert( 0, 'ticker', self.tickers )
+        df_out[ 'window_size' ] = self.window_size
+        return df_out
+
+
+# Parameters of the last optimization (metric 'delta ratio'), cached in cache_path
+def load_strategy_params( csv_path, rsi_window, cache_path=None, metric_type='delta ratio' ) :
+    cache_path = cache_path or os.path.splitext( csv_path )[ 0 ] + '.cache.json'
+    csv_stat = os.stat( csv_path )
+    source = { 'path':os.path.basename( csv_path ), 'mtime_ns':csv_stat.st_mtime_ns, 'size':csv_stat.st_size,
+               'metric_type':metric_type }
+    # Load from cache if the CSV file didn't change
+    try :
+        with open( cache_path ) as cache_file : cache = json.load( cache_file )
+        if cache[ 'source' ] == source :
+            return StrategyParams( cache[ 'tickers' ], cache[ 'opt_params' ], rsi_window )
+    except ( OSError, ValueError, KeyError ) :
+        pass
+
+    # Parse CSV file & regenerate cache
+    parameters = pd.read_csv( csv_path, usecols=[ 'date', 'ticker', 'metric_type', 'opt_params' ] )
+    last_update = parameters[ 'date' ].iloc[ -1 ]
+    mask = ( parameters[ 'date' ]==last_update ) & ( parameters[ 'metric_type' ]==metric_type )
+    parameters = parameters[ mask ]
+    tickers = list( parameters[ 'ticker' ].str.replace( '-', '.' ) )  # Alpaca standard
+    opt_params = [ parse_opt_params( text ) for text in parameters[ 'opt_params' ] ]
+    cache = { 'source':source, 'tickers':tickers, 'opt_params':opt_params }
+    with open( cache_path + '.tmp', 'w' ) as cache_file : json.dump( cache, cache_file )
+    os.replace( cache_path + '.tmp', cache_path )
+    return StrategyParams( tickers, opt_params, rsi_window )
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import time
+    import tempfile
+
+    csv_path = './data/optim_ema_rsi_params.csv'
+    cache_path = os.path.join( tempfile.mkdtemp(), 'params.cache.json' )
+    for label in [ 'CSV parsed', 'cache hit' ] :
+        start = time.perf_counter()
+        params = load_strategy_params( csv_path, 14, cache_path )
+        print( f'{label:>10} : {len( params )} tickers loaded in {( time.perf_counter() - start ) * 1e3:.2f} ms' )
+
+    # Same values as eval-parsed parameters
+    reference = pd.read_csv( csv_path, converters={ 'opt_params':eval } )
+    reference = reference[ ( reference[ 'date' ]==reference[ 'date' ].iloc[ -1 ] ) &
+                           ( reference[ 'metric_type' ]=='delta ratio' ) ]
+    for ticker, opt_params in zip( reference[ 'ticker' ].str.replace( '-', '.' ), reference[ 'opt_params' ] ) :
+        assert np.array_equal( params.get_opt_params( ticker ), np.array( opt_params, dtype=np.float64 ) )
+    start = time.perf_counter()
+    for i in range( 10000 ) :
+        params.get_opt_params( 'NVDA' ), params.get_window_size( 'NVDA' )
+    print( f'Per-ticker access : {( time.perf_counter() - start ) / 10000 * 1e6:.2f} µs' )
+    print( params.to_frame().round( 1 ).head() )
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  3 08:41:26 2025
+
+@author: jean vallee
+"""
+
+# Warm start of the daily history : signals are scanned from the 1st interval of the session,
+# without waiting for the delay of consolidated bars (SIP, HIST_MIN_DELAY on Alpaca's "Basic" plan)
+# - prior-session bars are read from a local cache (columnar store, 1 partition per session) : only bars
+#   after the last cached one are requested
+# - 1 batched request of consolidated bars of all tickers until the delay boundary (now - delay),
+#   sent concurrently with 1 request of real-time bars (IEX feed) from the boundary to now
+# - bars after the boundary are provisional : reconcile() replaces them by consolidated bars once they're
+#   older than the delay, consolidated bars are cached
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+class WarmStart :
+
+    def __init__( self, tickers, fetch_bars, interval, delay, cache=None, dataset='bars', real_time_feed='iex' ) :
+        # fetch_bars( start, end, feed ) : ( bar times x tickers ) closes of bars in [ start, end ),
+        #                                  feed 'sip' (consolidated) or real_time_feed
+        # interval, delay : seconds ; cache : columnar_store.ColumnarStore or None
+        self.tickers    = list( tickers )
+        self.fetch_bars = fetch_bars
+        self.interval   = pd.Timedelta( seconds=interval )
+        self.delay      = pd.Timedelta( seconds=delay )
+        self.cache, self.dataset = cache, dataset
+        self.real_time_feed = real_time_feed
+        self.sessions   = None
+        self.provisional = set()   # bar times (ns) not consolidated yet
+
+    def get_boundary( self, now ) : # start of the 1st bar not consolidated at now
+        return ( pd.Timestamp( now ) - self.delay ).floor( self.interval )
+
+    # --- Load ---
+
+    def load( self, sessions, now ) : # bars of sessions until now, provisional after the delay boundary
+        # sessions : Pandas of ( market_open, market_close ) times in UTC, oldest first
+        self.sessions = sessions
+        now, boundary = pd.Timestamp( now ), self.get_boundary( now )
+        cached = self.read_cache( boundary )
+        start = cached.index[ -1 ] + self.interval if len( cached ) > 0 else sessions.iloc[ 0 ][ 'market_open' ]
+        with ThreadPoolExecutor( max_workers=2 ) as executor :
+            consolidated = executor.submit( self.fetch_bars, start, boundary, 'sip' )
+            real_time    = executor.submit( self.fetch_bars, boundary, now.floor( self.interval ),
+                                            self.real_time_feed )
+            consolidated, real_time = self.in_sessions( consolidated.result() ), self.in_sessions( real_time.result() )
+        self.write_cache( consolidated )
+        self.provisional = set( get_times( real_time.index ).tolist() )
+        history = pd.concat( [ frame.reindex( columns=self.tickers ) for frame in [ cached, consolidated, real_time ] ] )
+        history = history[ ~history.index.duplicated( keep='last' ) ].sort_index()
+        history.columns.name = 'symbol'
+        return history
+
+    def in_sessions( self, bars ) : # bars starting during market hours
+        times = get_times( bars.index )
+        opens, closes = get_times( self.sessions[ 'market_open' ] ), get_times( self.sessions[ 'market_close' ] )
+        i = np.searchsorted( opens, times, side='right' ) - 1
+        return bars[ ( i >= 0 ) & ( times < closes[ np.maximum( i, 0 ) ] ) ]
+
+    # --- Reconcile ---
+
+    def get_due( self, now ) : # provisional bars whose consolidated version is available at now
+        boundary = self.get_boundary( now ).value
+        return sorted( t for t in self.provisional if t < boundary )
+
+    def reconcile( self, now ) : # consolidated bars replacing provisional ones (1 request), empty if none due
+        due = self.get_due( now )
+        if len( due ) == 0 :
+            return pd.DataFrame( columns=self.tickers )
+        start, end = pd.Timestamp( due[ 0 ], tz='UTC' ), pd.Timestamp( due[ -1 ], tz='UTC' ) + self.interval
+        bars = self.fetch_bars( start, end, 'sip' ).reindex( columns=self.tickers )
+        bars = bars[ get_times( bars.index ) >= start.value ]
+        self.provisional.difference_update( due )   # bars without any consolidated trade keep their IEX close
+        self.write_cache( bars )
+        return bars
+
+    # --- Cache ---
+
+    def read_cache( self, boundary ) : # cached bars of prior sessions, until the 1st session missing or incomplete
+        frames = []
+        if self.cache is not None :
+            for opening, closing in self.sessions[ [ 'market_open', 'market_close' ] ].itertuples( index=False ) :
+                partition = self.cache.partition( self.dataset, opening )
+                if closing > boundary or not partition.exists() : # today's session : requested
+                    break
+                frames.append( partition.read() )
+                if frames[ -1 ].index[ -1 ] + self.interval < closing : # bars after the last cached one requested
+                    break
+        return pd.concat( frames ) if len( frames ) > 0 else pd.DataFrame( columns=self.tickers )
+
+    def write_cache( self, bars ) : # consolidated bars merged into the partitions of their dates
+        if self.cache is None or len( bars ) == 0 :
+            return
+        bars = bars.rename_axis( index='timestamp', columns=None )
+        for date, rows in bars.groupby( bars.index.date ) :
+            partition = self.cache.partition( self.dataset, date )
+            if partition.exists() :
+                cached = partition.read()
+                rows = pd.concat( [ cached[ ~cached.index.isin( rows.index ) ], rows ] ).sort_index()
+            partition.write( rows )
+
+
+def get_times( times ) : # ns since epoch, whatever the unit of the dates
+    return pd.DatetimeIndex( times ).as_unit( 'ns' ).asi8
+
+
+# --- Demonstration ---
+if __name__ == '__main__':
+    import tempfile
+    import time
+    from lib.jv.columnar_store import ColumnarStore
+
+    # Recorded prices as consolidated (SIP) bars, real-time (IEX) bars off by 0.1%
+    history = pd.read_csv( './data/alpaca/hist_20251010.csv', index_col='timestamp' )
+    history.index = pd.to_datetime( history.index, utc=True )
+    bars = history.resample( '2min' ).last().dropna( how='all' )
+    day = bars.index[ 0 ].normalize()
+    sessions = pd.DataFrame( { 'market_open':[ day - pd.Timedelta( days=1 ), day ], 'market_close':[ day, day + pd.Timedelta( days=1 ) ] } )
+    requests = []
+    def fetch_bars( start, end, feed ) :
+        requests.append( ( feed, start, end ) )
+        time.sleep( 0.05 )   # latency of 1 request
+        rows = bars[ ( bars.index >= start ) & ( bars.index < end ) ]
+        return rows * 1.001 if feed == 'iex' else rows
+
+    # 1st start of the day, 30 bars after the 1st one : no wait, 1 request per feed
+    cache = ColumnarStore( tempfile.mkdtemp() )
+    warm_start = WarmStart( bars.columns, fetch_bars, 120, 15 * 60, cache )
+    now = bars.index[ 30 ] + pd.Timedelta( seconds=5 )
+    start = time.perf_counter()
+    loaded = warm_start.load( sessions, now )
+    print( f'{len( loaded )} bars loaded in {time.perf_counter() - start:.3f}s, {len( warm_start.provisional )} provisional' )
+    assert len( requests ) == 2 and len( warm_start.provisional ) == 8 and loaded.index[ -1 ] == bars.index[ 29 ]
+
+    # Provisional bars replaced once consolidated, 1 request per reconciliation
+    assert len( warm_start.reconcile( now ) ) == 0 and len( requests ) == 2
+    consolidated = warm_start.reconcile( now + pd.Timedelta( minutes=4 ) )
+    assert len( consolidated ) == 2 and len( warm_start.provisional ) == 6
+    assert np.allclose( consolidated, bars.loc[ consolidated.index ], equal_nan=True )
+    assert len( warm_start.reconcile( now + pd.Timedelta( minutes=30 ) ) ) == 6 and len( warm_start.provisional ) == 0
+    print( f'{len( requests ) - 2} reconciliations, cached : {len( cache.read( "bars" ) )} consolidated bars' )
+
+    # Later : bars of the day cached until the last reconciliation, only new bars requested
+    sessions = pd.DataFrame( { 'market_open':[ day ], 'market_close':[ bars.index[ -1 ] + pd.Timedelta( minutes=2 ) ] } )
+    requests.clear()
+    warm_start = WarmStart( bars.columns, fetch_bars, 120, 15 * 60, cache )
+    loaded = warm_start.load( sessions, bars.index[ -1 ] + pd.Timedelta( minutes=20 ) )
+    assert requests[ 0 ][ 1 ] == bars.index[ 30 ] and len( warm_start.provisional ) == 0
+    assert loaded.index.equals( bars.index ) and np.allclose( loaded, bars, equal_nan=True )
+    print( f'Cached bars until {bars.index[ 29 ]:%H:%M}, requested from {requests[ 0 ][ 1 ]:%H:%M}' )
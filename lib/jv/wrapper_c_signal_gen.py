@@ -12,29 +12,69 @@ import ctypes as ct
 import os
 import sys
 
+from lib.jv.signal_state import RECORD_COLS
+
 # --- 1. Load C Library ---
 # --- IMPORTANT: Compile signals.c first using 'gcc -shared -o signals.so -fPIC signals.c' ---
+# A missing or outdated library raises OSError / ImportError at the 1st signal call, callers then fall back
+# to the NumPy path (signal_matrix)
 def load_c_lib( lib_rel_path ) : # Load a C library as a ctypes.CDLL object
+    # Get the absolute path to the library file
+    lib_path = os.path.join(os.getcwd(), lib_rel_path)
     try:
-        # Get the absolute path to the library file
-        lib_path = os.path.join(os.getcwd(), lib_rel_path)
-        
         # Load the shared library
-        c_library = ct.CDLL(lib_path)
+        return ct.CDLL(lib_path)
         #c_library = ct.cdll.LoadLibrary(lib_path)
-        
-        return c_library
     except OSError as e:
-        print(f"Error loading library: {e}")
-        sys.exit()
+        raise OSError(f"Error loading library {lib_path}: {e}") from e
+
+lib = None  # loaded on first use by get_lib() : importing this module doesn't load the library
+
+def get_lib() :
+    global lib
+    if lib is None :
+        c_library = load_c_lib( './lib/c/c_signal_generator.so' )
+            #'./lib/c/c_lib_reversals.so' )
+        try :
+            set_prototypes( c_library )
+        except AttributeError as ex : # library built from an older c_signal_generator.c
+            raise ImportError( f'Outdated C library, recompile lib/c/c_signal_generator.c : {ex}' ) from ex
+        lib = c_library
+    return lib
+
+lib_error = None  # error of the 1st load by is_lib_available(), if any (not retried)
 
-lib = load_c_lib( './lib/c/c_signal_generator.so' )
-    #'./lib/c/c_lib_reversals.so' )
+def is_lib_available() : # else callers use the NumPy path
+    global lib_error
+    if ( lib is None ) and ( lib_error is None ) :
+        try :
+            get_lib()
+        except ( OSError, ImportError ) as ex :
+            lib_error = ex
+            print( f'C signal generator not available, NumPy path used : {ex}' )
+    return lib is not None
+
+# Ctypes definition for a NumPy array pointer (double*)
+ND_POINTER_DOUBLE = np.ctypeslib.ndpointer(dtype=np.float64, ndim=1, flags='C_CONTIGUOUS')
+ND_POINTER_DOUBLE_2D = np.ctypeslib.ndpointer(dtype=np.float64, ndim=2, flags='C_CONTIGUOUS')
+ND_POINTER_INT       = np.ctypeslib.ndpointer(dtype=np.intc,    ndim=1, flags='C_CONTIGUOUS')
+
+# Mirrors struct signal_state (see class CSignalState below)
+class C_SIGNAL_STATE( ct.Structure ) :
+    _fields_ = [
+        ( 'slow_window', ct.c_int ), ( 'fast_window', ct.c_int ), ( 'rsi_window', ct.c_int ),
+        ( 'ema_enabled', ct.c_int ), ( 'long_entry', ct.c_double ), ( 'short_entry', ct.c_double ),
+        ( 'nb_prices', ct.c_int ), ( 'prev_price', ct.c_double ),
+        ( 'slow_sum', ct.c_double ), ( 'fast_sum', ct.c_double ),
+        ( 'slow_ema', ct.c_double ), ( 'fast_ema', ct.c_double ),
+        ( 'sum_gain', ct.c_double ), ( 'sum_loss', ct.c_double ),
+        ( 'avg_gain', ct.c_double ), ( 'avg_loss', ct.c_double ),
+        ( 'prev_pre_signal', ct.c_double ),
+    ]
+C_SIGNAL_STATE_POINTER = ct.POINTER( C_SIGNAL_STATE )
 
 # Define argument and return types for the C functions
-if lib:
-    # Ctypes definition for a NumPy array pointer (double*)
-    ND_POINTER_DOUBLE = np.ctypeslib.ndpointer(dtype=np.float64, ndim=1, flags='C_CONTIGUOUS')
+def set_prototypes( lib ) :
     
     # 1. EMA Crossover Signal Function Definition
     lib.generate_ema_crossover_signal.argtypes = [
@@ -68,6 +108,62 @@ if lib:
         ND_POINTER_DOUBLE, # final_signal_out
     ]    
 
+    # 4. Batch of Tickers Function Definition (see class SignalWorkspace below)
+    lib.generate_signals_batch.argtypes = [
+        ND_POINTER_DOUBLE_2D, # close_prices (nb_tickers x nb_bars)
+        ct.c_int,          # nb_tickers
+        ct.c_int,          # nb_bars
+        ND_POINTER_INT,    # lengths
+        ND_POINTER_DOUBLE, # slow_windows
+        ND_POINTER_DOUBLE, # fast_windows
+        ct.c_int,          # rsi_window
+        ND_POINTER_DOUBLE, # long_entries
+        ND_POINTER_DOUBLE, # short_entries
+        ND_POINTER_DOUBLE_2D, # slow_ema_out
+        ND_POINTER_DOUBLE_2D, # fast_ema_out
+        ND_POINTER_DOUBLE_2D, # ema_signal_out
+        ND_POINTER_DOUBLE_2D, # rsi_out
+        ND_POINTER_DOUBLE_2D, # rsi_signal_out
+        ND_POINTER_DOUBLE_2D, # signal_out
+        ND_POINTER_DOUBLE, # last_signal_out
+    ]
+
+    # 5. Streaming State Functions Definition (see class CSignalState below)
+
+    lib.signal_state_init.argtypes = [
+        C_SIGNAL_STATE_POINTER, # state
+        ct.c_double,       # slow_window
+        ct.c_double,       # fast_window
+        ct.c_int,          # rsi_window
+        ct.c_double,       # long_entry
+        ct.c_double,       # short_entry
+    ]
+    lib.signal_state_update.argtypes = [
+        C_SIGNAL_STATE_POINTER, # state
+        ct.c_double,       # close_price
+        ND_POINTER_DOUBLE, # record_out
+    ]
+    lib.signal_state_seed.argtypes = [
+        C_SIGNAL_STATE_POINTER, # state
+        ND_POINTER_DOUBLE, # close_prices
+        ct.c_int,          # length
+        ND_POINTER_DOUBLE, # record_out
+    ]
+    lib.signal_states_seed_batch.argtypes = [
+        ND_POINTER_DOUBLE_2D, # close_prices (nb_tickers x nb_bars)
+        ct.c_int,             # nb_tickers
+        ct.c_int,             # nb_bars
+        ND_POINTER_INT,       # start_rows
+        ND_POINTER_DOUBLE,    # slow_windows
+        ND_POINTER_DOUBLE,    # fast_windows
+        ct.c_int,             # rsi_window
+        ND_POINTER_DOUBLE,    # long_entries
+        ND_POINTER_DOUBLE,    # short_entries
+        C_SIGNAL_STATE_POINTER, # states_out
+        ND_POINTER_DOUBLE_2D, # records_out (nb_tickers x REC_SIZE)
+        ct.c_void_p,          # signals_out (nb_tickers x nb_bars), or NULL
+    ]
+
 
 # --- 2. Combined Python Wrapper Function ---
 
@@ -75,8 +171,7 @@ def generate_signals_c(data, rsi_window, optim_param_list, verbose, close_column
     """
     Python wrapper that calls the C signal generation logic, mirroring the original Python structure.
     """
-    if lib is None:
-        return data
+    lib = get_lib()  # loaded on 1st call
 
     try:
         # Check arguments' values (simplified Python side validation)
@@ -138,7 +233,116 @@ def generate_signals_c(data, rsi_window, optim_param_list, verbose, close_column
             print(f"Error: {sys._getframe().f_code.co_name}, {ex}")
         return pd.DataFrame([])
 
-# --- 3. Demonstration ---
+# --- 3. Batch of Tickers ---
+
+class SignalWorkspace :
+    """
+    Reusable buffers to generate the signals of N tickers in 1 C call per scan.
+    Input & output buffers are allocated once, then overwritten by each run().
+    """
+    def __init__( self, nb_tickers, nb_bars, params_table, rsi_window, window_sizes=None ) :
+        # params_table : mapping of 'slow_window', 'fast_window', 'long_entry', 'short_entry'
+        #                to 1 value per ticker (e.g. StrategyParams.get_params_table())
+        self.nb_tickers, self.nb_bars, self.rsi_window = nb_tickers, nb_bars, rsi_window
+        as_vector = lambda values : np.ascontiguousarray( values, dtype=np.float64 )
+        self.slow_windows  = as_vector( params_table[ 'slow_window' ] )
+        self.fast_windows  = as_vector( params_table[ 'fast_window' ] )
+        self.long_entries  = as_vector( params_table[ 'long_entry' ] )
+        self.short_entries = as_vector( params_table[ 'short_entry' ] )
+        # Moving window size per ticker (default : all bars)
+        if window_sizes is None : window_sizes = np.full( nb_tickers, nb_bars )
+        self.lengths = np.ascontiguousarray( window_sizes, dtype=np.intc )
+
+        # Buffers ( nb_tickers x nb_bars ), 1 contiguous row per ticker
+        new_buffer = lambda : np.full( ( nb_tickers, nb_bars ), np.nan, dtype=np.float64 )
+        self.prices = new_buffer()
+        self.outputs = { col:new_buffer() for col in RECORD_COLS }
+        self.last_signals = np.zeros( nb_tickers, dtype=np.float64 )
+
+    def load( self, prices_2d ) : # copy ( nb_bars x nb_tickers ) prices, e.g. last rows of daily_history
+        np.copyto( self.prices, np.asarray( prices_2d, dtype=np.float64 ).T )
+
+    def run( self, prices_2d=None ) : # returns the last signal per ticker
+        if prices_2d is not None : 
+            self.load( prices_2d )
+        outputs = self.outputs
+        get_lib().generate_signals_batch(
+            self.prices, self.nb_tickers, self.nb_bars, self.lengths,
+            self.slow_windows, self.fast_windows, self.rsi_window, self.long_entries, self.short_entries,
+            outputs[ 'slow_EMA' ], outputs[ 'fast_EMA' ], outputs[ 'EMA_Signal' ],
+            outputs[ 'RSI' ], outputs[ 'RSI_Signal' ], outputs[ 'Signal' ], self.last_signals
+        )
+        return self.last_signals
+
+    def get_record( self, k ) : # same fields as last row of generate_signals_c()'s output for ticker k
+        return { 'Close':self.prices[ k, -1 ], **{ col:self.outputs[ col ][ k, -1 ] for col in RECORD_COLS } }
+
+
+# --- 4. Streaming State ---
+
+class CSignalState :
+    """
+    Per-ticker indicator state kept in C, seeded once then updated by 1 price at a time.
+    Same interface & same values as signal_state.SignalState (its Python twin).
+    """
+    def __init__( self, rsi_window, optim_param_list ) :
+        slow_window, fast_window, long_entry, short_entry = optim_param_list[ :4 ]
+        self.state  = C_SIGNAL_STATE()
+        self.record = np.full( len( RECORD_COLS ), np.nan, dtype=np.float64 ) # reused by each update
+        self.close  = np.nan
+        get_lib().signal_state_init( ct.byref( self.state ), slow_window, fast_window, rsi_window, 
+                               long_entry, short_entry )
+
+    def seed( self, close_prices ) :
+        close_prices = np.ascontiguousarray( close_prices, dtype=np.float64 )
+        close_prices = close_prices[ ~np.isnan( close_prices ) ]   # NaN prices skipped, as by update()
+        if len( close_prices ) > 0 :
+            get_lib().signal_state_seed( ct.byref( self.state ), close_prices, len( close_prices ), self.record )
+            self.close = close_prices[ -1 ]
+        return self.record
+
+    def update( self, close_price ) :
+        if np.isnan( close_price ) : # no trade : state unchanged, no new signal
+            self.record[ [ 4, 5 ] ] = 0.0
+            self.record[ 2 ] = np.where( np.isnan( self.record[ 2 ] ), np.nan, 0.0 )
+            return self.record
+        get_lib().signal_state_update( ct.byref( self.state ), close_price, self.record )
+        self.close = close_price
+        return self.record
+
+    def get_signal( self ) :
+        return self.record[ -1 ]
+
+    def get_record( self ) : # same fields as last row of generate_signals_c()'s output
+        return { 'Close':self.close, **dict( zip( RECORD_COLS, self.record ) ) }
+
+# States of N tickers seeded with their whole price window in 1 C call (e.g. by SignalStateMatrix.seed())
+def seed_signal_states( prices_2d, params_table, rsi_window, start_rows=None, return_all=False ) :
+    """
+    prices_2d    : ( nb_bars x nb_tickers ) prices, 1 column per ticker (NaN prices skipped)
+    params_table : mapping of 'slow_window', 'fast_window', 'long_entry', 'short_entry' to 1 value per ticker
+    start_rows   : 1st row used per ticker (default : all rows)
+    Returns ( structured array of the C states, ( len( RECORD_COLS ) x nb_tickers ) last records, 
+              ( nb_bars x nb_tickers ) signal matrix or None if return_all is False )
+    """
+    nb_bars, nb_tickers = prices_2d.shape
+    as_vector = lambda values : np.ascontiguousarray( values, dtype=np.float64 )
+    if start_rows is None : start_rows = np.zeros( nb_tickers )
+    states  = np.zeros( nb_tickers, dtype=np.dtype( C_SIGNAL_STATE ) )
+    records = np.empty( ( nb_tickers, len( RECORD_COLS ) ), dtype=np.float64 )
+    signals = np.empty( ( nb_tickers, nb_bars ), dtype=np.float64 ) if return_all else None
+    get_lib().signal_states_seed_batch(
+        np.ascontiguousarray( prices_2d.T, dtype=np.float64 ), nb_tickers, nb_bars, 
+        np.ascontiguousarray( start_rows, dtype=np.intc ),
+        as_vector( params_table[ 'slow_window' ] ), as_vector( params_table[ 'fast_window' ] ), rsi_window,
+        as_vector( params_table[ 'long_entry' ] ), as_vector( params_table[ 'short_entry' ] ),
+        states.ctypes.data_as( C_SIGNAL_STATE_POINTER ), records,
+        None if signals is None else signals.ctypes.data
+    )
+    return states, records.T, None if signals is None else signals.T.astype( np.int8 )
+
+
+# --- 5. Demonstration ---
 if __name__ == '__main__':
     # Generate dummy data for 50 days
     np.random.seed(42)
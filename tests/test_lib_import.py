@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 26 11:40:18 2025
+
+@author: jean vallee
+"""
+
+# Import of the trading library as a package, within its time budget & without side effects
+# - import-time budget measured in a fresh interpreter (check_import_time.measure_import())
+# - a missing C library raises at the 1st signal call, signals then computed by the NumPy path
+# Run from root folder : python -m pytest tests  (or python -m unittest discover tests)
+
+import unittest
+from unittest import mock
+import numpy as np
+
+from lib.jv.check_import_time import measure_import, IMPORT_TIME_BUDGET
+import lib.jv.wrapper_c_signal_gen as c_signal_gen
+from lib.jv.signal_matrix import generate_signals_matrix
+
+
+class TestImportTime( unittest.TestCase ) :
+
+    def test_import_within_budget( self ) :
+        result = measure_import()
+        self.assertLess( result[ 'elapsed' ], IMPORT_TIME_BUDGET )
+        self.assertEqual( result[ 'loaded' ], [] )   # heavy libraries imported on first use
+        self.assertEqual( result[ 'popen_calls' ], 0 )
+
+    def test_session_state_set_through_package( self ) :
+        import lib.jv.lib_paper_trading as trading
+        prototypes = trading.set_execution_mode( 'replay', 0, '_replay' )
+        try :
+            self.assertIs( trading.get_ltps, trading.replay_get_ltps )
+            self.assertEqual( prototypes[ 2 ], trading.replay_get_ltps )
+            self.assertIn( 'api_orders_replay_', trading.get_log_path( trading.current_timestamp() ) )
+        finally :
+            trading.set_execution_mode( 'normal' )
+
+
+class TestCLibFallback( unittest.TestCase ) :
+
+    def setUp( self ) :
+        rng = np.random.default_rng( 3 )
+        self.prices_2d = 100 + np.cumsum( rng.normal( 0, 1, ( 300, 8 ) ), axis=0 )
+        self.params_table = { 'slow_window':rng.uniform( 10, 30, 8 ), 'fast_window':rng.uniform( 2, 12, 8 ),
+                              'long_entry':rng.uniform( 15, 45, 8 ), 'short_entry':rng.uniform( 55, 85, 8 ) }
+
+    def test_missing_library_raises( self ) :
+        with self.assertRaises( OSError ) :
+            c_signal_gen.load_c_lib( './lib/c/missing_signal_generator.so' )
+
+    def test_numpy_path_without_library( self ) :
+        expected = generate_signals_matrix( self.prices_2d, self.params_table, return_all=True )
+        not_found = mock.Mock( side_effect=OSError( 'not found' ) )
+        with mock.patch.object( c_signal_gen, 'lib', None ), mock.patch.object( c_signal_gen, 'lib_error', None ), \
+             mock.patch.object( c_signal_gen, 'load_c_lib', not_found ) :
+            signals = generate_signals_matrix( self.prices_2d, self.params_table, return_all=True )
+            self.assertFalse( c_signal_gen.is_lib_available() )
+        self.assertTrue( not_found.called )
+        self.assertTrue( np.array_equal( signals, expected ) )
+
+
+if __name__ == '__main__':
+    unittest.main()